@@ -1,12 +1,17 @@
 import json
 import logging
 import os
+import time
 
 import click
 import yaml
 
 from hcebt.config import RunConfig
 from hcebt.runner import run_ab
+from hcebt.streaming import JsonlStream, is_stream_path
+from hcebt.sweep import sweep
+from hcebt.synth import BASE_TS, DEFAULT_MIX, generate, parse_mix, write_events
+from hcebt.tickstore import TickStore, convert_events, is_tick_store
 
 # configure logging AFTER imports (fixes E402)
 level = os.getenv("HCE_LOG_LEVEL", "INFO").upper()
@@ -21,16 +26,121 @@ def cli():
     pass
 
 
+def _load_leg(path, chunk_size):
+    # tick stores and JSONL/NDJSON legs are streamed in chunks (must be pre-sorted);
+    # JSON arrays are loaded and sorted in memory
+    if is_tick_store(path):
+        return TickStore(path, chunk_size=chunk_size)
+    if is_stream_path(path):
+        return JsonlStream(path, chunk_size=chunk_size, columnar=True)
+    with open(path) as fh:
+        return json.load(fh)
+
+
 @cli.command("run")
 @click.option("--config", "config_path", required=True, type=click.Path(exists=True))
 @click.option("--ab", "ab_paths", required=True, nargs=2, type=click.Path(exists=True))
-def run_cmd(config_path, ab_paths):
+@click.option(
+    "--chunk-size",
+    default=50_000,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Events per chunk when streaming .jsonl/.ndjson legs or tick stores.",
+)
+@click.option("--profile", is_flag=True, help="Report per-stage time and call counts.")
+@click.option(
+    "--cprofile",
+    is_flag=True,
+    help="Also dump cProfile pstats and collapsed stacks into run_artifacts/.",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Simulate even if the config's result cache holds an identical run.",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="Continue an interrupted run from its last checkpoint in run_artifacts/.",
+)
+def run_cmd(config_path, ab_paths, chunk_size, profile, cprofile, no_cache, resume):
     cfg = RunConfig(**yaml.safe_load(open(config_path)))
-    A = json.load(open(ab_paths[0]))
-    B = json.load(open(ab_paths[1]))
+    if no_cache:
+        cfg.cache.enabled = False
+    if resume:
+        cfg.checkpoint.resume = True
+    if profile or cprofile:
+        cfg.profile.enabled = True
+        cfg.profile.cprofile = cfg.profile.cprofile or cprofile
+    A = _load_leg(ab_paths[0], chunk_size)
+    B = _load_leg(ab_paths[1], chunk_size)
     res = run_ab(cfg, A, B)
     print(json.dumps(res, indent=2))
 
 
+@cli.command("sweep")
+@click.option("--config", "config_path", required=True, type=click.Path(exists=True))
+@click.option("--events", "events_path", required=True, type=click.Path(exists=True))
+@click.option(
+    "--grid",
+    "grid_path",
+    required=True,
+    type=click.Path(exists=True),
+    help="YAML mapping of FillConfig field -> list of values.",
+)
+@click.option("--workers", default=None, type=click.IntRange(min=1), help="Pool size.")
+@click.option("--chunk-size", default=50_000, show_default=True, type=click.IntRange(min=1))
+def sweep_cmd(config_path, events_path, grid_path, workers, chunk_size):
+    """Evaluate a FillConfig grid against one load of the events."""
+    cfg = RunConfig(**yaml.safe_load(open(config_path)))
+    grid = yaml.safe_load(open(grid_path))
+    res = sweep(cfg, _load_leg(events_path, chunk_size), grid, workers=workers)
+    print(json.dumps(res, indent=2))
+
+
+@cli.command("convert")
+@click.argument("src", type=click.Path(exists=True, dir_okay=False))
+@click.argument("dst", type=click.Path(file_okay=False))
+@click.option("--chunk-size", default=50_000, show_default=True, type=click.IntRange(min=1))
+@click.option(
+    "--block-rows",
+    default=4096,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Rows per sparse-index block.",
+)
+def convert_cmd(src, dst, chunk_size, block_rows):
+    """Convert a JSON/JSONL event file into a memory-mapped tick store directory."""
+    rows = convert_events(src, dst, chunk_size=chunk_size, block_rows=block_rows)
+    print(json.dumps({"rows": rows, "path": dst}))
+
+
+@cli.command("gen")
+@click.argument("dst", type=click.Path(dir_okay=False))
+@click.option("--events", default=100_000, show_default=True, type=click.IntRange(min=0))
+@click.option("--symbols", default=16, show_default=True, type=click.IntRange(min=1))
+@click.option("--seed", default=0, show_default=True, type=int)
+@click.option(
+    "--mix",
+    default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()),
+    show_default=True,
+    help="Order-type weights, e.g. market=1,limit=1 (unlisted types are not generated).",
+)
+@click.option("--start-ts", default=BASE_TS, show_default=True, type=int, help="Epoch ms.")
+@click.option(
+    "--tick", default=0.01, show_default=True, type=click.FloatRange(min=0.0, min_open=True)
+)
+def gen_cmd(dst, events, symbols, seed, mix, start_ts, tick):
+    """Write seeded synthetic events: JSONL for .jsonl/.ndjson, otherwise a JSON array."""
+    try:
+        weights = parse_mix(mix)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--mix") from e
+    t0 = time.perf_counter()
+    chunks = generate(events, symbols, seed, weights, start_ts, tick)
+    n = write_events(dst, chunks, jsonl=is_stream_path(dst))
+    print(json.dumps({"events": n, "path": dst, "seconds": round(time.perf_counter() - t0, 3)}))
+
+
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,8 @@
+"""Performance benchmarks for the fill model, runner, Repo and timestamp helpers.
+
+    python -m benchmarks run --size 10k --size 1m --out run_artifacts/bench/base.json
+    python -m benchmarks compare run_artifacts/bench/base.json run_artifacts/bench/new.json
+
+``compare`` exits non-zero when any benchmark's events/sec dropped by more than
+``--threshold`` (10% by default).
+"""
@@ -0,0 +1,64 @@
+from datetime import UTC, datetime
+import json
+import sys
+
+import click
+
+from .suite import compare, run_suite, write_results
+from .workloads import SIZES
+
+
+@click.group()
+def cli():
+    pass
+
+
+@cli.command("run")
+@click.option(
+    "--size",
+    "sizes",
+    multiple=True,
+    default=["10k"],
+    show_default=True,
+    help=f"Workload size: one of {', '.join(SIZES)} or an event count. Repeatable.",
+)
+@click.option("--only", multiple=True, help="Run cases whose name starts with this prefix.")
+@click.option("--repeat", default=3, show_default=True, type=click.IntRange(min=1))
+@click.option("--out", "out_path", default=None, help="Result JSON path.")
+def run_cmd(sizes, only, repeat, out_path):
+    """Run the benchmark suite and write its results as JSON."""
+    doc = run_suite(list(sizes), list(only) or None, repeat, log=click.echo)
+    if out_path is None:
+        stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%SZ")
+        out_path = f"run_artifacts/bench/bench-{stamp}.json"
+    write_results(out_path, doc)
+    click.echo(out_path)
+
+
+@cli.command("compare")
+@click.argument("baseline", type=click.Path(exists=True, dir_okay=False))
+@click.argument("current", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--threshold",
+    default=0.10,
+    show_default=True,
+    type=click.FloatRange(min=0.0),
+    help="Allowed fractional drop in events/sec before a benchmark counts as regressed.",
+)
+def compare_cmd(baseline, current, threshold):
+    """Compare two result files; exit status 1 if any benchmark regressed."""
+    with open(baseline) as fh:
+        base = json.load(fh)
+    with open(current) as fh:
+        cur = json.load(fh)
+    rows, regressed = compare(base, cur, threshold)
+    for r in rows:
+        change = f"{r['change']:+.1%}" if "change" in r else "-"
+        b = f"{r['baseline']:,.0f}" if r["baseline"] is not None else "-"
+        c = f"{r['current']:,.0f}" if r["current"] is not None else "-"
+        click.echo(f"{r['name']:<32} {b:>14} {c:>14} {change:>8}  {r['status']}")
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,272 @@
+"""Benchmark cases, the runner and the JSON result / comparison format.
+
+Every case has an untimed ``setup(n)`` and a timed ``run(state)`` that returns the number of
+events (or rows) it processed; a result records the best of ``repeat`` runs as
+``events_per_sec``. Per-event Python paths (scalar fills, row legs, scalar to_utc_iso) are
+run on at most ``SCALAR_CAP`` events so the 10M size stays practical.
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+import functools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from hcebt.config import RunConfig
+from hcebt.events import fill_inputs
+from hcebt.fills import MarketSnapshot, OrderIntent, ShadowFillModel
+from hcebt.persistence import Repo, RepoConfig, RowBatch
+from hcebt.runner import run_ab
+from lib.timeutil import to_utc_iso, to_utc_iso_array
+
+from .workloads import event_chunks, event_rows, parse_size, replay
+
+MODES = ("fixed_ticks", "bps", "pct_spread", "hybrid")
+SCALAR_CAP = 200_000
+POOL_EVENTS = 1_000_000  # larger sizes replay this many pre-generated events
+REPO_BATCH = 5_000
+DUP_EVERY = 10  # every 10th submitted batch repeats its predecessor's keys
+
+
+@dataclass
+class Case:
+    name: str
+    setup: Callable[[int], object]
+    run: Callable[[object], int]
+
+
+@functools.lru_cache(maxsize=1)
+def _pool(n: int) -> list[dict[str, np.ndarray]]:
+    return list(event_chunks(min(n, POOL_EVENTS)))
+
+
+def _head(n: int) -> dict[str, np.ndarray]:
+    """The first ``min(n, SCALAR_CAP)`` events as one columnar chunk."""
+    m = min(n, SCALAR_CAP)
+    return next(event_chunks(m, chunk_size=m))
+
+
+def _fill_batch_case(mode: str, partial_fills: bool = False) -> Case:
+    def run(state) -> int:
+        n, pool = state
+        fm = ShadowFillModel(slip_mode=mode, partial_fills=partial_fills)
+        done = 0
+        for chunk in replay(pool, n):
+            done += len(fm.fill_batch(**fill_inputs(chunk)))
+        return done
+
+    kind = "partial" if partial_fills else "batch"
+    return Case(f"fill.{mode}.{kind}", lambda n: (n, _pool(n)), run)
+
+
+def _orders(rows: list[dict]) -> list[tuple[MarketSnapshot, OrderIntent]]:
+    return [
+        (
+            MarketSnapshot(
+                ts=ev["ts"],
+                last=ev["last"],
+                mark=ev["last"],
+                bid=ev["bid"],
+                ask=ev["ask"],
+                spread=ev["ask"] - ev["bid"],
+                volume=ev["vol"],
+            ),
+            OrderIntent(
+                side=ev["side"],
+                order_type=ev["type"],
+                qty=ev["qty"],
+                limit_price=ev.get("limit"),
+                stop_price=ev.get("stop"),
+                queue_pos=ev["queue_pos"],
+            ),
+        )
+        for ev in rows
+    ]
+
+
+def _fill_scalar_case(mode: str) -> Case:
+    def run(orders) -> int:
+        fm = ShadowFillModel(slip_mode=mode)
+        for snap, intent in orders:
+            fm.fill(snap, intent)
+        return len(orders)
+
+    return Case(f"fill.{mode}.scalar", lambda n: _orders(event_rows(_head(n))), run)
+
+
+def _bench_cfg() -> RunConfig:
+    return RunConfig(run_id="bench", batch={"backend": "none", "overflow": "block"})
+
+
+def _run_ab_columns(state) -> int:
+    n, pool = state
+    res = run_ab(_bench_cfg(), replay(pool, n), replay(pool, n))
+    return res["A"]["events"] + res["B"]["events"]
+
+
+def _run_ab_rows(rows: list[dict]) -> int:
+    res = run_ab(_bench_cfg(), rows, rows)
+    return res["A"]["events"] + res["B"]["events"]
+
+
+class _StubRepo(Repo):
+    """Repo whose writers only materialize each column, like the columnar ClickHouse insert."""
+
+    def _write_rows(self, rows: RowBatch):
+        for c in rows.columns:
+            rows.column(c)
+
+
+def _repo_batches(n: int) -> list[RowBatch]:
+    batches = []
+    for chunk in _pool(n):
+        ts = to_utc_iso_array(chunk["ts"])
+        symbols = chunk["symbol"].tolist()
+        values = chunk["last"].tolist()
+        for i in range(0, len(ts), REPO_BATCH):
+            if len(batches) % DUP_EVERY == DUP_EVERY - 1:
+                batches.append(batches[-1])
+                continue
+            sl = slice(i, i + REPO_BATCH)
+            m = len(ts[sl])
+            cols = {"run_id": ["bench"] * m, "ts": ts[sl], "symbol": symbols[sl]}
+            cols.update({"metric": ["fill_cost"] * m, "value": values[sl], "label": ["A"] * m})
+            batches.append(RowBatch(cols, m))
+    return batches
+
+
+def _repo_flush(state) -> int:
+    n, batches = state
+    repo = _StubRepo(RepoConfig(batch_size=REPO_BATCH, overflow="block", block_timeout_s=60.0))
+    repo.start()
+    done = cycle = 0
+    while done < n:
+        for b in batches:
+            if done >= n:
+                break
+            if cycle:  # later cycles re-key the pool with a distinct run_id
+                b = RowBatch({**b.columns, "run_id": [f"bench{cycle}"] * b.n}, b.n)
+            repo.submit(b)
+            done += b.n
+        cycle += 1
+    repo.stop()
+    return done
+
+
+def _iso_scalar(ts: list) -> int:
+    for t in ts:
+        to_utc_iso(t)
+    return len(ts)
+
+
+def _iso_array(state) -> int:
+    n, pool = state
+    done = 0
+    for chunk in replay(pool, n):
+        done += len(to_utc_iso_array(chunk["ts"]))
+    return done
+
+
+CASES = [
+    *(_fill_batch_case(m) for m in MODES),
+    _fill_batch_case("bps", partial_fills=True),
+    *(_fill_scalar_case(m) for m in MODES),
+    Case("run_ab.columns", lambda n: (n, _pool(n)), _run_ab_columns),
+    Case("run_ab.rows", lambda n: event_rows(_head(n)), _run_ab_rows),
+    Case("repo.flush", lambda n: (n, _repo_batches(n)), _repo_flush),
+    Case("to_utc_iso.scalar", lambda n: _head(n)["ts"].tolist(), _iso_scalar),
+    Case("to_utc_iso.array", lambda n: (n, _pool(n)), _iso_array),
+]
+
+
+def _git_rev() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run_suite(
+    sizes: list[str],
+    only: list[str] | None = None,
+    repeat: int = 3,
+    log: Callable[[str], None] | None = None,
+) -> dict:
+    """Run every case (or those whose name starts with one of ``only``) at each size."""
+    results = {}
+    for size in sizes:
+        n = parse_size(size)
+        for case in CASES:
+            if only and not any(case.name.startswith(p) for p in only):
+                continue
+            state = case.setup(n)
+            times = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                events = case.run(state)
+                times.append(time.perf_counter() - t0)
+            best = min(times)
+            key = f"{case.name}@{size}"
+            results[key] = {
+                "events": events,
+                "seconds": best,
+                "median_seconds": statistics.median(times),
+                "events_per_sec": events / max(best, 1e-9),
+                "repeat": repeat,
+            }
+            if log is not None:
+                log(f"{key:<32} {events:>10} ev  {results[key]['events_per_sec']:>14,.0f} ev/s")
+    return {
+        "meta": {
+            "created": datetime.now(UTC).isoformat(),
+            "git": _git_rev(),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def write_results(path: str, doc: dict) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as fh:
+        json.dump(doc, fh, indent=2)
+
+
+def compare(
+    baseline: dict, current: dict, threshold: float = 0.10, metric: str = "events_per_sec"
+) -> tuple[list[dict], bool]:
+    """Per-benchmark change of ``metric`` (higher is better); a drop of more than
+    ``threshold`` (a fraction) is a regression. Returns the rows and whether any regressed.
+    Benchmarks present on one side only are reported but never fail the comparison."""
+    base, cur = baseline["results"], current["results"]
+    rows = []
+    for name in sorted(set(base) | set(cur)):
+        if name not in base or name not in cur:
+            rows.append(
+                {
+                    "name": name,
+                    "baseline": base[name][metric] if name in base else None,
+                    "current": cur[name][metric] if name in cur else None,
+                    "status": "new" if name not in base else "missing",
+                }
+            )
+            continue
+        b, c = base[name][metric], cur[name][metric]
+        change = c / b - 1.0 if b else 0.0
+        status = "regressed" if change < -threshold else "improved" if change > threshold else "ok"
+        rows.append({"name": name, "baseline": b, "current": c, "change": change, "status": status})
+    return rows, any(r["status"] == "regressed" for r in rows)
@@ -0,0 +1,66 @@
+"""Deterministic synthetic workloads for the benchmark suite.
+
+Events come from hcebt.synth as seeded columnar chunks, so a given (n, symbols, seed,
+chunk_size) always yields the same events. ``replay`` cycles a pre-generated pool with
+shifted ids and timestamps, so a 10M event leg streams through run_ab without ever being
+materialized.
+"""
+
+from collections.abc import Iterator
+
+import numpy as np
+
+from hcebt.synth import generate
+
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+
+def parse_size(size: str) -> int:
+    """Event count for a SIZES name or a plain integer such as ``"2500"``."""
+    if size in SIZES:
+        return SIZES[size]
+    try:
+        return int(size.replace("_", ""))
+    except ValueError:
+        raise ValueError(
+            f"unknown size {size!r}; expected one of {sorted(SIZES)} or a count"
+        ) from None
+
+
+def event_chunks(
+    n: int, symbols: int = 64, seed: int = 7, chunk_size: int = 250_000
+) -> Iterator[dict[str, np.ndarray]]:
+    """``n`` events with the default order-type mix over ``symbols`` symbols (hcebt.synth)."""
+    return generate(n, symbols=symbols, seed=seed, chunk_size=chunk_size)
+
+
+def replay(pool: list[dict[str, np.ndarray]], n: int) -> Iterator[dict[str, np.ndarray]]:
+    """``n`` events from pre-generated chunks, cycling the pool with ``id``/``ts`` shifted
+    past the previous cycle, so large sizes cost no generation time inside a timed run."""
+    pool_n = sum(len(c["ts"]) for c in pool)
+    pool_span = int(pool[-1]["ts"][-1] - pool[0]["ts"][0]) + 1 if pool_n else 0
+    done = cycle = 0
+    while done < n:
+        for chunk in pool:
+            m = min(len(chunk["ts"]), n - done)
+            if m <= 0:
+                break
+            out = {k: v[:m] for k, v in chunk.items()}
+            if cycle:
+                out["id"] = out["id"] + cycle * pool_n
+                out["ts"] = out["ts"] + cycle * pool_span
+            yield out
+            done += m
+        cycle += 1
+
+
+def event_rows(cols: dict[str, np.ndarray]) -> list[dict]:
+    """Row-oriented events (as the JSON loader produces them) for one columnar chunk."""
+    names = list(cols)
+    columns = [cols[k].tolist() for k in names]
+    rows = [dict(zip(names, vals, strict=True)) for vals in zip(*columns, strict=True)]
+    for r in rows:
+        for k in ("limit", "stop"):
+            if r[k] != r[k]:  # NaN -> absent, like a JSON event without the field
+                del r[k]
+    return rows
@@ -0,0 +1,236 @@
+"""Asyncio variant of Repo that overlaps backend inserts.
+
+``Repo`` writes from ``writers`` threads, each blocked on its connection for a whole
+insert and sleeping between retries. ``AsyncRepo`` runs a single event loop in a
+background thread that keeps up to ``max_inflight`` inserts in flight. TimescaleDB is
+written through psycopg's ``AsyncConnection``. ClickHouse gets
+``INSERT ... FORMAT JSONEachRow`` over a small HTTP/1.1 client on asyncio streams with
+kept-alive connections. Retries wait on ``asyncio.sleep``, so other inserts keep going
+while one backs off.
+
+The rest is Repo's: ``submit`` (validation, overflow, spill), batching up to
+``batch_size`` / ``flush_interval_ms``, PK dedupe, metrics and checkpoint progress. run_ab
+uses either class through the same ``submit``/``start``/``stop``. As with several Repo
+writers, inserts in flight are deduplicated against keys already written, not against
+each other. ``timescale_write="copy"`` falls back to INSERT here.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import queue
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+from .persistence import Repo, RepoConfig, RowBatch, _combine, backoff
+
+
+async def _read_response(reader: asyncio.StreamReader) -> tuple[int, dict, bytes]:
+    """Status, lower-cased headers and body of one HTTP/1.1 response."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed by the server")
+    status = int(status_line.split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        body = bytearray()
+        while size := int((await reader.readline()).split(b";")[0], 16):
+            body += await reader.readexactly(size)
+            await reader.readline()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):  # trailers
+            pass
+    elif "content-length" in headers:
+        body = await reader.readexactly(int(headers["content-length"]))
+    else:
+        body = await reader.read()
+        headers["connection"] = "close"
+    return status, headers, bytes(body)
+
+
+class _ClickHouseHTTP:
+    """Inserts over ClickHouse's HTTP interface, one kept-alive connection per insert in
+    flight."""
+
+    def __init__(self, cfg: RepoConfig):
+        url = urlsplit(
+            cfg.clickhouse_url if "://" in cfg.clickhouse_url else "//" + cfg.clickhouse_url
+        )
+        self.host = url.hostname or "localhost"
+        self.port = url.port or 8123
+        self.table = cfg.table
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def insert(self, batch: RowBatch) -> None:
+        # epoch-ms ints are DateTime64(3) ticks; ISO strings are parsed best-effort
+        cols = sorted(batch.columns)
+        query = f"INSERT INTO {self.table} ({','.join(cols)}) FORMAT JSONEachRow"
+        params = {"query": query, "date_time_input_format": "best_effort"}
+        body = "".join(
+            json.dumps(dict(zip(cols, row, strict=True))) + "\n" for row in batch.values(cols)
+        ).encode()
+        status, payload = await self._post("/?" + urlencode(params), body)
+        if status != 200:
+            raise RuntimeError(
+                f"ClickHouse HTTP {status}: {payload[:200].decode(errors='replace')}"
+            )
+
+    async def _post(self, target: str, body: bytes) -> tuple[int, bytes]:
+        if self._idle:
+            reader, writer = self._idle.pop()
+        else:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        head = (
+            f"POST {target} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n"
+        )
+        try:
+            writer.write(head.encode() + body)
+            await writer.drain()
+            status, headers, payload = await _read_response(reader)
+        except BaseException:
+            writer.close()
+            raise
+        if headers.get("connection", "").lower() == "close":
+            writer.close()
+        else:
+            self._idle.append((reader, writer))
+        return status, payload
+
+    async def aclose(self) -> None:
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+class _TimescaleAsync:
+    """INSERT ... ON CONFLICT through pooled psycopg ``AsyncConnection``s."""
+
+    def __init__(self, repo: "AsyncRepo"):
+        self.repo = repo
+        self._idle: list = []
+
+    async def insert(self, batch: RowBatch) -> None:
+        conn = self._idle.pop() if self._idle else await self.repo._pg_connect()
+        sql, args = self.repo._insert_sql(batch)
+        try:
+            async with conn.cursor() as cur:
+                await cur.execute(sql, args)
+        except BaseException:
+            await conn.close()
+            raise
+        self._idle.append(conn)
+
+    async def aclose(self) -> None:
+        for conn in self._idle:
+            await conn.close()
+        self._idle.clear()
+
+
+class AsyncRepo(Repo):
+    """Repo whose backend writes run on an asyncio event loop (see module docstring)."""
+
+    def __init__(self, cfg: RepoConfig):
+        super().__init__(cfg)
+        if cfg.backend == "timescale" and cfg.timescale_write == "copy":
+            logging.warning("AsyncRepo has no COPY path; using INSERT")
+        # one event loop thread replaces the writer threads
+        self.threads = [threading.Thread(target=lambda: asyncio.run(self._main()), daemon=True)]
+        self.thread = self.threads[0]
+
+    def _connect(self):
+        return None  # connections are opened on the event loop
+
+    async def _pg_connect(self):
+        import psycopg
+
+        return await psycopg.AsyncConnection.connect(self.cfg.timescale_dsn, autocommit=True)
+
+    def _backend(self) -> _ClickHouseHTTP | _TimescaleAsync | None:
+        if self.cfg.backend == "clickhouse":
+            return _ClickHouseHTTP(self.cfg)
+        if self.cfg.backend == "timescale":
+            return _TimescaleAsync(self)
+        return None
+
+    def _next_item(self, timeout: float):
+        try:
+            return self.q.get(timeout=timeout) if timeout > 0 else self.q.get_nowait()
+        except queue.Empty:
+            return None
+
+    async def _main(self) -> None:
+        """Batch queued rows as Repo's writer loop does, but hand every full batch to a
+        task and move on; ``max_inflight`` bounds the tasks running at once."""
+        loop = asyncio.get_running_loop()
+        backend = self._backend()
+        slots = asyncio.Semaphore(max(1, self.cfg.max_inflight))
+        tasks: set[asyncio.Task] = set()
+        pending: list = []
+        buffered = 0
+        interval = self.cfg.flush_interval_ms / 1000
+        last = loop.time()
+        # the blocking queue.get runs on a helper thread, so the loop keeps serving inserts
+        with ThreadPoolExecutor(max_workers=1) as getter:
+            while True:
+                stopping = self.stop_flag
+                timeout = 0.0 if stopping else max(0.001, interval - (loop.time() - last))
+                item = await loop.run_in_executor(getter, self._next_item, timeout)
+                if item is not None:
+                    buffered += self._take(item, pending)
+                if buffered and (buffered >= self.cfg.batch_size or item is None):
+                    await slots.acquire()
+                    w = self._writers[0]
+                    ranges, w.ranges = w.ranges, []
+                    task = loop.create_task(self._flush_async(backend, pending, ranges, slots))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    pending, buffered = [], 0
+                if item is None:
+                    last = loop.time()
+                    if stopping:
+                        break
+            await asyncio.gather(*tasks)
+        if backend is not None:
+            await backend.aclose()
+
+    async def _flush_async(
+        self, backend, pending: list, ranges: list[tuple[int, int]], slots: asyncio.Semaphore
+    ) -> None:
+        rows = _combine(pending)
+        try:
+            out, keys = self._dedupe_rows(rows)
+            ok = True
+            if out.n:
+                t0 = time.time()
+                ok, attempts = await self._write_with_retries_async(backend, out)
+                self._record_write(rows, out, keys, ok, attempts, time.time() - t0)
+            if ok:
+                self._mark_flushed(ranges)
+        except Exception:
+            logging.exception("async flush of %d rows failed", rows.n)
+        finally:
+            slots.release()
+            self._buffered.dec(rows.n)
+            self._settle(sum(end - start for start, end in ranges))
+
+    async def _write_with_retries_async(
+        self, backend, rows: RowBatch, max_attempts: int = 5
+    ) -> tuple[bool, int]:
+        """``Repo._write_with_retries`` with the backoff awaited instead of slept."""
+        if backend is None:
+            return True, 0
+        attempts = 0
+        while attempts < max_attempts:
+            try:
+                await backend.insert(rows)
+                return True, attempts
+            except Exception:
+                attempts += 1
+                self._count("batch_retry_count")
+                await asyncio.sleep(backoff(attempts))
+        return False, attempts
@@ -0,0 +1,225 @@
+"""Content-addressed cache of run_ab results.
+
+A run is keyed by the SHA-256 of everything its output depends on: the fill parameters,
+the row timestamp format, a digest of each leg's contents and a digest of the hcebt and
+lib sources (``code_version``). run_id is left out: it only labels rows, so a hit under a
+new run_id replays the cached rows with the new id instead of simulating again.
+
+An entry is a directory ``<dir>/<key>/`` holding ``result.json`` (leg results, the Repo
+summary and the destinations its rows already reached) and the row batches the run
+submitted, one JSON line per batch (``rows-*.jsonl``, without the run_id column). Entries
+are staged in a hidden directory and published with one rename, so an interrupted or
+concurrent run never leaves a partial entry visible. Hits refresh the entry's mtime, and
+once the cache grows past ``max_bytes`` the least recently used entries are removed.
+
+Legs are digested by content: JSONL files and tick store directories by their bytes,
+in-memory rows and columns by their values. Any other iterable cannot be digested without
+consuming it, so such runs are not cached.
+"""
+
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+import functools
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from .checkpoint import write_json_atomic
+from .config import RunConfig
+from .events import is_columnar
+from .persistence import RowBatch
+from .spill import _pid_alive
+from .streaming import JsonlStream
+from .tickstore import TickStore
+
+RESULT_FILE = "result.json"
+_READ = 1 << 20
+
+
+@functools.lru_cache(maxsize=1)
+def code_version() -> str:
+    """Digest of every hcebt and lib source file, plus the NumPy version."""
+    h = hashlib.sha256(np.__version__.encode())
+    pkg = os.path.dirname(os.path.abspath(__file__))
+    for root in (pkg, os.path.join(os.path.dirname(pkg), "lib")):
+        for name in sorted(os.listdir(root)):
+            if name.endswith(".py"):
+                h.update(name.encode())
+                _hash_file(h, os.path.join(root, name))
+    return h.hexdigest()
+
+
+def _hash_file(h, path: str) -> None:
+    with open(path, "rb") as fh:
+        while block := fh.read(_READ):
+            h.update(block)
+
+
+def _hash_columns(h, cols: Mapping) -> None:
+    for name in sorted(cols):
+        arr = np.asarray(cols[name])
+        h.update(f"{name}:{arr.dtype.str}:{len(arr)}".encode())
+        if arr.dtype.kind == "O":
+            h.update(json.dumps(arr.tolist(), default=str).encode())
+        else:
+            h.update(np.ascontiguousarray(arr).data)
+
+
+def leg_digest(data) -> str | None:
+    """Content digest of a run_ab leg, or None for a leg that cannot be digested."""
+    h = hashlib.sha256()
+    if isinstance(data, TickStore):
+        h.update(b"tickstore")
+        for root, dirs, files in os.walk(data.path):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                h.update(os.path.relpath(path, data.path).encode())
+                _hash_file(h, path)
+    elif isinstance(data, JsonlStream):
+        h.update(b"jsonl")
+        _hash_file(h, data.path)
+    elif is_columnar(data):
+        h.update(b"columns")
+        _hash_columns(h, data)
+    elif isinstance(data, list | tuple):
+        h.update(b"rows")
+        h.update(json.dumps(list(data), sort_keys=True, default=str).encode())
+    else:
+        return None
+    return h.hexdigest()
+
+
+def run_key(cfg: RunConfig, A, B) -> str | None:
+    """Cache key of ``run_ab(cfg, A, B)``, or None when a leg cannot be digested."""
+    legs = [leg_digest(A), leg_digest(B)]
+    if None in legs:
+        return None
+    payload = {
+        "fill": cfg.fill.model_dump(),
+        "ts_format": cfg.batch.ts_format,
+        "legs": legs,
+        "code": code_version(),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def destination(cfg: RunConfig) -> list | None:
+    """Where the run's rows land: [run_id, backend, endpoint, table], or None without a
+    backend."""
+    batch = cfg.batch
+    if batch.backend == "none":
+        return None
+    endpoint = batch.clickhouse_url if batch.backend == "clickhouse" else batch.timescale_dsn
+    return [cfg.run_id, batch.backend, endpoint, batch.table]
+
+
+class RowRecorder:
+    """Appends submitted row batches, minus run_id, to one ``rows-*.jsonl`` file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = None
+
+    def write(self, rows: RowBatch) -> None:
+        if self._fh is None:
+            self._fh = open(self.path, "w", encoding="utf-8")
+        cols = {c: rows.column(c) for c in rows.columns if c != "run_id"}
+        self._fh.write(json.dumps({"n": rows.n, "columns": cols}, separators=(",", ":")))
+        self._fh.write("\n")
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+class RunCache:
+    def __init__(self, path: str, max_bytes: int):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        os.makedirs(self.path, exist_ok=True)
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.path, key)
+
+    def get(self, key: str) -> dict | None:
+        """The cached result (see ``commit``), refreshing its LRU position; None on a miss."""
+        path = os.path.join(self._entry(key), RESULT_FILE)
+        try:
+            with open(path, encoding="utf-8") as fh:
+                result = json.load(fh)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            logging.warning("%s: unreadable cache entry, ignoring it", path)
+            return None
+        os.utime(path)
+        return result
+
+    def rows(self, key: str, run_id: str) -> Iterator[RowBatch]:
+        """The entry's row batches in submission order, labelled with ``run_id``."""
+        entry = self._entry(key)
+        for name in sorted(n for n in os.listdir(entry) if n.startswith("rows-")):
+            with open(os.path.join(entry, name), encoding="utf-8") as fh:
+                for line in fh:
+                    rec = json.loads(line)
+                    n = rec["n"]
+                    yield RowBatch({"run_id": [run_id] * n, **rec["columns"]}, n)
+
+    @contextmanager
+    def staging(self) -> Iterator[str]:
+        """A private directory to record a run into; removed unless ``commit`` published
+        it."""
+        staged = tempfile.mkdtemp(prefix=f".{os.getpid()}-", dir=self.path)
+        try:
+            yield staged
+        finally:
+            shutil.rmtree(staged, ignore_errors=True)
+
+    def commit(self, key: str, staged: str, result: dict) -> None:
+        """Write ``result`` into ``staged`` and publish it as the entry for ``key``."""
+        write_json_atomic(os.path.join(staged, RESULT_FILE), result)
+        try:
+            os.rename(staged, self._entry(key))
+        except OSError:
+            if not os.path.isdir(self._entry(key)):
+                raise
+            # another run published the same key first; its entry is equivalent
+        self.evict()
+
+    def mark_persisted(self, key: str, dest: list) -> None:
+        """Record that the entry's rows have reached ``dest`` (see ``destination``)."""
+        result = self.get(key)
+        if result is not None and dest not in result["persisted"]:
+            result["persisted"].append(dest)
+            write_json_atomic(os.path.join(self._entry(key), RESULT_FILE), result)
+
+    def evict(self) -> None:
+        """Drop least recently used entries until the cache fits in ``max_bytes``, and
+        staging directories left by processes that are no longer running."""
+        entries = []
+        for name in os.listdir(self.path):
+            path = os.path.join(self.path, name)
+            if name.startswith("."):
+                pid = name[1:].split("-", 1)[0]
+                if pid.isdigit() and not _pid_alive(int(pid)):
+                    shutil.rmtree(path, ignore_errors=True)
+                continue
+            try:
+                used = os.path.getmtime(os.path.join(path, RESULT_FILE))
+                size = sum(e.stat().st_size for e in os.scandir(path))
+            except OSError:  # removed concurrently
+                continue
+            entries.append((used, size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
@@ -0,0 +1,131 @@
+"""Checkpoints that let an interrupted sequential run_ab continue where it stopped.
+
+Every ``cfg.checkpoint.every_events`` events the runner waits until the Repo has written
+everything submitted so far (``Repo.flush_barrier``, the flush high-water mark) and then
+saves, atomically, to ``run_artifacts/<run_id>.ckpt``:
+
+- the leg in progress, how many of its events were consumed and the finished legs' results;
+- that leg's counters, exact ``KahanSum`` state and rows not yet submitted;
+- the fill model's RNG state (``EventRNG`` draws are keyed by event and need none);
+- the Repo's row sequence position, dedupe index and counters.
+
+Between checkpoints the Repo records the row ranges it has written in
+``run_artifacts/<run_id>.progress.json``. A resumed run (``cfg.checkpoint.resume``,
+``--resume``) restores the checkpoint, skips the consumed events and simulates the rest.
+It submits the same batches as the interrupted run, and those the progress file shows as
+written are not written again, so every row reaches the backend once and the leg results
+equal those of an uninterrupted run (apart from ``events_per_sec``). Resuming needs the
+same inputs, fill config, batch size and ts format; all but the inputs are checked.
+"""
+
+from collections.abc import Iterable, Iterator
+import hashlib
+import json
+import logging
+import os
+import pickle
+
+from .config import RunConfig
+from .events import column_length, is_columnar
+
+
+def write_json_atomic(path: str, obj) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(obj, fh)
+    os.replace(tmp, path)
+
+
+def add_range(ranges: list[list[int]], start: int, end: int) -> None:
+    """Insert [start, end) into sorted, disjoint ``ranges``, merging adjacent ones."""
+    if start >= end:
+        return
+    kept = []
+    for r in ranges:
+        if r[1] < start or r[0] > end:
+            kept.append(r)
+        else:
+            start, end = min(start, r[0]), max(end, r[1])
+    kept.append([start, end])
+    ranges[:] = sorted(kept)
+
+
+def covers(ranges: list[list[int]], start: int, end: int) -> bool:
+    return any(lo <= start and end <= hi for lo, hi in ranges)
+
+
+def skip_events(chunks: Iterable, n: int) -> Iterator:
+    """The chunks of a leg without its first ``n`` events."""
+    for chunk in chunks:
+        if n <= 0:
+            yield chunk
+            continue
+        size = column_length(chunk) if is_columnar(chunk) else len(chunk)
+        if n < size:
+            yield {k: v[n:] for k, v in chunk.items()} if is_columnar(chunk) else chunk[n:]
+        n -= size
+
+
+def fingerprint(cfg: RunConfig) -> str:
+    """Digest of the settings a checkpoint is only valid for."""
+    payload = {
+        "fill": cfg.fill.model_dump(),
+        "batch_size": cfg.batch.batch_size,
+        "ts_format": cfg.batch.ts_format,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class Checkpointer:
+    """Checkpoint and progress files of one run (see module docstring)."""
+
+    def __init__(self, cfg: RunConfig, directory: str = "run_artifacts"):
+        self.every = cfg.checkpoint.every_events
+        self.path = os.path.join(directory, f"{cfg.run_id}.ckpt")
+        self.progress_path = os.path.join(directory, f"{cfg.run_id}.progress.json")
+        self.fingerprint = fingerprint(cfg)
+        self._next = self.every
+
+    def load(self) -> dict | None:
+        """The last checkpoint, or None if there is none."""
+        try:
+            with open(self.path, "rb") as fh:
+                state = pickle.load(fh)
+        except FileNotFoundError:
+            logging.info("%s: no checkpoint, starting from the beginning", self.path)
+            return None
+        if state["fingerprint"] != self.fingerprint:
+            raise ValueError(
+                f"{self.path} was written with a different fill config, batch size or "
+                "ts format; rerun without resume"
+            )
+        self._next = state["events"] + self.every
+        return state
+
+    def written(self) -> list[list[int]]:
+        """Row ranges written since the last checkpoint, from the progress file."""
+        try:
+            with open(self.progress_path, encoding="utf-8") as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return []
+
+    def due(self, events: int) -> bool:
+        return self.every > 0 and events >= self._next
+
+    def save(self, events: int, state: dict) -> None:
+        """Write ``state`` (taken after ``events`` events of the run) atomically."""
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            pickle.dump({"fingerprint": self.fingerprint, "events": events, **state}, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, self.path)
+        self._next = events + self.every
+
+    def clear(self) -> None:
+        for path in (self.path, self.progress_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,131 @@
+"""Cross-batch primary-key dedupe over 64-bit key hashes.
+
+Rows are keyed by a 64-bit hash of (run_id, ts, symbol, metric) plus the row's label, so
+the A and B legs of a run never dedupe against each other. The hash is computed column by
+column with NumPy: numeric columns are mixed from their raw bits, strings are folded one
+code point at a time across the whole column, and any other value is hashed once per
+distinct value (blake2b of its repr). Two different keys share a hash with probability
+about n**2 / 2**65, i.e. negligible for the key counts kept here.
+
+``KeyIndex`` remembers the hashes of written and in-flight rows across flushes in sorted
+uint64 segments. Recent keys are merged into a tail segment; once the tail holds
+``max_keys // SEGMENTS`` keys it is frozen, and the oldest frozen segments are evicted
+once more than ``max_keys`` keys are held. Because ts grows monotonically within a run,
+insertion-order (FIFO) eviction forgets the oldest timestamps first, and memory stays at
+about 8 bytes per key.
+"""
+
+from collections import deque
+from collections.abc import Sequence
+import hashlib
+
+import numpy as np
+
+SEGMENTS = 8
+_M1 = np.uint64(0xBF58476D1CE4E5B9)
+_M2 = np.uint64(0x94D049BB133111EB)
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _mix(h: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer (wrapping uint64 arithmetic)."""
+    h = (h ^ (h >> np.uint64(30))) * _M1
+    h = (h ^ (h >> np.uint64(27))) * _M2
+    return h ^ (h >> np.uint64(31))
+
+
+def _value_hash(value) -> int:
+    return int.from_bytes(hashlib.blake2b(repr(value).encode(), digest_size=8).digest(), "little")
+
+
+def _str_hash(arr: np.ndarray) -> np.ndarray:
+    """Fold the UCS-4 code points of a 'U' array; NUL padding is skipped, so the hash of a
+    string does not depend on the array's itemsize."""
+    width = arr.dtype.itemsize // 4
+    codes = np.ascontiguousarray(arr).view(np.uint32).reshape(len(arr), width)
+    h = np.full(len(arr), _GOLDEN, dtype=np.uint64)
+    for j in range(width):
+        c = codes[:, j].astype(np.uint64)
+        h = np.where(c != 0, _mix(h ^ c), h)
+    return h
+
+
+def column_hash(values: Sequence) -> np.ndarray:
+    """uint64 hash per value of one key column."""
+    arr = np.asarray(values)
+    if arr.dtype.kind in "iub":
+        return _mix(arr.astype(np.int64).view(np.uint64))
+    if arr.dtype.kind == "f":
+        return _mix(arr.astype(np.float64).view(np.uint64))
+    if arr.dtype.kind == "U":
+        return _str_hash(arr)
+    # object / mixed columns: strings as above, anything else once per distinct value
+    items = arr.tolist()
+    out = np.empty(len(items), dtype=np.uint64)
+    strs = [i for i, v in enumerate(items) if isinstance(v, str)]
+    if strs:
+        out[strs] = _str_hash(np.array([items[i] for i in strs], dtype=str))
+    cache: dict = {}
+    for i, v in enumerate(items):
+        if isinstance(v, str):
+            continue
+        h = cache.get((type(v), v))
+        if h is None:
+            h = cache[(type(v), v)] = _value_hash(v)
+        out[i] = h
+    return out
+
+
+def key_hashes(columns: Sequence[Sequence]) -> np.ndarray:
+    """Combined uint64 hash of several equal-length key columns."""
+    with np.errstate(over="ignore"):
+        h = np.zeros(len(columns[0]), dtype=np.uint64)
+        for col in columns:
+            h = _mix((h * _GOLDEN) ^ column_hash(col))
+    return h
+
+
+def first_occurrences(keys: np.ndarray) -> np.ndarray:
+    """Boolean mask of the first occurrence of every key, in input order."""
+    mask = np.zeros(len(keys), dtype=bool)
+    mask[np.unique(keys, return_index=True)[1]] = True
+    return mask
+
+
+class KeyIndex:
+    """Bounded set of uint64 key hashes with FIFO eviction (see module docstring)."""
+
+    def __init__(self, max_keys: int = 1_000_000):
+        self.max_keys = max_keys
+        self.tail_keys = max(1, max_keys // SEGMENTS)
+        self._frozen: deque[np.ndarray] = deque()
+        self._tail = np.empty(0, dtype=np.uint64)
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._tail) + sum(len(s) for s in self._frozen)
+
+    def contains(self, keys: np.ndarray) -> np.ndarray:
+        hit = np.zeros(len(keys), dtype=bool)
+        for seg in (*self._frozen, self._tail):
+            if len(seg):
+                pos = np.searchsorted(seg, keys).clip(max=len(seg) - 1)
+                hit |= seg[pos] == keys
+        return hit
+
+    def add(self, keys: np.ndarray) -> None:
+        if not len(keys):
+            return
+        self._tail = np.union1d(self._tail, keys)
+        if len(self._tail) >= self.tail_keys:
+            self._frozen.append(self._tail)
+            self._tail = np.empty(0, dtype=np.uint64)
+        while self._frozen and len(self) > self.max_keys:
+            self.evicted += len(self._frozen.popleft())
+
+    def discard(self, keys: np.ndarray) -> None:
+        """Forget ``keys``, e.g. reserved for a write that then failed."""
+        if not len(keys):
+            return
+        self._tail = self._tail[~np.isin(self._tail, keys)]
+        self._frozen = deque(s[~np.isin(s, keys)] for s in self._frozen)
@@ -0,0 +1,103 @@
+"""Columnar (struct-of-arrays) event inputs for the runner.
+
+A columnar leg is a mapping of event field name -> array, using the same field names as the
+row-oriented event dicts (``ts``, ``symbol``, ``bid``, ``ask``, ``last``, ``vol``, ``side``,
+``type``, ``qty``, ``limit``, ``stop``, ``queue_pos``, ``id``). Optional fields fall back to
+the same defaults the scalar simulate loop applies per event.
+"""
+
+from collections.abc import Mapping
+from typing import Any
+
+import numpy as np
+
+REQUIRED_COLUMNS = ("ts", "symbol", "bid", "ask", "last")
+# optional column -> default used when the column (or a row value) is missing
+COLUMN_DEFAULTS: dict[str, Any] = {
+    "vol": 1.0,
+    "side": 1,
+    "type": "market",
+    "qty": 1.0,
+    "limit": None,
+    "stop": None,
+    "queue_pos": 0.5,
+    "id": 0,
+}
+
+
+def event_sort_key(e: Mapping[str, Any]) -> tuple:
+    """Deterministic replay order for row events: (ts, symbol, id)."""
+    return (e.get("ts"), e.get("symbol"), e.get("id", 0))
+
+
+def is_columnar(data: Any) -> bool:
+    """True when a leg is given as a mapping of column arrays rather than a list of events."""
+    return isinstance(data, Mapping)
+
+
+def column_length(cols: Mapping[str, Any]) -> int:
+    return len(cols["ts"])
+
+
+def to_columns(events: list[dict]) -> dict[str, np.ndarray]:
+    """Pivot a list of event dicts into column arrays (missing values -> defaults)."""
+    cols: dict[str, np.ndarray] = {}
+    for k in REQUIRED_COLUMNS:
+        cols[k] = np.asarray([ev[k] for ev in events])
+    for k, default in COLUMN_DEFAULTS.items():
+        vals = [ev.get(k, default) for ev in events]
+        if k in ("limit", "stop"):
+            cols[k] = np.array([np.nan if v is None else v for v in vals], dtype=np.float64)
+        else:
+            cols[k] = np.asarray(vals)
+    return cols
+
+
+def concat_columns(chunks: list[Mapping[str, Any]]) -> dict[str, np.ndarray]:
+    """Concatenate columnar chunks that share the same column names."""
+    if not chunks:
+        return {}
+    return {k: np.concatenate([np.asarray(c[k]) for c in chunks]) for k in chunks[0]}
+
+
+def sort_columns(cols: Mapping[str, Any]) -> dict[str, np.ndarray]:
+    """Stable sort by (ts, symbol, id), matching the runner's row sort key."""
+    arrays = {k: np.asarray(v) for k, v in cols.items()}
+    n = column_length(arrays)
+    ids = arrays.get("id", np.zeros(n, dtype=np.int64))
+    order = np.lexsort((ids, arrays["symbol"], arrays["ts"]))
+    return {k: v[order] for k, v in arrays.items()}
+
+
+def with_defaults(cols: Mapping[str, Any]) -> dict[str, np.ndarray]:
+    """Columns as arrays, with missing optional columns filled from COLUMN_DEFAULTS."""
+    n = column_length(cols)
+    out = {k: np.asarray(v) for k, v in cols.items()}
+    for name, default in COLUMN_DEFAULTS.items():
+        if name not in out:
+            out[name] = np.full(n, np.nan if default is None else default)
+    return out
+
+
+def fill_inputs(cols: Mapping[str, Any]) -> dict[str, np.ndarray]:
+    """Keyword arguments for ShadowFillModel.fill_batch with per-event defaults applied."""
+    cols = with_defaults(cols)
+    col = cols.__getitem__
+    bid = np.asarray(cols["bid"], dtype=np.float64)
+    ask = np.asarray(cols["ask"], dtype=np.float64)
+    return {
+        "ts": np.asarray(cols["ts"]),
+        "bid": bid,
+        "ask": ask,
+        "last": np.asarray(cols["last"], dtype=np.float64),
+        "spread": ask - bid,
+        "volume": col("vol").astype(np.float64),
+        "side": col("side"),
+        "order_type": col("type"),
+        "qty": col("qty").astype(np.float64),
+        "limit_price": col("limit"),
+        "stop_price": col("stop"),
+        "queue_pos": col("queue_pos").astype(np.float64),
+        "event_id": col("id"),
+        "symbol": np.asarray(cols["symbol"]),
+    }
@@ -1,11 +1,14 @@
-from collections.abc import Mapping
+from collections.abc import Callable, Mapping
 from dataclasses import dataclass
+import logging
 from typing import Any
 
 import numpy as np
 
+from .rng import EventRNG
 
-@dataclass
+
+@dataclass(slots=True)
 class MarketSnapshot:
     ts: int
     last: float
@@ -16,7 +19,7 @@ class MarketSnapshot:
     volume: float
 
 
-@dataclass
+@dataclass(slots=True)
 class OrderIntent:
     side: int  # +1 buy, -1 sell
     order_type: str  # market|limit|stop|stop-limit
@@ -30,8 +33,16 @@ class OrderIntent:
 # Return type alias used by public fill methods
 FillTuple = tuple[float, float, float, str]
 
+# Integer codes used by the columnar (fill_batch) path
+ORDER_TYPES = ("market", "limit", "stop", "stop-limit")
+FILL_STATUSES = ("filled", "resting", "no_fill", "triggered", "partial")
+OT_MARKET, OT_LIMIT, OT_STOP, OT_STOP_LIMIT = range(len(ORDER_TYPES))
+ST_FILLED, ST_RESTING, ST_NO_FILL, ST_TRIGGERED, ST_PARTIAL = range(len(FILL_STATUSES))
+_ORDER_TYPE_CODES = {name: code for code, name in enumerate(ORDER_TYPES)}
+PARTIAL_FILL_STREAM = 1  # EventRNG stream of the partial fill draws
 
-@dataclass
+
+@dataclass(slots=True)
 class FillResult:
     price: float
     filled_qty: float
@@ -39,7 +50,66 @@ class FillResult:
     status: str
 
 
+@dataclass
+class FillBatch:
+    """Struct-of-arrays counterpart of FillResult; ``status`` holds FILL_STATUSES codes."""
+
+    price: np.ndarray
+    filled_qty: np.ndarray
+    slip_cost: np.ndarray
+    status: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+    def result(self, i: int) -> FillResult:
+        return FillResult(
+            price=float(self.price[i]),
+            filled_qty=float(self.filled_qty[i]),
+            slip_cost=float(self.slip_cost[i]),
+            status=FILL_STATUSES[int(self.status[i])],
+        )
+
+
+def encode_order_types(values: Any) -> np.ndarray:
+    """Map order type names (or pass through integer codes) to ORDER_TYPES codes; unknown -> -1."""
+    arr = np.asarray(values)
+    if arr.dtype.kind in "iu":
+        return arr.astype(np.int8, copy=False)
+    uniq, inv = np.unique(arr.astype(str), return_inverse=True)
+    lut = np.array([_ORDER_TYPE_CODES.get(u, -1) for u in uniq.tolist()], dtype=np.int8)
+    return lut[inv.reshape(arr.shape)]
+
+
+def optional_prices(values: Any, n: int) -> np.ndarray:
+    """Float array with NaN standing in for a missing (None) limit/stop price."""
+    if values is None:
+        return np.full(n, np.nan)
+    arr = np.asarray(values)
+    if arr.dtype == object:
+        arr = np.array([np.nan if v is None else v for v in arr.tolist()], dtype=np.float64)
+    return arr.astype(np.float64, copy=False)
+
+
+def _spread(snap: MarketSnapshot) -> float:
+    spread = snap.spread
+    return spread if spread is not None else max(0.0, snap.ask - snap.bid)
+
+
 class ShadowFillModel:
+    """Deterministic fills for market/limit/stop/stop-limit orders.
+
+    ``fill`` takes a typed fast path when given a ``MarketSnapshot`` and an ``OrderIntent``:
+    it reads their attributes directly and calls the slip function resolved for the mode
+    once at construction. Dicts and other duck-typed inputs go through the mapping adapter
+    (``market_fill`` and friends). Both paths perform the same float operations, so results
+    match bit for bit.
+
+    ``partial_fills`` opts ``fill_batch`` into probabilistic limit fills (full, partial or
+    none; see ``_partial_batch``). The draws are keyed by event, so results do not depend
+    on batching or sharding. ``fill`` itself stays deterministic.
+    """
+
     def __init__(
         self,
         slip_mode: Any = "bps",
@@ -49,6 +119,8 @@ class ShadowFillModel:
         hybrid_weight: float = 0.5,
         bid_ask_aware: bool = True,
         seed: int = 42,
+        engine: str = "numpy",
+        partial_fills: bool = False,
     ):
         # Allow passing a config object as the first positional arg
         if not isinstance(slip_mode, str) and hasattr(slip_mode, "slip_mode"):
@@ -66,6 +138,67 @@ class ShadowFillModel:
         self.hybrid_weight = float(hybrid_weight)
         self.bid_ask_aware = bool(bid_ask_aware)
         self.rng = np.random.default_rng(int(seed))
+        # per-event draws that do not depend on batching or sharding (see hcebt.rng)
+        self.event_rng = EventRNG(int(seed))
+        self._slip_fn = self._resolve_slip()
+        self.engine = str(engine)
+        self.partial_fills = bool(partial_fills)
+        self._kernel = self._resolve_kernel()
+
+    def _resolve_slip(self) -> Callable[[float, MarketSnapshot, int], float]:
+        """``slip(ref, snap, side)`` for this model's mode; the parameters are read once, so
+        they are fixed after construction."""
+        ticks = self.ticks
+        k_bps = self.bps / 1e4
+        k_spread = self.pct_spread / 100.0
+        w = self.hybrid_weight
+        w_spread = 1 - w
+
+        def fixed_ticks(ref: float, snap: MarketSnapshot, side: int) -> float:
+            return ticks if side > 0 else -ticks
+
+        def bps(ref: float, snap: MarketSnapshot, side: int) -> float:
+            s = ref * k_bps
+            return s if side > 0 else -s
+
+        def pct_spread(ref: float, snap: MarketSnapshot, side: int) -> float:
+            s = _spread(snap) * k_spread
+            return s if side > 0 else -s
+
+        def hybrid(ref: float, snap: MarketSnapshot, side: int) -> float:
+            s = w * (ref * k_bps) + w_spread * (_spread(snap) * k_spread)
+            return s if side > 0 else -s
+
+        def no_slip(ref: float, snap: MarketSnapshot, side: int) -> float:
+            return 0.0
+
+        modes = {"fixed_ticks": fixed_ticks, "bps": bps, "pct_spread": pct_spread}
+        modes["hybrid"] = hybrid
+        return modes.get(self.slip_mode, no_slip)
+
+    def _resolve_kernel(self) -> Callable | None:
+        """The compiled fill loop for ``engine="numba"``, or None to use the NumPy path
+        (the default, and the fallback when Numba is not installed)."""
+        if self.engine != "numba":
+            return None
+        from .kernels import compiled_fill_loop
+
+        if compiled_fill_loop is None:
+            logging.warning("fill engine 'numba' requested but numba is not installed; using numpy")
+        return compiled_fill_loop
+
+    def _kernel_params(self) -> tuple:
+        """Scalar arguments of hcebt.kernels.fill_loop for this model."""
+        from .kernels import SLIP_MODES
+
+        return (
+            SLIP_MODES.get(self.slip_mode, -1),
+            self.ticks,
+            self.bps / 1e4,
+            self.pct_spread / 100.0,
+            self.hybrid_weight,
+            self.bid_ask_aware,
+        )
 
     def _slip(self, snap: Mapping[str, Any], side: int) -> float:
         bid = float(snap.get("bid", snap.get("last", 0.0)))
@@ -88,6 +221,30 @@ class ShadowFillModel:
             return s if side > 0 else -s
         return 0.0
 
+    def _slip_batch(
+        self,
+        bid: np.ndarray,
+        ask: np.ndarray,
+        last: np.ndarray,
+        spread: np.ndarray,
+        buy: np.ndarray,
+    ) -> np.ndarray:
+        # Same float operations, in the same order, as _slip so results match bit for bit
+        ref = last if not self.bid_ask_aware else np.where(buy, ask, bid)
+        if self.slip_mode == "fixed_ticks":
+            return np.where(buy, self.ticks, -self.ticks)
+        elif self.slip_mode == "bps":
+            s = ref * (self.bps / 1e4)
+        elif self.slip_mode == "pct_spread":
+            s = spread * (self.pct_spread / 100.0)
+        elif self.slip_mode == "hybrid":
+            s_bps = ref * (self.bps / 1e4)
+            s_sp = spread * (self.pct_spread / 100.0)
+            s = self.hybrid_weight * s_bps + (1 - self.hybrid_weight) * s_sp
+        else:
+            return np.zeros_like(bid)
+        return np.where(buy, s, -s)
+
     def _prob_limit_fill(self, snap: Mapping[str, Any], intent: Any) -> float:
         bid = float(snap.get("bid", 0.0))
         ask = float(snap.get("ask", 0.0))
@@ -189,7 +346,47 @@ class ShadowFillModel:
             return (0.0, 0.0, 0.0, "no_fill")
         return self.limit_fill(s, intent)
 
+    def _market_fast(self, snap: MarketSnapshot, side: int, qty: float, status: str):
+        ref = (snap.ask if side > 0 else snap.bid) if self.bid_ask_aware else snap.last
+        slip = self._slip_fn(ref, snap, side)
+        return FillResult(ref + slip, qty, abs(slip) * qty, status)
+
+    def _limit_fast(self, snap: MarketSnapshot, side: int, intent: OrderIntent) -> FillResult:
+        limit_price = intent.limit_price
+        if limit_price is None:
+            return FillResult(0.0, 0.0, 0.0, "no_fill")
+        touch = snap.ask if side > 0 else snap.bid
+        if not ((side > 0 and limit_price >= touch) or (side < 0 and limit_price <= touch)):
+            return FillResult(0.0, 0.0, 0.0, "resting")
+        ref = touch if self.bid_ask_aware else snap.last
+        raw_price = touch + self._slip_fn(ref, snap, side)
+        limit_price = float(limit_price)
+        price = min(raw_price, limit_price) if side > 0 else max(raw_price, limit_price)
+        qty = float(intent.qty)
+        return FillResult(price, qty, abs(price - touch) * qty, "filled")
+
+    def _fill_fast(self, snap: MarketSnapshot, intent: OrderIntent) -> FillResult:
+        ot = intent.order_type
+        side = int(intent.side)
+        if ot == "market":
+            return self._market_fast(snap, side, float(intent.qty), "filled")
+        if ot == "limit":
+            return self._limit_fast(snap, side, intent)
+        if ot != "stop" and ot != "stop-limit":
+            return FillResult(0.0, 0.0, 0.0, "no_fill")
+        stop_price = intent.stop_price
+        last = snap.last
+        if stop_price is None or not (
+            (side > 0 and last >= stop_price) or (side < 0 and last <= stop_price)
+        ):
+            return FillResult(0.0, 0.0, 0.0, "no_fill")
+        if ot == "stop":
+            return self._market_fast(snap, side, float(intent.qty), "triggered")
+        return self._limit_fast(snap, side, intent)
+
     def fill(self, snap: Any, intent: Any) -> FillResult:
+        if type(snap) is MarketSnapshot and type(intent) is OrderIntent:
+            return self._fill_fast(snap, intent)
         ot = getattr(intent, "order_type", getattr(intent, "type", "market"))
         if ot == "market":
             p, q, s, st = self.market_fill(snap, intent)
@@ -202,3 +399,164 @@ class ShadowFillModel:
         else:
             p, q, s, st = (0.0, 0.0, 0.0, "no_fill")
         return FillResult(price=p, filled_qty=q, slip_cost=s, status=st)
+
+    def fill_batch(
+        self,
+        *,
+        bid: Any,
+        ask: Any,
+        last: Any,
+        side: Any,
+        order_type: Any,
+        qty: Any,
+        limit_price: Any = None,
+        stop_price: Any = None,
+        spread: Any = None,
+        ts: Any = None,
+        volume: Any = None,
+        queue_pos: Any = None,
+        event_id: Any = None,
+        symbol: Any = None,
+    ) -> FillBatch:
+        """Vectorized ``fill`` over struct-of-arrays inputs.
+
+        ``order_type`` takes names or ORDER_TYPES codes; missing limit/stop prices are NaN
+        (or None). ``spread`` defaults to ``ask - bid`` as built by the runner. ``ts``,
+        ``volume``, ``queue_pos``, ``event_id`` and ``symbol`` are accepted for parity with
+        MarketSnapshot/OrderIntent but do not affect the deterministic fill logic; with
+        ``partial_fills`` they drive the limit fill probability (see ``_partial_batch``).
+        With ``engine="numba"`` the events go through the compiled single-pass loop in
+        hcebt.kernels, with identical results.
+        """
+        bid = np.asarray(bid, dtype=np.float64)
+        ask = np.asarray(ask, dtype=np.float64)
+        last = np.asarray(last, dtype=np.float64)
+        qty = np.asarray(qty, dtype=np.float64)
+        side = np.asarray(side)
+        n = len(bid)
+        spread = ask - bid if spread is None else np.asarray(spread, dtype=np.float64)
+        ot = encode_order_types(order_type)
+        limit_price = optional_prices(limit_price, n)
+        stop_price = optional_prices(stop_price, n)
+        if self._kernel is not None:
+            from .kernels import run_fill_loop
+
+            out = run_fill_loop(
+                self._kernel, bid, ask, last, spread, side, ot, qty, limit_price, stop_price,
+                self._kernel_params(),
+            )  # fmt: skip
+            fb = FillBatch(*out)
+        else:
+            fb = self._fill_arrays(bid, ask, last, spread, side, ot, qty, limit_price, stop_price)
+        if not self.partial_fills:
+            return fb
+        if event_id is None or ts is None or symbol is None:
+            raise ValueError("partial_fills needs event_id, ts and symbol to key its draws")
+        volume = np.zeros(n) if volume is None else np.asarray(volume, dtype=np.float64)
+        queue_pos = np.full(n, 0.5) if queue_pos is None else np.asarray(queue_pos, np.float64)
+        inputs = (bid, ask, spread, side, ot, qty, limit_price, volume, queue_pos)
+        return self._partial_batch(fb, inputs, (event_id, ts, symbol))
+
+    def _fill_arrays(
+        self,
+        bid: np.ndarray,
+        ask: np.ndarray,
+        last: np.ndarray,
+        spread: np.ndarray,
+        side: np.ndarray,
+        ot: np.ndarray,
+        qty: np.ndarray,
+        limit_price: np.ndarray,
+        stop_price: np.ndarray,
+    ) -> FillBatch:
+        n = len(bid)
+        buy = side > 0
+        sell = side < 0
+
+        slip = self._slip_batch(bid, ask, last, spread, buy)
+        # market (and triggered stop) leg
+        ref = last if not self.bid_ask_aware else np.where(buy, ask, bid)
+        mkt_price = ref + slip
+        mkt_cost = np.abs(slip) * qty
+        # limit (and triggered stop-limit) leg
+        touch = np.where(buy, ask, bid)
+        has_limit = ~np.isnan(limit_price)
+        marketable = has_limit & ((buy & (limit_price >= touch)) | (sell & (limit_price <= touch)))
+        raw_price = touch + slip
+        lim_price = np.where(
+            buy, np.minimum(raw_price, limit_price), np.maximum(raw_price, limit_price)
+        )
+        lim_cost = np.abs(lim_price - touch) * qty
+        # stop triggering; NaN stop prices never compare true
+        trig = (buy & (last >= stop_price)) | (sell & (last <= stop_price))
+
+        use_mkt = (ot == OT_MARKET) | ((ot == OT_STOP) & trig)
+        limit_like = (ot == OT_LIMIT) | ((ot == OT_STOP_LIMIT) & trig)
+        use_lim = limit_like & marketable
+
+        status = np.full(n, ST_NO_FILL, dtype=np.int8)
+        status[ot == OT_MARKET] = ST_FILLED
+        status[(ot == OT_STOP) & trig] = ST_TRIGGERED
+        status[limit_like & has_limit & ~marketable] = ST_RESTING
+        status[use_lim] = ST_FILLED
+        return FillBatch(
+            price=np.where(use_mkt, mkt_price, np.where(use_lim, lim_price, 0.0)),
+            filled_qty=np.where(use_mkt | use_lim, qty, 0.0),
+            slip_cost=np.where(use_mkt, mkt_cost, np.where(use_lim, lim_cost, 0.0)),
+            status=status,
+        )
+
+    def _prob_limit_fill_batch(
+        self,
+        touch: np.ndarray,
+        spread: np.ndarray,
+        side: np.ndarray,
+        limit_price: np.ndarray,
+        volume: np.ndarray,
+        queue_pos: np.ndarray,
+    ) -> np.ndarray:
+        """Vectorized ``_prob_limit_fill`` (edge, volume and queue scores); ``touch`` is the
+        ask for buys and the bid otherwise."""
+        buy = side > 0
+        price_edge = np.where(buy, touch - limit_price, limit_price - touch)
+        edge_score = np.where(
+            price_edge >= 0, 1.0, np.maximum(0.0, 1.0 + price_edge / np.maximum(spread, 1e-9))
+        )
+        vol_score = 1.0 - np.exp(-volume / np.maximum(touch, 1e-9))
+        prob = 0.3 * edge_score + 0.4 * vol_score + 0.3 * (1.0 - queue_pos)
+        return np.clip(prob, 0.0, 1.0)
+
+    def _partial_batch(self, fb: FillBatch, inputs: tuple, keys: tuple) -> FillBatch:
+        """Re-decide limit-like orders (limits and triggered stop-limits, marketable or
+        resting) with probability ``p = _prob_limit_fill`` and a keyed uniform ``u``
+        (hcebt.rng): the order fills the fraction ``clip(2 (p - u) / p, 0, 1)`` of its qty,
+        i.e. fully for ``u <= p/2``, partially (status ``"partial"``) up to ``u < p`` and
+        not at all (it rests) beyond.
+
+        Marketable orders keep their deterministic price; resting ones fill passively at
+        their limit price with no slip cost. Only the candidate rows are scored and drawn.
+        """
+        bid, ask, spread, side, ot, qty, limit_price, volume, queue_pos = inputs
+        # statuses up to ST_RESTING are filled or resting
+        limit_like = (ot == OT_LIMIT) | (ot == OT_STOP_LIMIT)
+        idx = np.flatnonzero(limit_like & (fb.status <= ST_RESTING))
+        if not len(idx):
+            return fb
+        event_id, ts, symbol = (np.asarray(k)[idx] for k in keys)
+        lim = limit_price[idx]
+        side = side[idx]
+        touch = np.where(side > 0, ask[idx], bid[idx])
+        p = self._prob_limit_fill_batch(touch, spread[idx], side, lim, volume[idx], queue_pos[idx])
+        u = self.event_rng.uniform(event_id, ts, symbol, stream=PARTIAL_FILL_STREAM)
+        frac = np.clip(2.0 * (p - u) / np.maximum(p, 1e-300), 0.0, 1.0)
+        resting = fb.status[idx] == ST_RESTING
+        filled = qty[idx] * frac
+        price = np.where(resting, lim, fb.price[idx])
+        # fb's arrays are fresh from this fill_batch call, so they are updated in place
+        fb.price[idx] = np.where(frac > 0, price, 0.0)
+        fb.filled_qty[idx] = filled
+        fb.slip_cost[idx] = np.where(resting, 0.0, np.abs(price - touch) * filled)
+        fb.status[idx] = np.where(
+            frac == 1.0, ST_FILLED, np.where(frac > 0, ST_PARTIAL, ST_RESTING)
+        )
+        return fb
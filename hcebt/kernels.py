@@ -0,0 +1,132 @@
+"""Optional compiled fill kernel.
+
+``fill_loop`` is ShadowFillModel.fill_batch written as one fused loop over the columns:
+each event's slip, trigger, marketability and result are computed in a single pass,
+without the masked temporaries the NumPy path builds. It performs the same float
+operations in the same order as ``fill_batch``, so the results are identical.
+
+When Numba is installed, ``compiled_fill_loop`` is the loop compiled with ``numba.njit``
+(CPU, nogil, cached on disk). Otherwise it is None and callers fall back to NumPy. The plain
+Python ``fill_loop`` is kept for parity tests; it is far too slow for real runs.
+"""
+
+import numpy as np
+
+try:  # optional dependency
+    import numba
+except ImportError:  # pragma: no cover - depends on the environment
+    numba = None
+
+from .fills import (
+    OT_LIMIT,
+    OT_MARKET,
+    OT_STOP,
+    OT_STOP_LIMIT,
+    ST_FILLED,
+    ST_NO_FILL,
+    ST_RESTING,
+    ST_TRIGGERED,
+)
+
+NUMBA_AVAILABLE = numba is not None
+# slip mode codes understood by fill_loop; anything else means no slip
+SLIP_MODES = {"fixed_ticks": 0, "bps": 1, "pct_spread": 2, "hybrid": 3}
+
+
+def _jit(fn):
+    return numba.njit(cache=True, nogil=True)(fn) if NUMBA_AVAILABLE else fn
+
+
+@_jit
+def slip_at(mode, ticks, k_bps, k_spread, weight, ref, spread, buy):
+    """Signed slip of one event, as ShadowFillModel._slip_batch computes it."""
+    if mode == 0:
+        return ticks if buy else -ticks
+    if mode == 1:
+        s = ref * k_bps
+    elif mode == 2:
+        s = spread * k_spread
+    elif mode == 3:
+        s = weight * (ref * k_bps) + (1 - weight) * (spread * k_spread)
+    else:
+        s = 0.0
+    return s if buy else -s
+
+
+def fill_loop(
+    bid,
+    ask,
+    last,
+    spread,
+    side,
+    ot,
+    qty,
+    limit_price,
+    stop_price,
+    mode,
+    ticks,
+    k_bps,
+    k_spread,
+    weight,
+    aware,
+    price_out,
+    qty_out,
+    cost_out,
+    status_out,
+):
+    """Fill every event into the ``*_out`` arrays (see ShadowFillModel.fill_batch)."""
+    for i in range(len(bid)):
+        buy = side[i] > 0
+        sell = side[i] < 0
+        touch = ask[i] if buy else bid[i]
+        ref = touch if aware else last[i]
+        slip = slip_at(mode, ticks, k_bps, k_spread, weight, ref, spread[i], buy)
+        code = ot[i]
+        if code == OT_STOP or code == OT_STOP_LIMIT:
+            stop = stop_price[i]
+            if not ((buy and last[i] >= stop) or (sell and last[i] <= stop)):
+                code = -1  # untriggered: no fill
+            elif code == OT_STOP:
+                code = OT_MARKET
+            else:
+                code = OT_LIMIT
+        price = 0.0
+        filled = 0.0
+        cost = 0.0
+        status = ST_NO_FILL
+        if code == OT_MARKET:
+            price = ref + slip
+            filled = qty[i]
+            cost = abs(slip) * qty[i]
+            status = ST_TRIGGERED if ot[i] == OT_STOP else ST_FILLED
+        elif code == OT_LIMIT:
+            lim = limit_price[i]
+            if lim == lim:  # not NaN
+                if (buy and lim >= touch) or (sell and lim <= touch):
+                    raw = touch + slip
+                    price = min(raw, lim) if buy else max(raw, lim)
+                    filled = qty[i]
+                    cost = abs(price - touch) * qty[i]
+                    status = ST_FILLED
+                else:
+                    status = ST_RESTING
+        price_out[i] = price
+        qty_out[i] = filled
+        cost_out[i] = cost
+        status_out[i] = status
+
+
+compiled_fill_loop = _jit(fill_loop) if NUMBA_AVAILABLE else None
+
+
+def run_fill_loop(loop, bid, ask, last, spread, side, ot, qty, limit_price, stop_price, params):
+    """Allocate the outputs and run ``loop``; ``params`` are (mode, ticks, k_bps, k_spread,
+    weight, aware) as derived from the model."""
+    n = len(bid)
+    price = np.empty(n)
+    filled = np.empty(n)
+    cost = np.empty(n)
+    status = np.empty(n, dtype=np.int8)
+    loop(bid, ask, last, spread, side, ot, qty, limit_price, stop_price, *params,
+         price, filled, cost, status)  # fmt: skip
+    return price, filled, cost, status
@@ -0,0 +1,233 @@
+"""Thread-safe metrics registry with Prometheus text export.
+
+Counters, gauges and fixed-bucket histograms live in a ``MetricsRegistry``. ``summary()``
+returns a plain, picklable dict (so process-pool workers can send theirs back), and
+``merge_summaries`` combines several of them: counters, gauges and histogram buckets are
+summed. Histogram quantiles are estimated from the buckets by linear interpolation, the
+same way Prometheus' ``histogram_quantile`` does.
+"""
+
+import bisect
+from collections.abc import Callable, Iterable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import math
+import os
+import threading
+
+# seconds; the +Inf bucket is implicit
+LATENCY_BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class Counter:
+    def __init__(self, lock: threading.Lock):
+        self._lock = lock
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    def __init__(self, lock: threading.Lock):
+        self._lock = lock
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+
+class Histogram:
+    def __init__(self, lock: threading.Lock, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self._lock = lock
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot: +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)  # first bucket with value <= le
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+
+class MetricsRegistry:
+    """Named metrics, created on first use and safe to update from any thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: dict[str, tuple[str, str, object]] = {}
+
+    def _get(self, kind: str, name: str, help: str, factory):
+        with self._lock:
+            entry = self._metrics.get(name)
+            if entry is None:
+                entry = self._metrics[name] = (kind, help, factory())
+        if entry[0] != kind:
+            raise ValueError(f"metric {name!r} is a {entry[0]}, not a {kind}")
+        return entry[2]
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        return self._get("counter", name, help, lambda: Counter(self._lock))
+
+    def gauge(self, name: str, help: str = "") -> Gauge:
+        return self._get("gauge", name, help, lambda: Gauge(self._lock))
+
+    def histogram(
+        self, name: str, help: str = "", buckets: Iterable[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._get("histogram", name, help, lambda: Histogram(self._lock, buckets))
+
+    def summary(self) -> dict:
+        out: dict = {"counters": {}, "gauges": {}, "histograms": {}, "help": {}}
+        with self._lock:
+            for name, (kind, help, m) in sorted(self._metrics.items()):
+                out["help"][name] = help
+                if kind == "histogram":
+                    out["histograms"][name] = _histogram_summary(
+                        list(m.buckets), list(m.counts), m.sum, m.count
+                    )
+                else:
+                    out[kind + "s"][name] = m.value
+        return out
+
+    def to_prometheus(self) -> str:
+        return render_prometheus(self.summary())
+
+
+def _quantile(q: float, buckets: list[float], counts: list[int], total: int) -> float | None:
+    if total == 0:
+        return None
+    rank = q * total
+    seen = 0
+    for i, c in enumerate(counts):
+        if c and seen + c >= rank:
+            if i == len(buckets):  # +Inf bucket: report the largest finite bound
+                return buckets[-1] if buckets else None
+            lo = buckets[i - 1] if i else 0.0
+            return lo + (buckets[i] - lo) * (rank - seen) / c
+        seen += c
+    return buckets[-1] if buckets else None
+
+
+def _histogram_summary(buckets: list[float], counts: list[int], total: float, n: int) -> dict:
+    out = {"buckets": buckets, "counts": counts, "sum": total, "count": n}
+    for q in QUANTILES:
+        out[f"p{round(q * 100)}"] = _quantile(q, buckets, counts, n)
+    return out
+
+
+def merge_summaries(summaries: Iterable[dict]) -> dict:
+    """Sum counters, gauges and histogram buckets of several ``summary()`` dicts."""
+    out: dict = {"counters": {}, "gauges": {}, "histograms": {}, "help": {}}
+    for s in summaries:
+        for name, help in s.get("help", {}).items():
+            if help or name not in out["help"]:
+                out["help"][name] = help
+        for kind in ("counters", "gauges"):
+            for name, v in s.get(kind, {}).items():
+                out[kind][name] = out[kind].get(name, 0.0) + v
+        for name, h in s.get("histograms", {}).items():
+            prev = out["histograms"].get(name)
+            if prev is None:
+                out["histograms"][name] = dict(h)
+                continue
+            if prev["buckets"] != h["buckets"]:
+                raise ValueError(f"histogram {name!r} merged with different buckets")
+            counts = [a + b for a, b in zip(prev["counts"], h["counts"], strict=True)]
+            out["histograms"][name] = _histogram_summary(
+                prev["buckets"], counts, prev["sum"] + h["sum"], prev["count"] + h["count"]
+            )
+    return out
+
+
+def _fmt(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render_prometheus(summary: dict) -> str:
+    """Prometheus text exposition format (version 0.0.4) for a ``summary()`` dict."""
+    helps = summary.get("help", {})
+    lines = []
+    for kind, ptype in (("counters", "counter"), ("gauges", "gauge")):
+        for name, v in summary.get(kind, {}).items():
+            lines.append(f"# HELP {name} {helps.get(name) or name}")
+            lines.append(f"# TYPE {name} {ptype}")
+            lines.append(f"{name} {_fmt(v)}")
+    for name, h in summary.get("histograms", {}).items():
+        lines.append(f"# HELP {name} {helps.get(name) or name}")
+        lines.append(f"# TYPE {name} histogram")
+        cum = 0
+        for le, c in zip([*h["buckets"], math.inf], h["counts"], strict=True):
+            cum += c
+            lines.append(f'{name}_bucket{{le="{_fmt(le)}"}} {cum}')
+        lines.append(f"{name}_sum {_fmt(h['sum'])}")
+        lines.append(f"{name}_count {h['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str, summary: dict) -> None:
+    """Write the text format atomically, e.g. for node_exporter's textfile collector."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as fh:
+        fh.write(render_prometheus(summary))
+    os.replace(tmp, path)
+
+
+class MetricsServer:
+    """Local HTTP endpoint serving ``render()`` at any path (``/metrics`` by convention)."""
+
+    def __init__(self, render: Callable[[], str], host: str = "127.0.0.1", port: int = 0):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # noqa: N802
+                body = render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self) -> "MetricsServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
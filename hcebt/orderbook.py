@@ -0,0 +1,183 @@
+"""Stateful book of working orders on top of ShadowFillModel.
+
+``ShadowFillModel.fill`` treats every order as a one-shot: a limit that does not cross is
+reported ``"resting"`` and a stop that has not triggered ``"no_fill"``, and both are then
+forgotten. ``OrderBook`` keeps them working. Resting limits sit in per-side heaps keyed
+by price (best price first, then arrival); untriggered stops and stop-limits sit in
+per-side lists sorted by trigger price, arranged so the orders a snapshot triggers are
+always a suffix found with ``bisect``. ``on_snapshot`` therefore touches only the orders
+it triggers or crosses: O(log n + k) for k affected orders out of n working ones.
+
+Cancelling only forgets the order; its heap or stop-list entry is skipped when reached.
+Once such dead entries outnumber the working orders the book is compacted, so
+cancel/replace flows keep n bounded by the working orders rather than by every order
+ever placed, at an amortized O(1) per cancel.
+
+Every execution is priced by the model's ``fill`` against the snapshot that causes it,
+so a resting limit fills exactly as a fresh limit order would on that snapshot.
+
+Time in force (``OrderIntent.tif``) applies on submission: ``GTC`` orders keep working,
+``IOC`` orders fill what they can against the current snapshot and cancel the rest, and
+``FOK`` orders fill completely or not at all. A stop-limit whose limit does not cross on
+triggering rests as a GTC limit.
+"""
+
+from bisect import bisect_left, insort
+from dataclasses import replace
+import heapq
+import itertools
+
+from .fills import FillResult, MarketSnapshot, OrderIntent, ShadowFillModel
+
+TIFS = ("GTC", "IOC", "FOK")
+_NONE = FillResult(0.0, 0.0, 0.0, "no_fill")
+_MIN_COMPACT = 64  # dead entries tolerated regardless of the book's size
+
+
+class OrderBook:
+    def __init__(self, model: ShadowFillModel):
+        self.model = model
+        self._orders: dict[int, OrderIntent] = {}  # working orders by id
+        self._ids = itertools.count(1)
+        self._seq = itertools.count()  # arrival order, the tie-break at equal prices
+        # (-price, seq, id) for buys and (price, seq, id) for sells: best price on top
+        self._bids: list[tuple[float, int, int]] = []
+        self._asks: list[tuple[float, int, int]] = []
+        # (-stop, seq, id) for buys and (stop, seq, id) for sells, ascending; a snapshot
+        # triggers the suffix from bisect_left(stops, (key(last),))
+        self._buy_stops: list[tuple[float, int, int]] = []
+        self._sell_stops: list[tuple[float, int, int]] = []
+        self._dead = 0  # entries of cancelled orders still in the heaps and stop lists
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def __contains__(self, order_id: int) -> bool:
+        return order_id in self._orders
+
+    def get(self, order_id: int) -> OrderIntent | None:
+        """The working order (the unfilled remainder), or None once filled or cancelled."""
+        return self._orders.get(order_id)
+
+    def submit(self, intent: OrderIntent, snap: MarketSnapshot) -> tuple[int, FillResult]:
+        """Execute ``intent`` against ``snap`` and keep any GTC remainder working.
+
+        Returns the order id and the immediate result: ``"resting"`` for a limit (or a
+        triggered stop-limit) left in the book, ``"no_fill"`` for an untriggered stop that
+        keeps working or an IOC/FOK order cancelled unfilled.
+        """
+        tif = intent.tif.upper()
+        if tif not in TIFS:
+            raise ValueError(f"unknown time in force {intent.tif!r}; expected one of {TIFS}")
+        if intent.side == 0:
+            raise ValueError("order side must be +1 (buy) or -1 (sell)")
+        if any(p is not None and p != p for p in (intent.limit_price, intent.stop_price)):
+            raise ValueError("limit/stop prices must not be NaN; use None for no price")
+        order_id = next(self._ids)
+        ot = intent.order_type
+        if ot in ("stop", "stop-limit") and not self._triggered(intent, snap.last):
+            if tif == "GTC" and intent.stop_price is not None:
+                self._orders[order_id] = intent
+                self._add_stop(order_id, intent)
+            return order_id, _NONE
+        res = self.model.fill(snap, intent)
+        if tif == "FOK" and res.filled_qty < intent.qty:
+            return order_id, _NONE
+        rest = self._remainder(order_id, intent, res, keep=tif == "GTC")
+        if rest is not None:
+            self._rest(order_id, rest)
+        return order_id, res
+
+    def cancel(self, order_id: int) -> bool:
+        """Stop working an order; False if it is not in the book. Its heap or stop-list
+        entry is dropped when it reaches the top or is triggered, or by ``_compact``."""
+        if self._orders.pop(order_id, None) is None:
+            return False
+        self._dead += 1
+        if self._dead > max(_MIN_COMPACT, len(self._orders)):
+            self._compact()
+        return True
+
+    def _compact(self) -> None:
+        """Drop the entries of cancelled orders; filtering keeps the stop lists sorted."""
+        live = self._orders
+        for entries in (self._bids, self._asks, self._buy_stops, self._sell_stops):
+            entries[:] = [e for e in entries if e[2] in live]
+        heapq.heapify(self._bids)
+        heapq.heapify(self._asks)
+        self._dead = 0
+
+    def on_snapshot(self, snap: MarketSnapshot) -> list[tuple[int, FillResult]]:
+        """Trigger stops and fill crossed limits on a new snapshot.
+
+        Returns ``(order_id, result)`` for every order executed (or, for a triggered
+        stop-limit that does not cross, moved to the limit book as ``"resting"``): triggered
+        stops first, nearest trigger price first, then crossed limits in price-time
+        priority.
+        """
+        out: list[tuple[int, FillResult]] = []
+        # remainders go back into the book after the pass: one execution per order
+        rests: list[tuple[int, OrderIntent]] = []
+        last = snap.last
+        triggers = ((self._buy_stops, -last), (self._sell_stops, last)) if last == last else ()
+        for stops, key in triggers:
+            i = bisect_left(stops, (key,))
+            fired = stops[i:]
+            del stops[i:]
+            # nearest trigger price first, then arrival: the suffix ascends by (key, seq)
+            for _, _, order_id in sorted(fired, key=lambda e: (-e[0], e[1])):
+                self._execute(order_id, snap, out, rests)
+        for heap, bound in ((self._bids, -snap.ask), (self._asks, snap.bid)):
+            # heap keys are -price (bids) or price (asks), so crossing means key <= bound
+            while heap and heap[0][0] <= bound:
+                self._execute(heapq.heappop(heap)[2], snap, out, rests)
+        for order_id, rest in rests:
+            self._rest(order_id, rest)
+        return out
+
+    def _execute(self, order_id: int, snap: MarketSnapshot, out: list, rests: list) -> None:
+        intent = self._orders.get(order_id)
+        if intent is None:  # cancelled
+            self._dead -= 1
+            return
+        res = self.model.fill(snap, intent)
+        rest = self._remainder(order_id, intent, res, keep=True)
+        if rest is not None:
+            rests.append((order_id, rest))
+        out.append((order_id, res))
+
+    @staticmethod
+    def _triggered(intent: OrderIntent, last: float) -> bool:
+        stop = intent.stop_price
+        if stop is None:
+            return False
+        return (intent.side > 0 and last >= stop) or (intent.side < 0 and last <= stop)
+
+    def _add_stop(self, order_id: int, intent: OrderIntent) -> None:
+        stop = float(intent.stop_price)
+        if intent.side > 0:
+            insort(self._buy_stops, (-stop, next(self._seq), order_id))
+        else:
+            insort(self._sell_stops, (stop, next(self._seq), order_id))
+
+    def _remainder(
+        self, order_id: int, intent: OrderIntent, res: FillResult, keep: bool
+    ) -> OrderIntent | None:
+        """The GTC limit that keeps working after ``res`` (when ``keep``), or None once the
+        order is done; done orders leave the book."""
+        remaining = intent.qty - res.filled_qty
+        limit_like = intent.order_type in ("limit", "stop-limit")
+        if not (keep and limit_like and remaining > 0 and intent.limit_price is not None):
+            self._orders.pop(order_id, None)
+            return None
+        # a triggered stop-limit works on as a plain limit
+        rest = replace(intent, order_type="limit", qty=remaining, stop_price=None, tif="GTC")
+        self._orders[order_id] = rest
+        return rest
+
+    def _rest(self, order_id: int, rest: OrderIntent) -> None:
+        price = float(rest.limit_price)
+        if rest.side > 0:
+            heapq.heappush(self._bids, (-price, next(self._seq), order_id))
+        else:
+            heapq.heappush(self._asks, (price, next(self._seq), order_id))
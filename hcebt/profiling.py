@@ -0,0 +1,125 @@
+"""Opt-in profiling for the simulate hot path.
+
+``StageProfiler`` keeps cumulative wall time, call counts and event counts per stage. The
+runner times whole batches rather than single events, so the cost is a few
+``perf_counter`` calls per Repo batch. ``cprofile_run`` wraps a run in cProfile and dumps
+``<prefix>.pstats`` plus ``<prefix>.collapsed``, a collapsed-stack file
+(``frame;frame;frame <microseconds>`` per line) for flamegraph tools. It is derived from
+the pstats caller graph, so time through a function called from several places is split
+in proportion to each caller's cumulative time.
+"""
+
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+import cProfile
+import os
+import pstats
+import time
+
+# the runner's stage names, in hot-path order
+STAGES = ("snapshot", "fill", "accumulate", "timestamps", "rows", "submit")
+
+
+class StageProfiler:
+    def __init__(self):
+        self.seconds: dict[str, float] = {}
+        self.calls: dict[str, int] = {}
+        self.events: dict[str, int] = {}
+        self._last = time.perf_counter()
+
+    def start(self) -> None:
+        """Begin timing the next stage from now."""
+        self._last = time.perf_counter()
+
+    def lap(self, stage: str, events: int = 0) -> None:
+        """Charge the time since the previous lap (or start) to ``stage``."""
+        now = time.perf_counter()
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + (now - self._last)
+        self.calls[stage] = self.calls.get(stage, 0) + 1
+        self.events[stage] = self.events.get(stage, 0) + events
+        self._last = now
+
+    def summary(self) -> dict:
+        return _summary(self.seconds, self.calls, self.events)
+
+
+def _summary(seconds: dict, calls: dict, events: dict) -> dict:
+    total = sum(seconds.values())
+    order = [s for s in STAGES if s in seconds] + sorted(set(seconds) - set(STAGES))
+    return {
+        s: {
+            "seconds": seconds[s],
+            "calls": calls[s],
+            "events": events[s],
+            "share": seconds[s] / total if total > 0 else 0.0,
+        }
+        for s in order
+    }
+
+
+def merge_profiles(summaries: Iterable[dict]) -> dict:
+    seconds: dict[str, float] = {}
+    calls: dict[str, int] = {}
+    events: dict[str, int] = {}
+    for summary in summaries:
+        for s, v in summary.items():
+            seconds[s] = seconds.get(s, 0.0) + v["seconds"]
+            calls[s] = calls.get(s, 0) + v["calls"]
+            events[s] = events.get(s, 0) + v["events"]
+    return _summary(seconds, calls, events)
+
+
+def _label(func: tuple) -> str:
+    filename, lineno, name = func
+    if filename == "~":  # built-ins
+        return name
+    return f"{os.path.basename(filename)}:{lineno}:{name}"
+
+
+def collapsed_stacks(stats: pstats.Stats, max_depth: int = 64) -> list[str]:
+    """Collapsed stacks with self time in microseconds, rebuilt from the caller graph."""
+    callees: dict[tuple, list[tuple]] = {}
+    roots = []
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        if not callers:
+            roots.append(func)
+        for caller in callers:
+            callees.setdefault(caller, []).append(func)
+    out: dict[str, float] = {}
+
+    def walk(func: tuple, path: list[str], share: float, on_path: set) -> None:
+        _, _, tt, ct, _ = stats.stats[func]
+        path = [*path, _label(func)]
+        key = ";".join(path)
+        out[key] = out.get(key, 0.0) + tt * share
+        if len(path) >= max_depth:
+            return
+        for callee in callees.get(func, ()):
+            if callee in on_path:
+                continue
+            edge_ct = stats.stats[callee][4][func][3]
+            callee_ct = stats.stats[callee][3]
+            sub = share * edge_ct / callee_ct if callee_ct > 0 else 0.0
+            if sub * callee_ct >= 1e-6:  # prune sub-microsecond branches
+                walk(callee, path, sub, on_path | {callee})
+
+    for root in sorted(roots):
+        walk(root, [], 1.0, {root})
+    return [f"{k} {round(v * 1e6)}" for k, v in sorted(out.items()) if round(v * 1e6) > 0]
+
+
+@contextmanager
+def cprofile_run(prefix: str) -> Iterator[list[str]]:
+    """Profile the block with cProfile; yields the list the dump paths are appended to."""
+    paths: list[str] = []
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield paths
+    finally:
+        prof.disable()
+        os.makedirs(os.path.dirname(os.path.abspath(prefix)), exist_ok=True)
+        prof.dump_stats(f"{prefix}.pstats")
+        with open(f"{prefix}.collapsed", "w") as fh:
+            fh.writelines(line + "\n" for line in collapsed_stacks(pstats.Stats(prof)))
+        paths.extend([f"{prefix}.pstats", f"{prefix}.collapsed"])
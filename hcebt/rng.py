@@ -0,0 +1,155 @@
+"""Counter-based random draws keyed by event, independent of processing order.
+
+``np.random.default_rng`` is a stream: the value a draw gets depends on how many draws
+came before it, so sharding, re-batching or parallelizing a run changes which event gets
+which number. ``EventRNG`` instead derives every draw from the event itself. A 64-bit
+hash of (id, ts, symbol) (``event_keys``) is the counter of a Philox4x32-10 block cipher
+keyed by the seed. Each block yields two 53-bit uniforms, so an event's draws depend only
+on (seed, event, stream, index) and never on which other events share its batch.
+
+``philox4x32`` is the generator of Salmon et al., "Parallel random numbers: as easy as
+1, 2, 3" (SC'11), written over whole NumPy arrays; it matches the Random123 known-answer
+vectors (see tests/test_rng.py).
+"""
+
+from collections.abc import Sequence
+
+import numpy as np
+
+from .dedupe import _GOLDEN, _mix, column_hash
+
+ROUNDS = 10
+_M0 = np.uint64(0xD2511F53)
+_M1 = np.uint64(0xCD9E8D57)
+_W0 = 0x9E3779B9
+_W1 = 0xBB67AE85
+_MASK = np.uint64(0xFFFFFFFF)
+_U32 = np.uint64(32)
+_BLOCK = 1 << 14
+
+
+def philox4x32(counter: np.ndarray, key: Sequence[int], rounds: int = ROUNDS) -> np.ndarray:
+    """Encrypt each row of a (n, 4) uint32 ``counter`` array under the two-word ``key``."""
+    ctr = np.asarray(counter, dtype=np.uint32).reshape(-1, 4)
+    out = np.empty_like(ctr)
+    for start in range(0, len(ctr), _BLOCK):
+        words = [ctr[start : start + _BLOCK, j].astype(np.uint64) for j in range(4)]
+        _rounds(words, key, rounds)
+        for j in range(4):
+            out[start : start + _BLOCK, j] = words[j]
+    return out
+
+
+def _rounds(words: list[np.ndarray], key: Sequence[int], rounds: int) -> None:
+    """Philox rounds in place on four uint64 arrays holding 32-bit words. Callers pass at
+    most ``_BLOCK`` elements, so the working arrays stay in cache."""
+    c0, c1, c2, c3 = words
+    p0 = np.empty_like(c0)
+    p1 = np.empty_like(c0)
+    k0, k1 = int(key[0]) & 0xFFFFFFFF, int(key[1]) & 0xFFFFFFFF
+    for r in range(rounds):
+        if r:
+            k0 = (k0 + _W0) & 0xFFFFFFFF
+            k1 = (k1 + _W1) & 0xFFFFFFFF
+        # (c0, c1, c2, c3) <- (hi(p1) ^ c1 ^ k0, lo(p1), hi(p0) ^ c3 ^ k1, lo(p0))
+        np.multiply(c0, _M0, out=p0)  # < 2**64: both factors are 32-bit
+        np.multiply(c2, _M1, out=p1)
+        np.right_shift(p1, _U32, out=c0)
+        c0 ^= c1
+        c0 ^= np.uint64(k0)
+        np.right_shift(p0, _U32, out=c2)
+        c2 ^= c3
+        c2 ^= np.uint64(k1)
+        np.bitwise_and(p1, _MASK, out=c1)
+        np.bitwise_and(p0, _MASK, out=c3)
+
+
+def _unit(hi: np.ndarray, lo: np.ndarray) -> np.ndarray:
+    """27 + 26 bits of two words -> a double in [0, 1) with a full 53-bit mantissa."""
+    return ((hi >> np.uint64(5)) * 67108864.0 + (lo >> np.uint64(6))) * 2.0**-53
+
+
+def _str_key(arr: np.ndarray) -> np.ndarray:
+    """Hash a 'U' array: the uint64 words (two code points each) are weighted by distinct
+    odd constants, summed and mixed. NUL padding words add nothing, so the key of a
+    string does not depend on the array's itemsize."""
+    width = arr.dtype.itemsize // 4
+    codes = np.zeros((len(arr), width + (width & 1)), dtype=np.uint32)
+    codes[:, :width] = np.ascontiguousarray(arr).view(np.uint32).reshape(len(arr), width)
+    pairs = codes.view(np.uint64)
+    h = np.zeros(len(arr), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for j in range(pairs.shape[1]):
+            h += pairs[:, j] * (_GOLDEN * np.uint64(2 * j + 1))
+    return _mix(h ^ _GOLDEN)
+
+
+def _canonical(col: Sequence, text: bool = False) -> np.ndarray:
+    """A key column in one dtype per kind of value, so the key of an event does not depend
+    on how its source stored it: strings as 'U' and whole numbers (ints, or floats as a
+    tick store keeps ts) as int64. ``text`` columns are always strings."""
+    arr = np.asarray(col)
+    if text or arr.dtype.kind in "SU":
+        return arr.astype(str)
+    if arr.dtype.kind == "O":
+        arr = np.asarray(arr.tolist())  # object columns of one type take that type's dtype
+        if arr.dtype.kind in "OSU":
+            return arr.astype(str) if arr.dtype.kind != "O" else arr
+    if arr.dtype.kind in "iub":
+        return arr.astype(np.int64)
+    if arr.dtype.kind == "f" and np.all(np.abs(arr) < 2.0**63) and np.all(arr == np.trunc(arr)):
+        return arr.astype(np.int64)
+    return arr
+
+
+def event_keys(ids: Sequence, ts: Sequence, symbols: Sequence) -> np.ndarray:
+    """uint64 key per event, the counter of its draws. The columns are canonicalized first
+    (``_canonical``), so ``1690000000000``, ``1690000000000.0`` and an object or 'U'
+    ``"BTC"`` key alike. Numeric and mixed columns use hcebt.dedupe's column hash; strings
+    are folded by ``_str_key``."""
+    with np.errstate(over="ignore"):
+        h = np.zeros(len(ids), dtype=np.uint64)
+        for col, text in ((ids, False), (ts, False), (symbols, True)):
+            arr = _canonical(col, text)
+            col_key = _str_key(arr) if arr.dtype.kind == "U" else column_hash(arr)
+            h = _mix((h * _GOLDEN) ^ col_key)
+    return h
+
+
+class EventRNG:
+    """Uniform draws in [0, 1) per event, keyed by ``seed`` (see module docstring).
+
+    ``stream`` separates independent uses (e.g. one per stochastic decision), so adding a
+    new use never shifts the draws of an existing one.
+    """
+
+    def __init__(self, seed: int = 0):
+        self.seed = int(seed)
+        self._key = (self.seed & 0xFFFFFFFF, (self.seed >> 32) & 0xFFFFFFFF)
+
+    def uniform_keys(self, keys: np.ndarray, stream: int = 0, draws: int = 1) -> np.ndarray:
+        """Draws for pre-computed ``event_keys``: shape (n,) for one draw, else (n, draws)."""
+        keys = np.asarray(keys, dtype=np.uint64)
+        n = len(keys)
+        blocks = (draws + 1) // 2
+        u = np.empty((n, 2 * blocks))
+        for start in range(0, n, _BLOCK):
+            k = keys[start : start + _BLOCK]
+            for b in range(blocks):
+                # counter: (key lo, key hi, block, stream)
+                words = [
+                    k & _MASK,
+                    k >> _U32,
+                    np.full(len(k), b, np.uint64),
+                    np.full(len(k), stream, np.uint64),
+                ]
+                _rounds(words, self._key, ROUNDS)
+                u[start : start + _BLOCK, 2 * b] = _unit(words[0], words[1])
+                u[start : start + _BLOCK, 2 * b + 1] = _unit(words[2], words[3])
+        return u[:, 0] if draws == 1 else u[:, :draws]
+
+    def uniform(
+        self, ids: Sequence, ts: Sequence, symbols: Sequence, stream: int = 0, draws: int = 1
+    ) -> np.ndarray:
+        """Draws for events given by their id, ts and symbol columns."""
+        return self.uniform_keys(event_keys(ids, ts, symbols), stream, draws)
@@ -1,109 +1,631 @@
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import itertools
 import json
 import os
 import time
 
+import numpy as np
+
 from lib.kahan import KahanSum
-from lib.timeutil import to_utc_iso
+from lib.timeutil import to_epoch_ms_array, to_utc_iso_array
+
+from .async_repo import AsyncRepo
+from .cache import RowRecorder, RunCache, destination, run_key
+from .checkpoint import Checkpointer, skip_events
+from .config import BatchConfig, FillConfig, RunConfig
+from .events import (
+    column_length,
+    event_sort_key,
+    fill_inputs,
+    is_columnar,
+    sort_columns,
+    to_columns,
+)
+from .fills import ST_PARTIAL, MarketSnapshot, OrderIntent, ShadowFillModel
+from .metrics import MetricsServer, merge_summaries, render_prometheus, write_prometheus
+from .persistence import Repo, RepoConfig, RowBatch
+from .profiling import StageProfiler, cprofile_run, merge_profiles
+from .sharding import merge_slip_partials, partition, shard_chunks
+from .streaming import check_sorted
+
+_ab_sort_key = event_sort_key
+
+
+def _make_model(fill: FillConfig) -> ShadowFillModel:
+    return ShadowFillModel(
+        slip_mode=fill.slip_mode,
+        ticks=fill.ticks,
+        bps=fill.bps,
+        pct_spread=fill.pct_spread,
+        hybrid_weight=fill.hybrid_weight,
+        bid_ask_aware=fill.bid_ask_aware,
+        seed=fill.seed,
+        engine=fill.engine,
+        partial_fills=fill.partial_fills,
+    )
+
+
+def _make_repo(batch: BatchConfig, progress_path: str | None = None) -> Repo:
+    repo_cls = AsyncRepo if batch.io == "asyncio" else Repo
+    return repo_cls(
+        RepoConfig(
+            backend=batch.backend,
+            batch_size=batch.batch_size,
+            flush_interval_ms=batch.flush_interval_ms,
+            queue_max_batches=batch.queue_max_batches,
+            clickhouse_url=batch.clickhouse_url,
+            timescale_dsn=batch.timescale_dsn,
+            table=batch.table,
+            ts_format=batch.ts_format,
+            timescale_write=batch.timescale_write,
+            writers=batch.writers,
+            overflow=batch.overflow,
+            block_timeout_s=batch.block_timeout_s,
+            spill_dir=batch.spill_dir,
+            spill_segment_mb=batch.spill_segment_mb,
+            dedupe_max_keys=batch.dedupe_max_keys,
+            progress_path=progress_path,
+            max_inflight=batch.max_inflight,
+        )
+    )
+
+
+def _leg_chunks(data, label: str):
+    """Normalize a leg into an iterable of sorted chunks.
+
+    Lists and columnar mappings are sorted in memory as one chunk; any other iterable is
+    treated as a stream of already-sorted chunks and verified lazily.
+    """
+    if is_columnar(data):
+        return [sort_columns(data)]
+    if isinstance(data, list | tuple):
+        return [sorted(data, key=_ab_sort_key)]
+    return check_sorted(data, name=f"leg {label}")
+
+
+def _leg_result(events: int, fills: int, partials: int, slip_cost: float, dur: float) -> dict:
+    return {
+        "events": events,
+        "fills": fills,
+        "partial_fill_ratio": (partials / max(1, fills)),
+        "fill_rate": fills / max(1, events),
+        "slip_cost": slip_cost,
+        "events_per_sec": events / max(dur, 1e-9),
+    }
+
+
+def _snapshot_intent(ev: dict) -> tuple[MarketSnapshot, OrderIntent]:
+    snap = MarketSnapshot(
+        ts=ev["ts"],
+        last=ev["last"],
+        mark=ev.get("mark", ev["last"]),
+        bid=ev["bid"],
+        ask=ev["ask"],
+        spread=ev["ask"] - ev["bid"],
+        volume=ev.get("vol", 1.0),
+    )
+    intent = OrderIntent(
+        side=ev.get("side", 1),
+        order_type=ev.get("type", "market"),
+        qty=ev.get("qty", 1.0),
+        limit_price=ev.get("limit"),
+        stop_price=ev.get("stop"),
+        queue_pos=ev.get("queue_pos", 0.5),
+    )
+    return snap, intent
+
+
+class _Leg:
+    """Simulate state for one leg: counters, slip accumulator and the pending Repo batch.
+
+    With ``per_symbol`` the slip cost is also accumulated per symbol (``slip_by_symbol``)
+    so sharded runs can merge partial sums deterministically. With ``cfg.profile.enabled``
+    each stage of the hot path is timed per batch (see hcebt.profiling). A ``recorder``
+    also gets every submitted batch, for the run cache (see hcebt.cache), and
+    ``on_batch`` is called after each Repo batch, where checkpoints are taken (see
+    hcebt.checkpoint).
+    """
+
+    def __init__(
+        self,
+        cfg: RunConfig,
+        fm: ShadowFillModel,
+        repo: Repo,
+        label: str,
+        per_symbol: bool = False,
+        recorder: RowRecorder | None = None,
+    ):
+        self.cfg = cfg
+        self.fm = fm
+        self.repo = repo
+        self.label = label
+        self.batch_size = max(1, cfg.batch.batch_size)
+        self.t0 = time.time()
+        self.events = 0
+        self.fills = 0
+        self.partials = 0
+        self.slip_k = KahanSum()
+        self.slip_by_symbol: dict[str, KahanSum] | None = {} if per_symbol else None
+        self.batch = RowBatch({}, 0)
+        self.prof = StageProfiler() if cfg.profile.enabled else None
+        self.recorder = recorder
+        self.on_batch: Callable[[], None] | None = None
+
+    def _add_symbol_slip(self, symbols: np.ndarray, costs: np.ndarray) -> None:
+        if not len(costs):
+            return
+        names, inverse = np.unique(symbols, return_inverse=True)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(len(names) + 1))
+        for j, sym in enumerate(names.tolist()):
+            k = self.slip_by_symbol.get(sym)
+            if k is None:
+                k = self.slip_by_symbol[sym] = KahanSum()
+            k.add_array(costs[order[bounds[j] : bounds[j + 1]]])
+
+    def feed(self, chunk) -> None:
+        if is_columnar(chunk):
+            self.feed_columns(chunk)
+        else:
+            self.feed_rows(chunk)
+
+    def _format_ts(self, values) -> list:
+        """Row ts for a whole batch: ISO strings, or epoch-ms ints with ts_format=epoch_ms."""
+        if self.cfg.batch.ts_format == "epoch_ms":
+            return to_epoch_ms_array(values).tolist()
+        return to_utc_iso_array(values)
+
+    def _lap(self, stage: str, events: int) -> None:
+        if self.prof is not None:
+            self.prof.lap(stage, events)
+
+    def feed_rows(self, data) -> None:
+        # stage by stage per Repo batch, so profiling never adds per-event work
+        it = iter(data)
+        while evs := list(itertools.islice(it, self.batch_size)):
+            if self.fm.partial_fills:
+                # partial fill draws are vectorized; the rows take the columnar path
+                self.feed_columns(to_columns(evs))
+            else:
+                self._feed_row_batch(evs)
+
+    def _feed_row_batch(self, evs: list[dict]) -> None:
+        n = len(evs)
+        if self.prof is not None:
+            self.prof.start()
+        orders = [_snapshot_intent(ev) for ev in evs]
+        self._lap("snapshot", n)
+        results = [self.fm.fill(snap, intent) for snap, intent in orders]
+        self._lap("fill", n)
+        self.events += n
+        costs = [fr.slip_cost for fr in results]
+        filled = [i for i, fr in enumerate(results) if fr.filled_qty > 0]
+        self.fills += len(filled)
+        self.partials += sum(results[i].status == "partial" for i in filled)
+        filled_costs = np.array([costs[i] for i in filled], dtype=np.float64)
+        self.slip_k.add_array(filled_costs)
+        symbols = [ev["symbol"] for ev in evs]
+        if self.slip_by_symbol is not None:
+            self._add_symbol_slip(np.array([symbols[i] for i in filled]), filled_costs)
+        self._lap("accumulate", n)
+        ts = self._format_ts([ev["ts"] for ev in evs])
+        self._lap("timestamps", n)
+        rows = self._rows(ts, symbols, costs)
+        self._lap("rows", n)
+        self._emit(rows)
+        self._lap("submit", n)
+
+    def feed_columns(self, cols) -> None:
+        # vectorized path: one fill_batch call per Repo batch, same rows as feed_rows()
+        n = column_length(cols)
+        if self.prof is not None:
+            self.prof.start()
+        inputs = fill_inputs(cols)
+        symbols = np.asarray(cols["symbol"])
+        self._lap("snapshot", n)
+        step = self.batch_size
+        for start in range(0, n, step):
+            sl = slice(start, start + step)
+            fb = self.fm.fill_batch(**{k: v[sl] for k, v in inputs.items()})
+            m = len(fb)
+            self._lap("fill", m)
+            filled = fb.filled_qty > 0
+            self.events += m
+            self.fills += int(np.count_nonzero(filled))
+            self.partials += int(np.count_nonzero(filled & (fb.status == ST_PARTIAL)))
+            filled_costs = fb.slip_cost[filled]
+            self.slip_k.add_array(filled_costs)
+            if self.slip_by_symbol is not None:
+                self._add_symbol_slip(symbols[sl][filled], filled_costs)
+            self._lap("accumulate", m)
+            ts = self._format_ts(inputs["ts"][sl])
+            self._lap("timestamps", m)
+            rows = self._rows(ts, symbols[sl].tolist(), fb.slip_cost.tolist())
+            self._lap("rows", m)
+            self._emit(rows)
+            self._lap("submit", m)
+
+    def _rows(self, ts: list, symbols: list, costs: list) -> RowBatch:
+        n = len(ts)
+        return RowBatch(
+            {
+                "run_id": [self.cfg.run_id] * n,
+                "ts": ts,
+                "symbol": symbols,
+                "metric": ["fill_cost"] * n,
+                "value": costs,
+                "label": [self.label] * n,
+            },
+            n,
+        )
+
+    def _emit(self, rows: RowBatch) -> None:
+        """Append rows to the pending batch and submit every full batch_size slice."""
+        self.batch = RowBatch.concat([self.batch, rows])
+        bs = self.batch_size
+        full = self.batch.n // bs * bs
+        for i in range(0, full, bs):
+            self._submit(self.batch.slice(i, i + bs))
+        if full:
+            self.batch = self.batch.slice(full, self.batch.n)
+        if self.on_batch is not None:
+            self.on_batch()
+
+    def state(self) -> dict:
+        """Counters, exact slip total and rows not yet submitted, for a checkpoint."""
+        return {
+            "events": self.events,
+            "fills": self.fills,
+            "partials": self.partials,
+            "slip": self.slip_k.state(),
+            "batch": self.batch,
+        }
+
+    def restore(self, state: dict) -> None:
+        self.events = state["events"]
+        self.fills = state["fills"]
+        self.partials = state["partials"]
+        self.slip_k = KahanSum.from_state(state["slip"])
+        self.batch = state["batch"]
+
+    def _submit(self, rows: RowBatch) -> None:
+        self.repo.submit(rows)
+        if self.recorder is not None:
+            self.recorder.write(rows)
+
+    def finish(self) -> dict:
+        if self.batch.n:
+            if self.prof is not None:
+                self.prof.start()
+            self._submit(self.batch)
+            self._lap("submit", 0)
+            self.batch = RowBatch({}, 0)
+        if self.recorder is not None:
+            self.recorder.close()
+        res = _leg_result(
+            self.events, self.fills, self.partials, self.slip_k.value(), time.time() - self.t0
+        )
+        if self.prof is not None:
+            res["profile"] = self.prof.summary()
+        return res
+
+
+def _recorder(rows_dir: str | None, name: str) -> RowRecorder | None:
+    return None if rows_dir is None else RowRecorder(os.path.join(rows_dir, f"rows-{name}.jsonl"))
+
+
+def _simulate(
+    cfg: RunConfig,
+    fm: ShadowFillModel,
+    repo: Repo,
+    label: str,
+    chunks,
+    rows_dir: str | None = None,
+) -> dict:
+    leg = _Leg(cfg, fm, repo, label, recorder=_recorder(rows_dir, label))
+    for chunk in chunks:
+        leg.feed(chunk)
+    return leg.finish()
 
-from .config import RunConfig
-from .fills import MarketSnapshot, OrderIntent, ShadowFillModel
-from .persistence import Repo, RepoConfig
+
+def _leg_worker(cfg: RunConfig, label: str, data, rows_dir: str | None = None) -> tuple[dict, dict]:
+    """Process-pool entry point: one leg with its own model and Repo."""
+    fm = _make_model(cfg.fill)
+    repo = _make_repo(cfg.batch)
+    repo.start()
+    try:
+        res = _simulate(cfg, fm, repo, label, _leg_chunks(data, label), rows_dir)
+    finally:
+        repo.stop()
+    return res, _repo_report(repo)
+
+
+def _repo_report(repo: Repo) -> dict:
+    return {"repo_metrics": repo.metrics, "metrics": repo.registry.summary()}
+
+
+def _merge_reports(reports: list[dict]) -> dict:
+    """Combine per-worker ``_repo_report`` dicts into run_ab's repo_metrics / metrics."""
+    return {
+        "repo_metrics": _merge_repo_metrics([r["repo_metrics"] for r in reports]),
+        "metrics": merge_summaries(r["metrics"] for r in reports),
+    }
 
 
-def _ab_sort_key(e: dict):
-    return (e.get("ts"), e.get("symbol"), e.get("id", 0))
+def _merge_repo_metrics(parts: list[dict]) -> dict:
+    """Sum per-worker Repo counters; latencies keep the slowest worker's last write and the
+    write throughput is recomputed from the summed rows and write time."""
+    merged: dict = {}
+    for m in parts:
+        for k, v in m.items():
+            merged[k] = (
+                max(merged.get(k, v), v) if k.endswith("latency_ms") else merged.get(k, 0) + v
+            )
+    if "written_rows" in merged:
+        merged["write_rows_per_sec"] = merged["written_rows"] / max(merged["write_seconds"], 1e-9)
+    return merged
+
+
+def _run_legs_in_processes(cfg: RunConfig, legs: dict, rows_dir: str | None) -> dict:
+    # Legs must be picklable: lists, columnar mappings, TickStore or JsonlStream
+    workers = cfg.execution.max_workers or len(legs)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            label: pool.submit(_leg_worker, cfg, label, data, rows_dir)
+            for label, data in legs.items()
+        }
+        done = {label: fut.result() for label, fut in futures.items()}
+    out = {label: res for label, (res, _) in done.items()}
+    out.update(_merge_reports([r for _, r in done.values()]))
+    return out
+
+
+def _shard_worker(
+    cfg: RunConfig, label: str, data, shard: int, shards: int, rows_dir: str | None = None
+) -> tuple[dict, dict]:
+    """Process-pool entry point: the events of one leg whose symbols hash to ``shard``."""
+    repo = _make_repo(cfg.batch)
+    repo.start()
+    try:
+        recorder = _recorder(rows_dir, f"{label}-{shard:04d}")
+        leg = _Leg(cfg, _make_model(cfg.fill), repo, label, per_symbol=True, recorder=recorder)
+        for chunk in shard_chunks(_leg_chunks(data, label), shard, shards):
+            leg.feed(chunk)
+        leg.finish()
+    finally:
+        repo.stop()
+    part = {
+        "events": leg.events,
+        "fills": leg.fills,
+        "partials": leg.partials,
+        "slip_by_symbol": leg.slip_by_symbol,
+        "profile": leg.prof.summary() if leg.prof is not None else None,
+    }
+    return part, _repo_report(repo)
+
+
+def _run_sharded(cfg: RunConfig, legs: dict, rows_dir: str | None) -> dict:
+    shards = max(1, cfg.execution.shards)
+    workers = cfg.execution.max_workers or min(os.cpu_count() or 1, shards * len(legs))
+    out: dict = {}
+    reports = []
+    t0 = time.time()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            label: [
+                pool.submit(_shard_worker, cfg, label, part, i, shards, rows_dir)
+                for i, part in enumerate(partition(data, shards))
+            ]
+            for label, data in legs.items()
+        }
+        for label, futs in futures.items():
+            parts = [f.result() for f in futs]
+            slip = merge_slip_partials(p["slip_by_symbol"] for p, _ in parts)
+            out[label] = _leg_result(
+                sum(p["events"] for p, _ in parts),
+                sum(p["fills"] for p, _ in parts),
+                sum(p["partials"] for p, _ in parts),
+                slip.value(),
+                time.time() - t0,
+            )
+            if cfg.profile.enabled:
+                out[label]["profile"] = merge_profiles(p["profile"] for p, _ in parts)
+            reports.extend(r for _, r in parts)
+    out.update(_merge_reports(reports))
+    return out
 
 
 def run_ab(cfg: RunConfig, A, B):
-    # deterministic stable order (avoid mutating global RNG)
-    A = sorted(A, key=_ab_sort_key)
-    B = sorted(B, key=_ab_sort_key)
+    """Simulate legs A and B and persist per-event fill costs.
+
+    Each leg is a list of event dicts, a columnar mapping of event field -> array (see
+    hcebt.events, filled with ShadowFillModel.fill_batch), or an iterator of such chunks
+    (see hcebt.streaming). Iterators are consumed lazily and must already be sorted by
+    (ts, symbol, id); an out-of-order event raises UnsortedStreamError.
+
+    With ``cfg.execution.mode == "process"`` each leg runs in its own worker process with
+    its own model and Repo; the result has the same shape and values (apart from timing)
+    as the sequential run, with Repo counters summed across workers. ``"sharded"`` splits
+    each leg by symbol into ``cfg.execution.shards`` worker tasks and merges per-symbol
+    slip partial sums in sorted symbol order, so results do not depend on the shard count.
+
+    Besides ``repo_metrics`` the result carries ``metrics``, a summary of the Repo metrics
+    registry (histograms with p50/p90/p99, gauges, counters; see hcebt.metrics).
+    ``cfg.metrics`` can also write it as a Prometheus text file and serve it over local
+    HTTP while the run is in progress.
+
+    With ``cfg.profile.enabled`` every leg result carries a per-stage ``profile``;
+    ``cfg.profile.cprofile`` also wraps the run in cProfile and lists the pstats and
+    collapsed-stack files written to run_artifacts/ under ``profile_artifacts`` (pool
+    workers are not covered by cProfile, only the calling process).
+
+    With ``cfg.cache.enabled`` (and profiling off) results are cached by content under
+    ``cfg.cache.dir`` and an identical run returns them without simulating; the result
+    then carries ``cache: {"key", "hit"}``, and a hit's ``events_per_sec`` is that of
+    the run that filled the cache (see hcebt.cache).
 
+    ``cfg.checkpoint.every_events`` makes a sequential run save resumable state under
+    run_artifacts/, and ``cfg.checkpoint.resume`` continues an interrupted run from it
+    without writing any row twice (see hcebt.checkpoint).
+    """
     # snapshot config
     os.makedirs("run_artifacts", exist_ok=True)
     with open(f"run_artifacts/{cfg.run_id}_config.json", "w") as fh:
         json.dump(cfg.model_dump(), fh, indent=2)
 
-    fm = ShadowFillModel(
-        slip_mode=cfg.fill.slip_mode,
-        ticks=cfg.fill.ticks,
-        bps=cfg.fill.bps,
-        pct_spread=cfg.fill.pct_spread,
-        hybrid_weight=cfg.fill.hybrid_weight,
-        bid_ask_aware=cfg.fill.bid_ask_aware,
-        seed=cfg.fill.seed,
-    )
-    repo = Repo(
-        RepoConfig(
-            backend=cfg.batch.backend,
-            batch_size=cfg.batch.batch_size,
-            flush_interval_ms=cfg.batch.flush_interval_ms,
-            queue_max_batches=cfg.batch.queue_max_batches,
-            clickhouse_url=cfg.batch.clickhouse_url,
-            timescale_dsn=cfg.batch.timescale_dsn,
-            table=cfg.batch.table,
-        )
+    live: dict = {}  # the running Repo's registry, while the HTTP endpoint can see it
+    server = None
+    if cfg.metrics.port is not None:
+        server = MetricsServer(
+            lambda: render_prometheus(live["registry"].summary() if live else {}),
+            cfg.metrics.host,
+            cfg.metrics.port,
+        ).start()
+    try:
+        if cfg.profile.cprofile:
+            with cprofile_run(f"run_artifacts/{cfg.run_id}_profile") as artifacts:
+                out = _dispatch(cfg, A, B, live)
+            out["profile_artifacts"] = artifacts
+        elif cfg.cache.enabled and not (cfg.profile.enabled or cfg.checkpoint.resume):
+            out = _run_cached(cfg, A, B, live)
+        else:
+            out = _dispatch(cfg, A, B, live)
+    finally:
+        if server is not None:
+            server.stop()
+    if cfg.metrics.path:
+        write_prometheus(cfg.metrics.path, out["metrics"])
+    return out
+
+
+def _dispatch(cfg: RunConfig, A, B, live: dict, rows_dir: str | None = None) -> dict:
+    if cfg.checkpoint.every_events or cfg.checkpoint.resume:
+        return _run_checkpointed(cfg, A, B, live, rows_dir)
+    if cfg.execution.mode == "process":
+        return _run_legs_in_processes(cfg, {"A": A, "B": B}, rows_dir)
+    if cfg.execution.mode == "sharded":
+        return _run_sharded(cfg, {"A": A, "B": B}, rows_dir)
+    return _run_sequential(cfg, A, B, live, rows_dir)
+
+
+def _fully_persisted(repo_metrics: dict) -> bool:
+    """Every submitted row that survived dedupe reached the backend."""
+    m = repo_metrics
+    return (
+        m["dropped_batches"] == 0
+        and m["spilled_batches"] == m["replayed_batches"]
+        and m["written_rows"] == m["dedupe_misses"]
     )
+
+
+def _run_cached(cfg: RunConfig, A, B, live: dict) -> dict:
+    """``_dispatch`` through the run cache (``cfg.cache``, see hcebt.cache).
+
+    A hit skips simulation: the cached result is returned, and its rows are replayed to
+    the backend only if they have not reached it under this run_id yet. A miss records
+    the rows the run submits and publishes them with the result.
+    """
+    key = run_key(cfg, A, B)
+    if key is None:
+        return _dispatch(cfg, A, B, live)
+    cache = RunCache(cfg.cache.dir, cfg.cache.max_mb << 20)
+    dest = destination(cfg)
+    hit = cache.get(key)
+    if hit is None:
+        with cache.staging() as staged:
+            out = _dispatch(cfg, A, B, live, staged)
+            result = {k: out[k] for k in ("A", "B", "repo_metrics", "metrics")}
+            done = dest is not None and _fully_persisted(out["repo_metrics"])
+            cache.commit(key, staged, {**result, "persisted": [dest] if done else []})
+        return {**out, "cache": {"key": key, "hit": False}}
+    out = {k: hit[k] for k in ("A", "B", "repo_metrics", "metrics")}
+    if dest is not None and dest not in hit["persisted"]:
+        repo = _make_repo(cfg.batch)
+        live["registry"] = repo.registry
+        repo.start()
+        try:
+            for rows in cache.rows(key, cfg.run_id):
+                repo.submit(rows)
+        finally:
+            repo.stop()
+        out.update(_repo_report(repo))
+        if _fully_persisted(repo.metrics):
+            cache.mark_persisted(key, dest)
+    return {**out, "cache": {"key": key, "hit": True}}
+
+
+def _run_checkpointed(cfg: RunConfig, A, B, live: dict, rows_dir: str | None) -> dict:
+    """``_run_sequential`` with periodic checkpoints, continuing from the last one with
+    ``cfg.checkpoint.resume`` (see hcebt.checkpoint)."""
+    if cfg.execution.mode != "sequential":
+        raise ValueError("checkpoints need execution.mode=sequential")
+    if cfg.batch.overflow == "spill":
+        raise ValueError("checkpoints cannot track spilled batches; use overflow drop or block")
+    ckpt = Checkpointer(cfg)
+    state = ckpt.load() if cfg.checkpoint.resume else None
+    if state is None:
+        ckpt.clear()
+    fm = _make_model(cfg.fill)
+    repo = _make_repo(cfg.batch, progress_path=ckpt.progress_path)
+    out: dict = {}
+    if state is not None:
+        fm.rng.bit_generator.state = state["rng"]
+        repo.restore(state["repo"], ckpt.written())
+        out.update(state["done"])
+    live["registry"] = repo.registry
     repo.start()
+    try:
+        for label, data in (("A", A), ("B", B)):
+            if label in out:
+                continue
+            leg = _Leg(cfg, fm, repo, label, recorder=_recorder(rows_dir, label))
+            chunks = _leg_chunks(data, label)
+            if state is not None and state["leg"] == label:
+                leg.restore(state["leg_state"])
+                chunks = skip_events(chunks, leg.events)
+            leg.on_batch = functools.partial(_checkpoint, ckpt, fm, repo, leg, dict(out))
+            for chunk in chunks:
+                leg.feed(chunk)
+            out[label] = leg.finish()
+    finally:
+        repo.stop()
+    ckpt.clear()
+    return {**out, **_repo_report(repo)}
 
-    def simulate(label, data):
-        t0 = time.time()
-        events = 0
-        fills = 0
-        partials = 0
-        slip_k = KahanSum()
-        batch = []
-        for ev in data:
-            events += 1
-            snap = MarketSnapshot(
-                ts=ev["ts"],
-                last=ev["last"],
-                mark=ev.get("mark", ev["last"]),
-                bid=ev["bid"],
-                ask=ev["ask"],
-                spread=ev["ask"] - ev["bid"],
-                volume=ev.get("vol", 1.0),
-            )
-            intent = OrderIntent(
-                side=ev.get("side", 1),
-                order_type=ev.get("type", "market"),
-                qty=ev.get("qty", 1.0),
-                limit_price=ev.get("limit"),
-                stop_price=ev.get("stop"),
-                queue_pos=ev.get("queue_pos", 0.5),
-            )
-            fr = fm.fill(snap, intent)
-            if fr.filled_qty > 0:
-                fills += 1
-                if fr.status == "partial":
-                    partials += 1
-                slip_k.add(fr.slip_cost)
-            row = {
-                "run_id": cfg.run_id,
-                "ts": to_utc_iso(ev["ts"]),
-                "symbol": ev["symbol"],
-                "metric": "fill_cost",
-                "value": fr.slip_cost,
-                "label": label,
-            }
-            batch.append(row)
-            if len(batch) >= cfg.batch.batch_size:
-                repo.submit(batch)
-                batch = []
-        if batch:
-            repo.submit(batch)
-        dur = time.time() - t0
-        res = {
-            "events": events,
-            "fills": fills,
-            "partial_fill_ratio": (partials / max(1, fills)),
-            "fill_rate": fills / max(1, events),
-            "slip_cost": slip_k.value(),
-            "events_per_sec": events / max(dur, 1e-9),
-        }
-        return res
 
-    resA = simulate("A", A)
-    resB = simulate("B", B)
-    repo.stop()
-    return {"A": resA, "B": resB, "repo_metrics": repo.metrics}
+def _checkpoint(ckpt: Checkpointer, fm: ShadowFillModel, repo: Repo, leg: _Leg, done: dict) -> None:
+    events = sum(r["events"] for r in done.values()) + leg.events
+    if not ckpt.due(events):
+        return
+    repo.flush_barrier()
+    ckpt.save(
+        events,
+        {
+            "leg": leg.label,
+            "done": done,
+            "leg_state": leg.state(),
+            "rng": fm.rng.bit_generator.state,
+            "repo": repo.checkpoint_state(),
+        },
+    )
+    # rows written so far are covered by the checkpoint
+    repo.clear_progress()
+
+
+def _run_sequential(cfg: RunConfig, A, B, live: dict, rows_dir: str | None) -> dict:
+    # deterministic stable order (avoid mutating global RNG)
+    A = _leg_chunks(A, "A")
+    B = _leg_chunks(B, "B")
+
+    fm = _make_model(cfg.fill)
+    repo = _make_repo(cfg.batch)
+    live["registry"] = repo.registry
+    repo.start()
+    try:
+        resA = _simulate(cfg, fm, repo, "A", A, rows_dir)
+        resB = _simulate(cfg, fm, repo, "B", B, rows_dir)
+    finally:
+        repo.stop()
+    return {"A": resA, "B": resB, **_repo_report(repo)}
@@ -0,0 +1,109 @@
+"""Append-only on-disk spill segments for Repo batches that do not fit in the queue.
+
+Each spilled batch is one JSON line ``{"n": rows, "columns": {name: [values, ...]}}``.
+A writer appends to its own open segment (``<stamp>-<pid>.open``); sealing renames it to
+``.seg``. A replayer claims a sealed segment by renaming it to ``.<pid>.replay``, reads its
+batches back, then deletes it. Open or claimed segments left behind by a process that is no
+longer running are sealed again by ``recover()``, so they are replayed after a restart.
+"""
+
+from collections.abc import Iterator
+import json
+import logging
+import os
+import threading
+import time
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SpillStore:
+    """Spill segments under ``path``; safe to share between threads of one process."""
+
+    def __init__(self, path: str, segment_bytes: int = 64 << 20):
+        self.path = str(path)
+        self.segment_bytes = segment_bytes
+        self._fh = None
+        self._open_path: str | None = None
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    def append(self, columns: dict[str, list], n: int) -> None:
+        line = json.dumps({"n": n, "columns": columns}, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._fh is None:
+                stem = f"{time.time_ns():020d}-{os.getpid()}"
+                self._open_path = os.path.join(self.path, stem + ".open")
+                self._fh = open(self._open_path, "a", encoding="utf-8")
+            self._fh.write(line)
+            self._fh.flush()
+            if self._fh.tell() >= self.segment_bytes:
+                self._seal_locked()
+
+    def seal(self) -> None:
+        """Close the current open segment so it can be replayed."""
+        with self._lock:
+            self._seal_locked()
+
+    def _seal_locked(self) -> None:
+        if self._fh is None:
+            return
+        self._fh.close()
+        os.replace(self._open_path, self._open_path[: -len(".open")] + ".seg")
+        self._fh = None
+        self._open_path = None
+
+    def recover(self) -> int:
+        """Re-seal segments orphaned by dead processes; returns how many were recovered."""
+        recovered = 0
+        for name in os.listdir(self.path):
+            stem, _, state = name.partition(".")
+            if state == "open":
+                owner = stem.rsplit("-", 1)[-1]
+            elif state.endswith(".replay"):
+                owner = state.split(".")[1]
+            else:
+                continue
+            if owner.isdigit() and not _pid_alive(int(owner)):
+                os.replace(os.path.join(self.path, name), os.path.join(self.path, stem + ".seg"))
+                recovered += 1
+        return recovered
+
+    def pending(self) -> int:
+        """Sealed segments waiting for replay."""
+        return sum(name.endswith(".seg") for name in os.listdir(self.path))
+
+    def claim(self) -> str | None:
+        """Oldest sealed segment, renamed so no other replayer picks it up."""
+        for name in sorted(n for n in os.listdir(self.path) if n.endswith(".seg")):
+            src = os.path.join(self.path, name)
+            dst = f"{src}.{os.getpid()}.replay"
+            try:
+                os.replace(src, dst)
+            except FileNotFoundError:  # claimed by another process first
+                continue
+            return dst
+        return None
+
+    @staticmethod
+    def read(path: str) -> Iterator[tuple[dict[str, list], int]]:
+        with open(path, encoding="utf-8") as fh:
+            for lineno, line in enumerate(fh, 1):
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    # torn tail from a crash mid-append; the batch never completed
+                    logging.warning("%s:%d: skipping incomplete spill record", path, lineno)
+                    continue
+                yield rec["columns"], rec["n"]
+
+    def close(self) -> None:
+        self.seal()
@@ -0,0 +1,121 @@
+"""Chunked, bounded-memory event streams for run_ab.
+
+A stream is any iterator of chunks, where a chunk is either a list of event dicts or a
+columnar mapping (see hcebt.events). Streams are never materialized or re-sorted; instead
+``check_sorted`` verifies the (ts, symbol, id) order on the fly, within and across chunks.
+"""
+
+from collections.abc import Iterable, Iterator, Mapping
+import json
+from typing import Any
+
+import numpy as np
+
+from .events import column_length, event_sort_key, is_columnar, to_columns
+
+STREAM_SUFFIXES = (".jsonl", ".ndjson")
+
+
+class UnsortedStreamError(ValueError):
+    """Raised when a streamed leg is not in (ts, symbol, id) order."""
+
+
+def is_stream_path(path: str) -> bool:
+    return str(path).lower().endswith(STREAM_SUFFIXES)
+
+
+def iter_jsonl_chunks(
+    path: str, chunk_size: int = 10_000, columnar: bool = False
+) -> Iterator[list[dict] | dict[str, np.ndarray]]:
+    """Yield chunks of at most ``chunk_size`` events from a JSONL/NDJSON file."""
+    chunk_size = max(1, int(chunk_size))
+    chunk: list[dict] = []
+    with open(path) as fh:
+        for lineno, line in enumerate(fh, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                chunk.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{lineno}: invalid JSON line") from e
+            if len(chunk) >= chunk_size:
+                yield to_columns(chunk) if columnar else chunk
+                chunk = []
+    if chunk:
+        yield to_columns(chunk) if columnar else chunk
+
+
+class JsonlStream:
+    """Re-iterable, picklable JSONL/NDJSON leg; each iteration opens a fresh chunk reader."""
+
+    def __init__(self, path: str, chunk_size: int = 10_000, columnar: bool = False):
+        self.path = str(path)
+        self.chunk_size = chunk_size
+        self.columnar = columnar
+
+    def __iter__(self) -> Iterator[list[dict] | dict[str, np.ndarray]]:
+        return iter_jsonl_chunks(self.path, chunk_size=self.chunk_size, columnar=self.columnar)
+
+
+def _row_key(cols: Mapping[str, Any], i: int) -> tuple:
+    ids = cols.get("id")
+    return (
+        np.asarray(cols["ts"])[i].item(),
+        np.asarray(cols["symbol"])[i].item(),
+        0 if ids is None else np.asarray(ids)[i].item(),
+    )
+
+
+def _first_unsorted(cols: Mapping[str, Any]) -> int | None:
+    """Index i of the first row whose key is greater than row i+1's, else None."""
+    n = column_length(cols)
+    if n < 2:
+        return None
+    keys = [np.asarray(cols["ts"]), np.asarray(cols["symbol"])]
+    if "id" in cols:
+        keys.append(np.asarray(cols["id"]))
+    gt = np.zeros(n - 1, dtype=bool)
+    eq = np.ones(n - 1, dtype=bool)
+    for k in keys:
+        a, b = k[:-1], k[1:]
+        gt |= eq & (a > b)
+        eq &= a == b
+    bad = np.flatnonzero(gt)
+    return int(bad[0]) if bad.size else None
+
+
+def check_sorted(chunks: Iterable[Any], name: str = "stream") -> Iterator[Any]:
+    """Pass chunks through unchanged, raising UnsortedStreamError on the first inversion."""
+    prev = None
+    offset = 0
+    for chunk in chunks:
+        if is_columnar(chunk):
+            n = column_length(chunk)
+            if n:
+                bad = _first_unsorted(chunk)
+                if bad is not None:
+                    _raise_unsorted(
+                        name, offset + bad + 1, _row_key(chunk, bad), _row_key(chunk, bad + 1)
+                    )
+                first, last = _row_key(chunk, 0), _row_key(chunk, n - 1)
+        else:
+            n = len(chunk)
+            keys = [event_sort_key(ev) for ev in chunk]
+            for i in range(1, n):
+                if keys[i - 1] > keys[i]:
+                    _raise_unsorted(name, offset + i, keys[i - 1], keys[i])
+            if n:
+                first, last = keys[0], keys[-1]
+        if n:
+            if prev is not None and prev > first:
+                _raise_unsorted(name, offset, prev, first)
+            prev = last
+        offset += n
+        yield chunk
+
+
+def _raise_unsorted(name: str, index: int, prev: tuple, key: tuple) -> None:
+    raise UnsortedStreamError(
+        f"{name}: events not sorted by (ts, symbol, id) at event {index}: {prev!r} > {key!r}"
+    )
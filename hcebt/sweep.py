@@ -0,0 +1,121 @@
+"""N-way FillConfig parameter sweeps over one shared, pre-sorted copy of the events.
+
+Events are loaded and sorted once and written as a tick store in a tmpfs directory
+(``/dev/shm`` where available); pool workers memory-map it, so every worker reads the same
+physical pages instead of receiving a pickled copy. Every variant is filled through the
+columnar runner path and persisted under its own run_id, ``<run_id>-<variant id>``, with
+the variant id as the row ``label``: ``label`` is not part of the primary key, so variants
+sharing a run_id would overwrite (TimescaleDB) or duplicate (ClickHouse) each other's rows.
+"""
+
+from collections.abc import Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import json
+import os
+import tempfile
+from typing import Any
+
+import numpy as np
+
+from .config import FillConfig, RunConfig
+from .events import concat_columns, is_columnar, sort_columns, to_columns
+from .runner import _make_model, _make_repo, _merge_reports, _repo_report, _simulate
+from .streaming import check_sorted
+from .tickstore import TickStore, TickStoreWriter
+
+
+def expand_grid(
+    base: FillConfig, grid: Mapping[str, Sequence[Any]]
+) -> list[tuple[str, FillConfig]]:
+    """Cartesian product of ``grid`` over ``base``; ids look like ``slip_mode=bps,bps=2.0``."""
+    unknown = sorted(set(grid) - set(FillConfig.model_fields))
+    if unknown:
+        raise ValueError(f"unknown FillConfig fields in sweep grid: {unknown}")
+    keys = list(grid)
+    variants = []
+    for values in itertools.product(*(grid[k] for k in keys)):
+        params = dict(zip(keys, values, strict=True))
+        fill = FillConfig(**{**base.model_dump(), **params})
+        vid = ",".join(f"{k}={getattr(fill, k)}" for k in keys) or "base"
+        variants.append((vid, fill))
+    return variants
+
+
+def load_sorted_columns(events) -> dict[str, np.ndarray]:
+    """Columns for a list, a columnar mapping or a stream of pre-sorted chunks, in replay order."""
+    if is_columnar(events):
+        return sort_columns(events)
+    if isinstance(events, list | tuple):
+        return sort_columns(to_columns(list(events)))
+    chunks = [c if is_columnar(c) else to_columns(c) for c in check_sorted(events, "sweep")]
+    return concat_columns(chunks)
+
+
+def _shared_dir() -> str | None:
+    # tmpfs-backed when available, so the mapped columns live in shared memory
+    return "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+_worker_cols: dict[str, np.ndarray] | None = None
+
+
+def _init_worker(path: str) -> None:
+    global _worker_cols
+    _worker_cols = TickStore(path).columns()
+
+
+def _run_variant(cfg: RunConfig, label: str, cols: Mapping[str, np.ndarray] | None = None):
+    """One variant with its own model and Repo."""
+    cols = _worker_cols if cols is None else cols
+    repo = _make_repo(cfg.batch)
+    repo.start()
+    try:
+        res = _simulate(cfg, _make_model(cfg.fill), repo, label, [cols])
+    finally:
+        repo.stop()
+    return res, _repo_report(repo)
+
+
+def sweep(cfg: RunConfig, events, grid: Mapping[str, Sequence[Any]], workers: int | None = None):
+    """Evaluate every FillConfig variant in ``grid`` against one load of ``events``.
+
+    Returns ``{"table": [...], "repo_metrics": {...}, "metrics": {...}}`` where each table row carries the
+    variant id, the run_id its rows were persisted under, its grid parameters and
+    fill_rate / slip_cost / events_per_sec. With ``workers == 1`` variants run in-process;
+    otherwise across a process pool.
+    """
+    variants = expand_grid(cfg.fill, grid)
+    cols = load_sorted_columns(events)
+    cfgs = [
+        RunConfig(
+            **{**cfg.model_dump(), "run_id": f"{cfg.run_id}-{vid}", "fill": fill.model_dump()}
+        )
+        for vid, fill in variants
+    ]
+    if workers == 1:
+        done = [_run_variant(c, vid, cols) for c, (vid, _) in zip(cfgs, variants, strict=True)]
+    else:
+        with tempfile.TemporaryDirectory(prefix="hcebt-sweep-", dir=_shared_dir()) as tmp:
+            path = os.path.join(tmp, "events")
+            with TickStoreWriter(path) as w:
+                w.append_columns(cols)
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(path,)
+            ) as pool:
+                futures = [
+                    pool.submit(_run_variant, c, vid)
+                    for c, (vid, _) in zip(cfgs, variants, strict=True)
+                ]
+                done = [f.result() for f in futures]
+    table = []
+    for (vid, fill), c, (res, _) in zip(variants, cfgs, done, strict=True):
+        row = {"variant": vid, "run_id": c.run_id, **{k: getattr(fill, k) for k in grid}}
+        row.update(
+            {k: res[k] for k in ("events", "fills", "fill_rate", "slip_cost", "events_per_sec")}
+        )
+        table.append(row)
+    os.makedirs("run_artifacts", exist_ok=True)
+    with open(f"run_artifacts/{cfg.run_id}_sweep.json", "w") as fh:
+        json.dump({"config": cfg.model_dump(), "grid": dict(grid), "table": table}, fh, indent=2)
+    return {"table": table, **_merge_reports([r for _, r in done])}
@@ -0,0 +1,261 @@
+"""Seeded synthetic tick/order events for load testing.
+
+``generate`` yields columnar chunks (see hcebt.events) in replay order. Each symbol's mid
+follows a geometric random walk with its own volatility; the spread, quantized to the
+tick, widens with the size of the move, and volume is log-normal and also grows with the
+move. Symbols differ in activity (Zipf-like weights). Event timestamps are strictly
+increasing epoch milliseconds with Poisson arrivals. Orders take a configurable
+market/limit/stop/stop-limit mix: limits rest a few ticks behind the touch (about one in
+ten crosses it), stops sit a few ticks beyond it.
+
+Chunk ``k`` draws from a generator seeded by ``(seed, k)``, and only the last mid per
+symbol carries over to the next chunk, so memory stays constant and the same seed and
+chunk size always give the same events. ``write_events`` streams the chunks to a JSON
+array or JSONL file, formatting whole chunks with NumPy (see ``render_lines``).
+"""
+
+from collections.abc import Iterable, Iterator, Mapping
+import os
+
+import numpy as np
+
+ORDER_TYPES = ("market", "limit", "stop", "stop-limit")
+DEFAULT_MIX = {"market": 0.4, "limit": 0.3, "stop": 0.15, "stop-limit": 0.15}
+BASE_TS = 1_690_000_000_000  # epoch ms
+CHUNK = 1 << 16
+
+# (field, decimals): None for strings, 0 for integers; decimals are fixed-point digits
+# with trailing zeros trimmed, prices are already rounded to the tick
+_FORMAT = (
+    ("id", 0),
+    ("ts", 0),
+    ("symbol", None),
+    ("bid", 8),
+    ("ask", 8),
+    ("last", 8),
+    ("vol", 2),
+    ("side", 0),
+    ("type", None),
+    ("qty", 3),
+    ("limit", 8),
+    ("stop", 8),
+    ("queue_pos", 4),
+)
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    """``"market=0.5,limit=0.5"`` -> normalized weights; unlisted types get weight 0."""
+    mix = dict.fromkeys(ORDER_TYPES, 0.0)
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        name, sep, weight = part.partition("=")
+        name = name.strip()
+        if not sep or name not in mix:
+            raise ValueError(f"bad order mix entry {part!r}; expected <type>=<weight>")
+        mix[name] = float(weight)
+    return _normalize(mix)
+
+
+def _normalize(mix: Mapping[str, float]) -> dict[str, float]:
+    unknown = set(mix) - set(ORDER_TYPES)
+    if unknown:
+        raise ValueError(f"unknown order types in mix: {sorted(unknown)}")
+    weights = [float(mix.get(t, 0.0)) for t in ORDER_TYPES]
+    if min(weights) < 0 or sum(weights) <= 0:
+        raise ValueError("order mix weights must be >= 0 with a positive sum")
+    total = sum(weights)
+    return {t: w / total for t, w in zip(ORDER_TYPES, weights, strict=True)}
+
+
+def _grouped_cumsum(values: np.ndarray, groups: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Running sum of ``values`` within each group, in input order; also returns, per
+    group present, the index of its last element."""
+    order = np.argsort(groups, kind="stable")
+    v = values[order]
+    g = groups[order]
+    starts = np.flatnonzero(np.r_[True, g[1:] != g[:-1]])
+    cs = np.cumsum(v)
+    offsets = cs[starts] - v[starts]
+    cs -= np.repeat(offsets, np.diff(np.r_[starts, len(v)]))
+    out = np.empty_like(cs)
+    out[order] = cs
+    return out, order[np.r_[starts[1:], len(v)] - 1]
+
+
+def generate(
+    n: int,
+    symbols: int = 16,
+    seed: int = 0,
+    mix: Mapping[str, float] | None = None,
+    start_ts: int = BASE_TS,
+    tick: float = 0.01,
+    chunk_size: int = CHUNK,
+) -> Iterator[dict[str, np.ndarray]]:
+    """``n`` events over ``symbols`` symbols as sorted columnar chunks (see module doc)."""
+    if symbols < 1:
+        raise ValueError("symbols must be >= 1")
+    probs = list(_normalize(mix if mix is not None else DEFAULT_MIX).values())
+    cuts = np.cumsum(probs)[:-1]
+    prm = np.random.default_rng([seed, 1 << 32])  # per-symbol parameters
+    names = np.array([f"SYM{i:04d}" for i in range(symbols)])
+    activity = 1.0 / np.arange(1, symbols + 1) ** 0.8
+    activity = prm.permutation(activity / activity.sum())
+    log_mid = prm.uniform(np.log(5.0), np.log(5000.0), symbols)
+    sigma = prm.uniform(1e-4, 1e-3, symbols)  # per-event log-return volatility
+    base_bp = prm.uniform(1.0, 5.0, symbols)  # typical spread, basis points of the mid
+    base_vol = prm.lognormal(3.0, 1.0, symbols)
+    ts = int(start_ts)
+    for k, start in enumerate(range(0, n, chunk_size)):
+        m = min(chunk_size, n - start)
+        rng = np.random.default_rng([seed, k])
+        sym = rng.choice(symbols, m, p=activity)
+        z = rng.standard_normal(m)
+        walk, last_idx = _grouped_cumsum(sigma[sym] * z, sym)
+        mid = np.exp(log_mid[sym] + walk)
+        log_mid[sym[last_idx]] += walk[last_idx]
+        # spread: a symbol-specific number of basis points, wider on big moves
+        spread_bp = base_bp[sym] * rng.lognormal(0.0, 0.25, m) * (1.0 + 0.5 * np.abs(z))
+        spread_ticks = np.maximum(1.0, np.rint(mid * spread_bp * 1e-4 / tick))
+        bid = np.rint((mid - spread_ticks * tick / 2) / tick)
+        ask = (bid + spread_ticks) * tick
+        bid *= tick
+        last = np.where(rng.random(m) < 0.5, bid, ask)
+        vol = base_vol[sym] * rng.lognormal(0.0, 0.75, m) * (1.0 + np.abs(z))
+        side = rng.integers(0, 2, m, dtype=np.int8) * np.int8(2) - np.int8(1)
+        kind = np.searchsorted(cuts, rng.random(m), side="right")
+        touch = np.where(side > 0, bid, ask)  # passive side of the book
+        behind = rng.geometric(0.35, m) - 1.0
+        behind[rng.random(m) < 0.1] *= -1.0  # marketable limits
+        limit = touch - side * behind * tick
+        stop = np.where(side > 0, ask, bid) + side * rng.geometric(0.25, m) * tick
+        # stop-limit: the limit sits a few ticks past the stop trigger
+        stop_limit = stop + side * rng.geometric(0.5, m) * tick
+        gaps = 1 + np.floor(rng.exponential(9.0, m)).astype(np.int64)
+        times = ts + np.cumsum(gaps)
+        ts = int(times[-1])
+        yield {
+            "id": np.arange(start, start + m, dtype=np.int64),
+            "ts": times,
+            "symbol": names[sym],
+            "bid": np.round(bid, 8),
+            "ask": np.round(ask, 8),
+            "last": np.round(last, 8),
+            "vol": np.round(vol, 2),
+            "side": side,
+            "type": np.array(ORDER_TYPES)[kind],
+            "qty": np.maximum(np.round(rng.lognormal(0.0, 1.0, m), 3), 0.001),
+            "limit": np.round(np.select([kind == 1, kind == 3], [limit, stop_limit], np.nan), 8),
+            "stop": np.round(np.where(kind >= 2, stop, np.nan), 8),
+            "queue_pos": np.round(rng.random(m), 4),
+        }
+
+
+# Fields are rendered as (n, width) uint8 blocks of ASCII, NUL where a shorter value
+# leaves padding.
+
+
+def _digits(values: np.ndarray, width: int) -> np.ndarray:
+    """ASCII decimal digits of non-negative ints, right-aligned, zero-filled."""
+    powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    return (values[:, None] // powers % 10 + 48).astype(np.uint8)
+
+
+def _width(values: np.ndarray) -> int:
+    return len(str(int(values.max()))) if len(values) else 1
+
+
+def _int_block(mag: np.ndarray, sign: np.ndarray | None = None) -> np.ndarray:
+    """ASCII of non-negative ints without leading zeros, optionally after a '-' column."""
+    width = _width(mag) + 1
+    digits = _digits(mag, width)
+    ndigits = np.searchsorted(10 ** np.arange(1, width, dtype=np.int64), mag, side="right") + 1
+    digits *= np.arange(width) >= width - ndigits[:, None]  # leading zeros -> NUL
+    if sign is not None:
+        digits[:, 0] = sign * np.uint8(45)
+    return digits
+
+
+def _int_field(values: np.ndarray) -> np.ndarray:
+    v = values.astype(np.int64)
+    return _int_block(np.abs(v), v < 0)
+
+
+def _fixed_field(values: np.ndarray, decimals: int) -> np.ndarray:
+    nan = np.isnan(values)
+    mag = np.abs(np.where(nan, 0.0, values))
+    # fewest decimals (up to ``decimals``) that represent the whole chunk, e.g. 2 for
+    # prices on a 0.01 tick
+    for d in range(1, decimals + 1):
+        scaled = np.rint(mag * 10**d)
+        if d == decimals or np.all(np.abs(scaled - mag * 10**d) < 1e-6):
+            break
+    scaled = scaled.astype(np.int64)
+    unit = 10**d
+    frac = scaled % unit
+    # trailing zeros, keeping one fractional digit: 35.0, not 35
+    zeros = sum((frac % 10**k == 0).astype(np.int64) for k in range(1, d))
+    frac_digits = _digits(frac, d)
+    if d > 1:
+        frac_digits *= np.arange(d) < d - zeros[:, None]
+    point = np.full((len(values), 1), 46, dtype=np.uint8)
+    whole = _int_block(scaled // unit, (values < 0) & (scaled > 0))
+    out = np.concatenate([whole, point, frac_digits], axis=1)
+    if nan.any():
+        null = np.zeros(out.shape[1], dtype=np.uint8)
+        null[:4] = np.frombuffer(b"null", dtype=np.uint8)
+        out[nan] = null
+    return out
+
+
+def _str_field(values: np.ndarray) -> np.ndarray:
+    values = np.asarray(values, dtype=str)
+    codes = values.view(np.uint32).reshape(len(values), values.dtype.itemsize // 4)
+    if codes.size and (codes.max() > 126 or np.isin(codes, (34, 92)).any()):
+        raise ValueError("string fields must be printable ASCII without quotes or backslashes")
+    return codes.astype(np.uint8)  # NUL padding stays NUL
+
+
+def _literal(text: str, n: int) -> np.ndarray:
+    return np.broadcast_to(np.frombuffer(text.encode(), dtype=np.uint8), (n, len(text)))
+
+
+def render_lines(chunk: Mapping[str, np.ndarray], end: str = "\n") -> bytes:
+    """One JSON object per event, each followed by ``end``; NaN limit/stop prices are
+    written as null.
+
+    Every field is rendered column-wise into a byte matrix padded with NUL bytes, and the
+    padding is dropped in one pass, so no Python code runs per event.
+    """
+    n = len(chunk["ts"])
+    blocks = []
+    sep = "{"
+    for name, decimals in _FORMAT:
+        values = np.asarray(chunk[name])
+        quote = '"' if decimals is None else ""
+        blocks.append(_literal(f'{sep}"{name}":{quote}', n))
+        if decimals is None:
+            blocks.append(_str_field(values))
+        elif decimals == 0:
+            blocks.append(_int_field(values))
+        else:
+            blocks.append(_fixed_field(values.astype(np.float64), decimals))
+        sep = quote + ","
+    blocks.append(_literal(sep[:-1] + "}" + end, n))
+    flat = np.concatenate(blocks, axis=1).ravel()
+    return flat[flat != 0].tobytes()
+
+
+def write_events(path: str, chunks: Iterable[Mapping[str, np.ndarray]], jsonl: bool) -> int:
+    """Stream chunks to ``path`` as JSONL (one event per line) or a JSON array."""
+    count = 0
+    with open(path, "wb") as fh:
+        if not jsonl:
+            fh.write(b"[\n")
+        for chunk in chunks:
+            if len(chunk["ts"]):
+                fh.write(render_lines(chunk, "\n" if jsonl else ",\n"))
+                count += len(chunk["ts"])
+        if not jsonl:
+            if count:
+                fh.seek(-2, os.SEEK_END)  # the last event's ",\n"
+            fh.write(b"\n]\n")
+    return count
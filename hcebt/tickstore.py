@@ -0,0 +1,311 @@
+"""Memory-mapped binary tick store.
+
+A store is a directory holding one raw little-endian file per event column plus
+``meta.json``. Symbols and order types are dictionary encoded (``symbol`` holds int32 codes
+into ``meta["symbols"]``; ``type`` holds ORDER_TYPES codes, -1 for unknown types) and
+missing limit/stop prices are NaN. ``ts`` is float64: numeric timestamps are stored as
+given (so lib.timeutil's seconds/milliseconds heuristic still applies) and ISO strings as
+epoch seconds.
+
+Rows are sorted by (ts, symbol, id). A sparse index keeps the ts of every
+``block_rows``-th row and, per block, the symbol codes present in it (CSR layout), so
+time-range and per-symbol slices only touch the blocks they need. Columns are opened
+with ``numpy.memmap``; unfiltered and time-range reads are zero-copy views.
+"""
+
+from collections.abc import Iterable, Iterator, Mapping
+import json
+import os
+import shutil
+import tempfile
+from typing import Any
+
+import numpy as np
+
+from lib.timeutil import to_epoch_us_array
+
+from .events import column_length, event_sort_key, to_columns, with_defaults
+from .fills import ORDER_TYPES, encode_order_types, optional_prices
+from .streaming import UnsortedStreamError, check_sorted, is_stream_path, iter_jsonl_chunks
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+COLUMN_DTYPES = {
+    "ts": "<f8",
+    "symbol": "<i4",
+    "bid": "<f8",
+    "ask": "<f8",
+    "last": "<f8",
+    "mark": "<f8",
+    "vol": "<f8",
+    "side": "<i1",
+    "type": "<i1",
+    "qty": "<f8",
+    "limit": "<f8",
+    "stop": "<f8",
+    "queue_pos": "<f8",
+    "id": "<i8",
+}
+INDEX_DTYPES = {"block_ts": "<f8", "block_sym_ptr": "<i8", "block_sym": "<i4"}
+
+
+def is_tick_store(path: str) -> bool:
+    return os.path.isfile(os.path.join(str(path), META_FILE))
+
+
+def _ts_value(value: Any) -> float:
+    """Stored ts: numbers unchanged, ISO strings as epoch seconds."""
+    if isinstance(value, int | float):
+        return float(value)
+    return float(to_epoch_us_array([value])[0]) / 1e6
+
+
+def encode_ts(ts: np.ndarray) -> np.ndarray:
+    """float64 ts column: numbers as given, ISO strings as epoch seconds."""
+    if ts.dtype.kind in "iuf":
+        return ts.astype(np.float64)
+    return to_epoch_us_array(ts) / 1e6
+
+
+class TickStoreWriter:
+    """Append sorted event chunks to a new tick store; ``close()`` writes index and meta.
+
+    The store is built in a hidden sibling directory and renamed to ``path`` by ``close()``
+    (replacing an existing store there), so a write that fails part way, e.g. on unsorted
+    input, leaves no partial store behind: leaving the ``with`` block on an exception calls
+    ``abort()`` instead.
+    """
+
+    def __init__(self, path: str, block_rows: int = 4096):
+        self.path = os.path.abspath(str(path))
+        self.block_rows = max(1, int(block_rows))
+        parent, name = os.path.split(self.path)
+        os.makedirs(parent, exist_ok=True)
+        self._dir = tempfile.mkdtemp(prefix=f".{name}-", dir=parent)
+        self.rows = 0
+        self.symbols: dict[str, int] = {}
+        self._last_key: tuple | None = None
+        self._files = {c: open(self._file(c), "wb") for c in COLUMN_DTYPES}
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self._dir, f"{name}.bin")
+
+    def __enter__(self) -> "TickStoreWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def append(self, events: list[dict]) -> None:
+        if not events:
+            return
+        cols = to_columns(events)
+        cols["mark"] = np.asarray([ev.get("mark", ev["last"]) for ev in events], dtype=np.float64)
+        self.append_columns(cols)
+
+    def append_columns(self, cols: Mapping[str, Any]) -> None:
+        n = column_length(cols)
+        if not n:
+            return
+        cols = with_defaults(cols)
+        cols["ts"] = encode_ts(cols["ts"])
+        cols.setdefault("mark", cols["last"])
+        cols["limit"] = optional_prices(cols["limit"], n)
+        cols["stop"] = optional_prices(cols["stop"], n)
+        # verify on the encoded ts so the stored order is what gets checked
+        list(check_sorted([cols], name=self.path))
+        first, last = _key_at(cols, 0), _key_at(cols, n - 1)
+        if self._last_key is not None and self._last_key > first:
+            raise UnsortedStreamError(
+                f"{self.path}: events not sorted by (ts, symbol, id) at event {self.rows}: "
+                f"{self._last_key!r} > {first!r}"
+            )
+        self._last_key = last
+        uniq, inv = np.unique(cols["symbol"].astype(str), return_inverse=True)
+        lut = np.array(
+            [self.symbols.setdefault(sym, len(self.symbols)) for sym in uniq.tolist()],
+            dtype=np.int32,
+        )
+        cols["symbol"] = lut[inv]
+        cols["type"] = encode_order_types(cols["type"])
+        for name, dtype in COLUMN_DTYPES.items():
+            self._files[name].write(np.ascontiguousarray(cols[name], dtype=dtype).tobytes())
+        self.rows += n
+
+    def close(self) -> None:
+        if self._files is None:
+            return
+        for fh in self._files.values():
+            fh.close()
+        self._files = None
+        ts = _open_column(self._file("ts"), COLUMN_DTYPES["ts"], self.rows)
+        sym = _open_column(self._file("symbol"), COLUMN_DTYPES["symbol"], self.rows)
+        starts = np.arange(0, self.rows, self.block_rows)
+        per_block = [np.unique(sym[s : s + self.block_rows]) for s in starts.tolist()]
+        ptr = np.zeros(len(per_block) + 1, dtype=np.int64)
+        ptr[1:] = np.cumsum([len(b) for b in per_block])
+        index = {
+            "block_ts": np.asarray(ts[starts]),
+            "block_sym_ptr": ptr,
+            "block_sym": np.concatenate(per_block) if per_block else np.empty(0),
+        }
+        for name, arr in index.items():
+            with open(self._file(name), "wb") as fh:
+                fh.write(np.ascontiguousarray(arr, dtype=INDEX_DTYPES[name]).tobytes())
+        meta = {
+            "version": FORMAT_VERSION,
+            "rows": self.rows,
+            "block_rows": self.block_rows,
+            "columns": COLUMN_DTYPES,
+            "symbols": sorted(self.symbols, key=self.symbols.__getitem__),
+            "order_types": list(ORDER_TYPES),
+        }
+        with open(os.path.join(self._dir, META_FILE), "w") as fh:
+            json.dump(meta, fh, indent=2)
+        if is_tick_store(self.path):
+            shutil.rmtree(self.path)
+        os.replace(self._dir, self.path)
+
+    def abort(self) -> None:
+        """Discard the store being written."""
+        if self._files is not None:
+            for fh in self._files.values():
+                fh.close()
+            self._files = None
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+
+def _key_at(cols: dict[str, np.ndarray], i: int) -> tuple:
+    return (cols["ts"][i].item(), cols["symbol"][i].item(), cols["id"][i].item())
+
+
+def _open_column(path: str, dtype: str, rows: int) -> np.ndarray:
+    # np.memmap cannot map empty files
+    if rows == 0 or os.path.getsize(path) == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+def write_tick_store(path: str, chunks: Iterable[list[dict]], block_rows: int = 4096) -> int:
+    """Write pre-sorted event chunks to a tick store; returns the row count."""
+    with TickStoreWriter(path, block_rows=block_rows) as w:
+        for chunk in chunks:
+            w.append(chunk)
+    return w.rows
+
+
+def convert_events(src: str, dst: str, chunk_size: int = 50_000, block_rows: int = 4096) -> int:
+    """Convert a JSON array (sorted in memory) or a sorted JSONL/NDJSON file to a tick store."""
+    if is_stream_path(src):
+        chunks: Iterable[list[dict]] = iter_jsonl_chunks(src, chunk_size=chunk_size)
+    else:
+        with open(src) as fh:
+            events = json.load(fh)
+        events.sort(key=lambda ev: (_ts_value(ev["ts"]),) + event_sort_key(ev)[1:])
+        chunks = (events[i : i + chunk_size] for i in range(0, len(events), chunk_size))
+    return write_tick_store(dst, chunks, block_rows=block_rows)
+
+
+class TickStore:
+    """Read-only, memory-mapped view of a tick store directory.
+
+    Iterating a store yields columnar chunks (see hcebt.events), so it can be passed to
+    run_ab directly as a leg.
+    """
+
+    def __init__(self, path: str, chunk_size: int = 50_000):
+        self.path = str(path)
+        self.chunk_size = max(1, int(chunk_size))
+        with open(os.path.join(self.path, META_FILE)) as fh:
+            self.meta = json.load(fh)
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(
+                f"{self.path}: unsupported tick store version {self.meta.get('version')!r}"
+            )
+        self.rows = int(self.meta["rows"])
+        self.block_rows = int(self.meta["block_rows"])
+        self.symbols = np.asarray(self.meta["symbols"], dtype=str)
+        self._symbol_codes = {s: i for i, s in enumerate(self.meta["symbols"])}
+        self.cols = {
+            name: _open_column(os.path.join(self.path, f"{name}.bin"), dtype, self.rows)
+            for name, dtype in self.meta["columns"].items()
+        }
+        n_blocks = -(-self.rows // self.block_rows)
+        self.index = {
+            name: _open_column(os.path.join(self.path, f"{name}.bin"), dtype, n_blocks)
+            for name, dtype in INDEX_DTYPES.items()
+        }
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __reduce__(self):
+        # reopen by path in worker processes instead of pickling mapped columns
+        return (TickStore, (self.path, self.chunk_size))
+
+    def __iter__(self) -> Iterator[dict[str, np.ndarray]]:
+        return self.iter_chunks()
+
+    def _row_range(self, start_ts: float | None, end_ts: float | None) -> tuple[int, int]:
+        """Rows with start_ts <= ts < end_ts, located via the block index then the block."""
+        ts, block_ts = self.cols["ts"], self.index["block_ts"]
+
+        def bound(value: float | None, default: int) -> int:
+            if value is None:
+                return default
+            b = max(0, int(np.searchsorted(block_ts, value, side="left")) - 1)
+            lo, hi = b * self.block_rows, min(self.rows, (b + 2) * self.block_rows)
+            # the first row >= value lies in block b or at the start of block b+1
+            return lo + int(np.searchsorted(ts[lo:hi], value, side="left"))
+
+        return bound(start_ts, 0), bound(end_ts, self.rows)
+
+    def _symbol_blocks(self, symbol: str) -> np.ndarray:
+        code = self._symbol_codes.get(symbol)
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        hits = np.flatnonzero(self.index["block_sym"] == code)
+        return np.searchsorted(self.index["block_sym_ptr"], hits, side="right") - 1
+
+    def _decode(self, cols: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        out = dict(cols)
+        out["symbol"] = self.symbols[cols["symbol"]]
+        return out
+
+    def columns(
+        self, start_ts: float | None = None, end_ts: float | None = None, symbol: str | None = None
+    ) -> dict[str, np.ndarray]:
+        """Columnar slice for ``start_ts <= ts < end_ts`` and, optionally, one symbol."""
+        lo, hi = self._row_range(start_ts, end_ts)
+        if symbol is None:
+            return self._decode({k: v[lo:hi] for k, v in self.cols.items()})
+        code = self._symbol_codes.get(symbol, -1)
+        parts = []
+        for b in self._symbol_blocks(symbol).tolist():
+            s, e = max(lo, b * self.block_rows), min(hi, (b + 1) * self.block_rows)
+            if s < e:
+                parts.append(s + np.flatnonzero(self.cols["symbol"][s:e] == code))
+        rows = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+        return self._decode({k: v[rows] for k, v in self.cols.items()})
+
+    def iter_chunks(
+        self,
+        chunk_size: int | None = None,
+        start_ts: float | None = None,
+        end_ts: float | None = None,
+        symbol: str | None = None,
+    ) -> Iterator[dict[str, np.ndarray]]:
+        step = max(1, int(chunk_size or self.chunk_size))
+        if symbol is not None:
+            cols = self.columns(start_ts, end_ts, symbol)
+            n = len(cols["ts"])
+            for s in range(0, n, step):
+                yield {k: v[s : s + step] for k, v in cols.items()}
+            return
+        lo, hi = self._row_range(start_ts, end_ts)
+        for s in range(lo, hi, step):
+            e = min(hi, s + step)
+            yield self._decode({k: v[s:e] for k, v in self.cols.items()})
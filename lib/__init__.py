@@ -1,4 +1,4 @@
 from .kahan import KahanSum
-from .timeutil import to_utc_iso
+from .timeutil import to_epoch_ms_array, to_epoch_us_array, to_utc_iso, to_utc_iso_array
 
-__all__ = ["KahanSum", "to_utc_iso"]
+__all__ = ["KahanSum", "to_epoch_ms_array", "to_epoch_us_array", "to_utc_iso", "to_utc_iso_array"]
@@ -1,13 +1,116 @@
+"""Compensated float summation whose result does not depend on order or chunking.
+
+``KahanSum`` keeps the running total exactly: every finite double is an integer multiple
+of 2**-1126 once its 53-bit mantissa is taken as an integer, so the accumulator is that
+multiple as a Python int. ``value()`` rounds the exact total to the nearest double once,
+so adding the same values one by one, as arrays in any chunking, or as partial sums merged
+from shards or processes gives the same float, with no compensation error left over.
+Infinities and NaN propagate as they would in plain float addition.
+
+``add_array`` is vectorized: mantissas are split into 26/27-bit halves and summed per
+binary exponent with ``np.bincount`` (exact in float64 for up to ``_CHUNK`` values), and
+only the per-exponent totals, a few dozen for typical data, are combined as Python ints.
+Scalar ``add`` calls are buffered and folded in the same way every ``_PENDING`` values.
+
+The classic Kahan attributes remain as read-only properties: ``sum`` is ``value()`` and
+``c`` the compensation, the (rounded) amount by which ``sum`` exceeds the exact total.
+"""
+
+from collections.abc import Iterable
+import math
+
+import numpy as np
+
+_SCALE = 1126  # 1074 (smallest subnormal exponent) + 52 mantissa bits below the point
+_LO_BITS = 26
+_CHUNK = 1 << 24  # |hi| < 2**27, so a bin sums at most 2**51 and stays exact in float64
+_PENDING = 4096
+
+
 class KahanSum:
     def __init__(self):
-        self.sum = 0.0
-        self.c = 0.0
+        self._acc = 0  # exact finite total, in units of 2**-_SCALE
+        self._special = 0.0  # sum of the non-finite values seen (0.0, +-inf or nan)
+        self._pending: list[float] = []  # scalar adds, folded in by add_array in batches
 
     def add(self, x: float):
-        y = x - self.c
-        t = self.sum + y
-        self.c = (t - self.sum) - y
-        self.sum = t
+        self._pending.append(x)
+        if len(self._pending) >= _PENDING:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._pending:
+            pending, self._pending = self._pending, []
+            self.add_array(pending)
+
+    def add_array(self, values) -> None:
+        """Add every element of a float array (or anything ``np.asarray`` accepts)."""
+        arr = np.asarray(values, dtype=np.float64).ravel()
+        finite = np.isfinite(arr)
+        if not finite.all():
+            for x in arr[~finite].tolist():
+                self._special += x
+            arr = arr[finite]
+        for start in range(0, len(arr), _CHUNK):
+            self._add_finite(arr[start : start + _CHUNK])
+
+    def _add_finite(self, arr: np.ndarray) -> None:
+        mant, exp = np.frexp(arr)
+        mant = np.ldexp(mant, 53).astype(np.int64)  # exact: |mant| < 2**53
+        shift = exp + (_SCALE - 53)  # >= 0 for every finite double
+        hi = (mant >> _LO_BITS).astype(np.float64)
+        lo = (mant & ((1 << _LO_BITS) - 1)).astype(np.float64)
+        hi_sums = np.bincount(shift, weights=hi)
+        lo_sums = np.bincount(shift, weights=lo)
+        acc = 0
+        for s in np.flatnonzero((hi_sums != 0) | (lo_sums != 0)).tolist():
+            acc += ((int(hi_sums[s]) << _LO_BITS) + int(lo_sums[s])) << s
+        self._acc += acc
+
+    def update(self, chunks: Iterable) -> "KahanSum":
+        """Streaming form: add each chunk of an iterable (arrays or single floats)."""
+        for chunk in chunks:
+            if np.ndim(chunk):
+                self.add_array(chunk)
+            else:
+                self.add(chunk)
+        return self
+
+    def merge(self, other: "KahanSum") -> "KahanSum":
+        """Fold in another accumulator's exact total, e.g. a shard's partial sum."""
+        other._flush()
+        self._acc += other._acc
+        self._special += other._special
+        return self
+
+    def state(self) -> tuple[int, float]:
+        """Exact, picklable state for checkpoints; see ``from_state``."""
+        self._flush()
+        return self._acc, self._special
+
+    @classmethod
+    def from_state(cls, state: tuple[int, float]) -> "KahanSum":
+        ks = cls()
+        ks._acc, ks._special = int(state[0]), float(state[1])
+        return ks
+
+    @property
+    def sum(self) -> float:
+        return self.value()
+
+    @property
+    def c(self) -> float:
+        total = self.value()
+        if not math.isfinite(total):
+            return 0.0
+        num, den = total.as_integer_ratio()  # den is a power of two <= 2**1074
+        return ((num << _SCALE) // den - self._acc) / (1 << _SCALE)
 
     def value(self) -> float:
-        return float(self.sum)
+        self._flush()
+        if self._special != 0.0:
+            return float(self._special)
+        try:
+            return self._acc / (1 << _SCALE)  # int / int is correctly rounded
+        except OverflowError:
+            return math.inf if self._acc > 0 else -math.inf
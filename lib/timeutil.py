@@ -1,4 +1,14 @@
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
+
+import numpy as np
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+_ONE_US = timedelta(microseconds=1)
+# datetime's supported range, in epoch microseconds
+_MIN_US = int((datetime(1, 1, 1, tzinfo=UTC) - _EPOCH).total_seconds()) * 1_000_000
+_MAX_US = (
+    int((datetime(9999, 12, 31, 23, 59, 59, tzinfo=UTC) - _EPOCH).total_seconds() + 1) * 1_000_000
+)
 
 
 def to_utc_iso(ts):
@@ -16,3 +26,116 @@ def to_utc_iso(ts):
             raise ValueError(f"Invalid ISO timestamp: {ts!r}") from e
     # Unsupported type
     raise TypeError(f"Unsupported timestamp type: {type(ts).__name__}")
+
+
+def _as_1d(values) -> np.ndarray:
+    try:
+        arr = np.asarray(values)
+    except ValueError:  # ragged input, e.g. a list among the timestamps
+        arr = np.array(values, dtype=object)
+    if arr.dtype.kind == "U" and not isinstance(values, np.ndarray):
+        # NumPy would stringify numbers mixed in with ISO strings; keep them as-is
+        if not all(isinstance(v, str) for v in values):
+            arr = np.array(values, dtype=object)
+    if arr.ndim != 1:
+        raise TypeError(f"Expected a 1-D sequence of timestamps, got shape {arr.shape}")
+    return arr
+
+
+def _numeric_epoch_us(arr: np.ndarray) -> np.ndarray:
+    """Epoch microseconds for numeric timestamps, rounded exactly like datetime.fromtimestamp
+    (same >1e12 milliseconds heuristic, half-even rounding of the fractional second)."""
+    if arr.dtype.kind in "iub":
+        # range-check before scaling, which would otherwise wrap int64 silently
+        bad = (
+            (arr < _MIN_US // 1_000_000)
+            | ((arr >= _MAX_US // 1_000_000) & (arr <= 1e12))
+            | (arr >= _MAX_US // 1000)
+        )
+        if bad.any():
+            for v in arr[bad].tolist():
+                to_utc_iso(v)
+        ints = arr.astype(np.int64)
+        return np.where(ints > 1e12, ints * 1000, ints * 1_000_000)
+    t = arr.astype(np.float64)
+    t = np.where(t > 1e12, t / 1000.0, t)
+    if not np.isfinite(t).all() or (np.abs(t) > _MAX_US / 1e6).any():
+        # let the scalar path raise its own error for NaN/inf/out-of-range values
+        for v in arr.tolist():
+            to_utc_iso(v)
+    frac, whole = np.modf(t)
+    us = np.round(frac * 1e6)
+    whole = np.where(us >= 1e6, whole + 1, np.where(us < 0, whole - 1, whole))
+    us = np.where(us >= 1e6, us - 1e6, np.where(us < 0, us + 1e6, us))
+    return whole.astype(np.int64) * 1_000_000 + us.astype(np.int64)
+
+
+def _iso_epoch_us(ts: str) -> int:
+    try:
+        dt = datetime.fromisoformat(ts.replace("Z", "+00:00")).astimezone(UTC)
+    except Exception as e:
+        raise ValueError(f"Invalid ISO timestamp: {ts!r}") from e
+    return (dt - _EPOCH) // _ONE_US
+
+
+def _scalar_epoch_us(ts) -> int:
+    if isinstance(ts, str):
+        return _iso_epoch_us(ts)
+    if isinstance(ts, (int, float)):
+        return int(_numeric_epoch_us(np.asarray([ts]))[0])
+    raise TypeError(f"Unsupported timestamp type: {type(ts).__name__}")
+
+
+def to_epoch_us_array(values) -> np.ndarray:
+    """Vectorized epoch microseconds (int64) for epoch-s/ms numbers or ISO strings.
+
+    Numbers go through NumPy in one pass; strings are parsed once per distinct value.
+    Raises ValueError/TypeError like to_utc_iso.
+    """
+    arr = _as_1d(values)
+    if arr.dtype.kind in "iubf":
+        return _numeric_epoch_us(arr)
+    if arr.dtype.kind == "U":
+        uniq, inv = np.unique(arr, return_inverse=True)
+        return np.array([_iso_epoch_us(s) for s in uniq.tolist()], dtype=np.int64)[inv]
+    # mixed/object input: element-wise with a per-value cache
+    cache: dict = {}
+    out = np.empty(len(arr), dtype=np.int64)
+    for i, v in enumerate(arr.tolist()):
+        key = (type(v), v) if isinstance(v, (int, float, str)) else None
+        if key is None or key not in cache:
+            us = _scalar_epoch_us(v)
+            if key is None:
+                out[i] = us
+                continue
+            cache[key] = us
+        out[i] = cache[key]
+    return out
+
+
+def to_epoch_ms_array(values) -> np.ndarray:
+    """Epoch milliseconds (int64, sub-millisecond part truncated) for ClickHouse
+    DateTime64(3) / Timescale TIMESTAMPTZ writes that skip string formatting."""
+    return to_epoch_us_array(values) // 1000
+
+
+def to_utc_iso_array(values) -> list[str]:
+    """Vectorized to_utc_iso: same strings, same ValueError/TypeError strictness."""
+    arr = _as_1d(values)
+    if arr.dtype.kind == "U":
+        # parse each distinct string once
+        uniq, inv = np.unique(arr, return_inverse=True)
+        iso = [to_utc_iso(s) for s in uniq.tolist()]
+        return [iso[i] for i in inv.tolist()]
+    if arr.dtype.kind not in "iubf":
+        return [to_utc_iso(v) for v in arr.tolist()]
+    us = _numeric_epoch_us(arr)
+    if len(us) and (us.min() < _MIN_US or us.max() >= _MAX_US):
+        return [to_utc_iso(v) for v in arr.tolist()]
+    dt = us.astype("datetime64[us]")
+    text = np.datetime_as_string(dt, unit="us").astype("U32")
+    # isoformat() drops the fraction for whole seconds
+    whole = us % 1_000_000 == 0
+    if whole.any():
+        text[whole] = np.datetime_as_string(dt[whole], unit="s")
+    return np.char.add(text, "+00:00").tolist()
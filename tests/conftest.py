@@ -0,0 +1,5 @@
+def strip_timing(res: dict, *extra: str) -> dict:
+    """run_ab leg results without ``events_per_sec`` (and ``extra`` keys), which vary with
+    wall-clock time."""
+    drop = {"events_per_sec", *extra}
+    return {leg: {k: v for k, v in res[leg].items() if k not in drop} for leg in "AB"}
@@ -0,0 +1,224 @@
+import asyncio
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from hcebt import async_repo
+from hcebt.async_repo import AsyncRepo
+from hcebt.config import RunConfig
+from hcebt.persistence import RepoConfig, RowBatch
+from hcebt.runner import run_ab
+
+
+class _StubClickHouse(BaseHTTPRequestHandler):
+    """Accepts ``INSERT ... FORMAT JSONEachRow`` like ClickHouse's HTTP interface."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        srv = self.server
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        with srv.lock:
+            srv.active += 1
+            srv.peak = max(srv.peak, srv.active)
+            fail = srv.failures > 0
+            srv.failures -= fail
+        time.sleep(srv.delay)
+        with srv.lock:
+            srv.active -= 1
+            if not fail:
+                srv.queries.append(parse_qs(urlsplit(self.path).query))
+                srv.rows.extend(json.loads(line) for line in body.splitlines())
+        self.send_response(500 if fail else 200)
+        payload = b"Code: 241. DB::Exception: stub failure" if fail else b""
+        if srv.chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            if payload:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(payload), payload))
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def clickhouse():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _StubClickHouse)
+    srv.daemon_threads = True
+    srv.lock = threading.Lock()
+    srv.rows, srv.queries = [], []
+    srv.active = srv.peak = srv.failures = 0
+    srv.delay = 0.0
+    srv.chunked = False
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    srv.url = f"http://127.0.0.1:{srv.server_address[1]}"
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _rows(n, start=0, run_id="r"):
+    return RowBatch(
+        {
+            "run_id": [run_id] * n,
+            "ts": [1690000000000 + i for i in range(start, start + n)],
+            "symbol": ["BTC"] * n,
+            "metric": ["fill_cost"] * n,
+            "value": [i * 0.5 for i in range(start, start + n)],
+            "label": ["A"] * n,
+        },
+        n,
+    )
+
+
+def _repo(url, **kw):
+    kw = {"batch_size": 10, "flush_interval_ms": 20, "ts_format": "epoch_ms", **kw}
+    return AsyncRepo(RepoConfig(backend="clickhouse", clickhouse_url=url, **kw))
+
+
+def _events(n):
+    return [
+        {
+            "id": i,
+            "ts": 1690000000000 + i * 1000,
+            "symbol": ("BTC", "ETH")[i % 2],
+            "bid": 99.5,
+            "ask": 100.5,
+            "last": 100.0,
+            "type": ("market", "limit")[i % 2],
+            "qty": 1.0,
+            "limit": 100.6,
+        }
+        for i in range(n)
+    ]
+
+
+def test_run_ab_writes_through_async_clickhouse(clickhouse, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    batch = {"backend": "clickhouse", "clickhouse_url": clickhouse.url, "io": "asyncio"}
+    res = run_ab(RunConfig(run_id="aio", batch={**batch, "batch_size": 8}), _events(50), [])
+    plain = run_ab(RunConfig(run_id="aio"), _events(50), [])
+    assert res["A"] == {**plain["A"], "events_per_sec": res["A"]["events_per_sec"]}
+    assert res["repo_metrics"]["written_rows"] == len(clickhouse.rows) == 50
+    assert {r["run_id"] for r in clickhouse.rows} == {"aio"}
+    assert sorted(clickhouse.rows[0]) == ["label", "metric", "run_id", "symbol", "ts", "value"]
+    query = clickhouse.queries[0]["query"][0]
+    assert query.startswith("INSERT INTO market_signals (label,metric,run_id,symbol,ts,value)")
+
+
+def test_inserts_overlap_up_to_max_inflight(clickhouse):
+    clickhouse.delay = 0.15
+    repo = _repo(clickhouse.url, max_inflight=3, queue_max=100)
+    repo.start()
+    t0 = time.perf_counter()
+    for i in range(9):
+        repo.submit(_rows(10, start=i * 10))
+    repo.stop()
+    elapsed = time.perf_counter() - t0
+    assert len(clickhouse.rows) == 90 and repo.metrics["written_rows"] == 90
+    assert clickhouse.peak == 3
+    assert elapsed < 9 * 0.15  # serial inserts would take at least this long
+
+
+def test_retries_do_not_block_other_inserts(clickhouse, monkeypatch):
+    monkeypatch.setattr(async_repo, "backoff", lambda attempts: 0.6)
+    clickhouse.failures = 1
+    clickhouse.chunked = True
+    repo = _repo(clickhouse.url, max_inflight=2)
+    repo.start()
+    repo.submit(_rows(10))
+    time.sleep(0.1)  # the first insert fails and starts backing off
+    repo.submit(_rows(10, start=10))
+    time.sleep(0.25)
+    # the second batch was written while the first one waited for its retry
+    assert [r["ts"] for r in clickhouse.rows] == [1690000000000 + i for i in range(10, 20)]
+    repo.stop()
+    assert len(clickhouse.rows) == 20 and repo.metrics["batch_retry_count"] == 1
+
+
+def test_failed_batches_are_given_up(clickhouse, monkeypatch):
+    monkeypatch.setattr(async_repo, "backoff", lambda attempts: 0.0)
+    clickhouse.failures = 10
+    repo = _repo(clickhouse.url, max_inflight=1)
+    repo.start()
+    repo.submit(_rows(10))
+    repo.stop()
+    assert repo.metrics["written_rows"] == 0 and repo.metrics["batch_retry_count"] == 5
+    assert repo.flush_barrier(timeout=1) == 10
+
+
+def test_dedupe_and_unreachable_server(clickhouse, monkeypatch):
+    repo = _repo(clickhouse.url)
+    repo.start()
+    repo.submit(_rows(10))
+    repo.flush_barrier()
+    repo.submit(_rows(10))  # same keys: dropped by the dedupe index
+    repo.stop()
+    assert len(clickhouse.rows) == 10 and repo.metrics["dedupe_hits"] == 10
+    monkeypatch.setattr(async_repo, "backoff", lambda attempts: 0.0)
+    dead = _repo("127.0.0.1:9")  # nothing listens on the discard port
+    dead.start()
+    dead.submit(_rows(5))
+    dead.stop()
+    assert dead.metrics["written_rows"] == 0 and dead.metrics["batch_retry_count"] == 5
+
+
+class _FakeCursor:
+    def __init__(self, log):
+        self.log = log
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, sql, args):
+        await asyncio.sleep(0.02)
+        self.log.append((sql, list(args)))
+
+
+class _FakeConn:
+    opened = 0
+
+    def __init__(self, log):
+        self.log = log
+        self.closed = False
+        type(self).opened += 1
+
+    def cursor(self):
+        return _FakeCursor(self.log)
+
+    async def close(self):
+        self.closed = True
+
+
+def test_timescale_async_insert(monkeypatch):
+    log = []
+
+    async def connect(self):
+        return _FakeConn(log)
+
+    monkeypatch.setattr(AsyncRepo, "_pg_connect", connect)
+    _FakeConn.opened = 0
+    cfg = RepoConfig(backend="timescale", batch_size=5, timescale_write="copy", max_inflight=2)
+    repo = AsyncRepo(cfg)
+    repo.start()
+    for i in range(4):
+        repo.submit(_rows(5, start=i * 5))
+    repo.stop()
+    assert len(log) == 4 and repo.metrics["written_rows"] == 20
+    assert all(
+        sql.startswith("INSERT INTO market_signals") and "ON CONFLICT" in sql for sql, _ in log
+    )
+    assert sum(len(args) for _, args in log) == 20 * 6
+    assert 1 <= _FakeConn.opened <= 2  # pooled, at most one connection per slot
@@ -0,0 +1,76 @@
+import json
+
+from benchmarks.__main__ import cli
+from benchmarks.suite import CASES, compare, run_suite
+from benchmarks.workloads import event_chunks, event_rows, parse_size, replay
+from click.testing import CliRunner
+import numpy as np
+import pytest
+
+
+def test_workloads_are_deterministic_and_sorted():
+    a = list(event_chunks(1_000, symbols=5, chunk_size=300))
+    b = list(event_chunks(1_000, symbols=5, chunk_size=300))
+    assert [len(c["ts"]) for c in a] == [300, 300, 300, 100]
+    for x, y in zip(a, b, strict=True):
+        for k in x:
+            np.testing.assert_array_equal(x[k], y[k])
+    ts = np.concatenate([c["ts"] for c in a])
+    assert (np.diff(ts) > 0).all()
+    assert set(np.concatenate([c["type"] for c in a])) == {"market", "limit", "stop", "stop-limit"}
+    rows = event_rows(a[0])
+    assert all(("limit" in r) == (r["type"] in ("limit", "stop-limit")) for r in rows)
+
+
+def test_replay_cycles_the_pool_with_increasing_ts():
+    pool = list(event_chunks(100, chunk_size=40))
+    ts = np.concatenate([c["ts"] for c in replay(pool, 250)])
+    assert len(ts) == 250 and (np.diff(ts) > 0).all()
+
+
+def test_parse_size():
+    assert parse_size("1m") == 1_000_000
+    assert parse_size("2_500") == 2_500
+    with pytest.raises(ValueError, match="unknown size"):
+        parse_size("huge")
+
+
+def test_suite_runs_every_case(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    doc = run_suite(["600"], repeat=1)
+    assert set(doc["results"]) == {f"{c.name}@600" for c in CASES}
+    assert doc["results"]["run_ab.columns@600"]["events"] == 1_200
+    assert doc["results"]["repo.flush@600"]["events"] == 600
+    assert all(r["events_per_sec"] > 0 for r in doc["results"].values())
+    assert doc["meta"]["numpy"] == np.__version__
+
+
+def _doc(**rates):
+    return {"results": {k: {"events_per_sec": v} for k, v in rates.items()}}
+
+
+def test_compare_flags_regressions_past_threshold():
+    rows, regressed = compare(_doc(a=100.0, b=100.0, c=100.0), _doc(a=95.0, b=80.0, d=1.0), 0.1)
+    status = {r["name"]: r["status"] for r in rows}
+    assert status == {"a": "ok", "b": "regressed", "c": "missing", "d": "new"}
+    assert regressed
+    rows, regressed = compare(_doc(a=100.0), _doc(a=150.0), 0.1)
+    assert rows[0]["status"] == "improved" and not regressed
+
+
+def test_cli_run_and_compare(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    runner = CliRunner()
+    out = runner.invoke(cli, ["run", "--size", "300", "--only", "fill.bps", "--repeat", "1"])
+    assert out.exit_code == 0, out.output
+    path = out.output.strip().splitlines()[-1]
+    assert json.load(open(path))["results"].keys() == {
+        "fill.bps.batch@300",
+        "fill.bps.partial@300",
+        "fill.bps.scalar@300",
+    }
+    (tmp_path / "base.json").write_text(json.dumps(_doc(x=100.0)))
+    (tmp_path / "slow.json").write_text(json.dumps(_doc(x=50.0)))
+    assert runner.invoke(cli, ["compare", "base.json", "base.json"]).exit_code == 0
+    res = runner.invoke(cli, ["compare", "base.json", "slow.json", "--threshold", "0.2"])
+    assert res.exit_code == 1 and "regressed" in res.output
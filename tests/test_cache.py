@@ -0,0 +1,155 @@
+import json
+import os
+
+from backtest import cli
+from click.testing import CliRunner
+from conftest import strip_timing
+import pytest
+
+from hcebt import cache as cache_mod, runner
+from hcebt.cache import RunCache, leg_digest, run_key
+from hcebt.config import RunConfig
+from hcebt.events import to_columns
+from hcebt.persistence import Repo
+from hcebt.runner import run_ab
+from hcebt.streaming import JsonlStream
+from hcebt.tickstore import TickStore, write_tick_store
+
+
+def _events(n=40):
+    return [
+        {
+            "id": i,
+            "ts": 1690000000000 + i * 1000,
+            "symbol": ("BTC", "ETH", "SOL")[i % 3],
+            "bid": 99.5,
+            "ask": 100.5,
+            "last": 100.0 + (i % 4) * 0.5,
+            "type": ("market", "limit", "stop")[i % 3],
+            "side": 1 if i % 2 else -1,
+            "qty": 1.0 + i % 5,
+            "limit": 100.6,
+            "stop": 100.2,
+        }
+        for i in range(n)
+    ]
+
+
+def _cfg(run_id="c", batch=None, **kw):
+    batch = {"batch_size": 16, **(batch or {})}
+    return RunConfig(run_id=run_id, cache={"enabled": True}, batch=batch, **kw)
+
+
+@pytest.fixture
+def written(monkeypatch):
+    """Rows that reach a fake backend."""
+    rows = []
+    monkeypatch.setattr(Repo, "_connect", lambda self: ("fake", None))
+    monkeypatch.setattr(Repo, "_write_rows", lambda self, batch: rows.extend(batch.to_rows()))
+    return rows
+
+
+def test_hit_skips_simulation(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first = run_ab(_cfg(), _events(), _events(25))
+    assert first["cache"]["hit"] is False
+
+    def fail(*args, **kwargs):
+        raise AssertionError("simulated on a cache hit")
+
+    monkeypatch.setattr(runner, "_simulate", fail)
+    again = run_ab(_cfg("other"), _events(), _events(25))
+    assert again["cache"] == {"key": first["cache"]["key"], "hit": True}
+    assert again["A"] == first["A"] and again["B"] == first["B"]
+    assert os.path.exists("run_artifacts/other_config.json")
+
+
+def test_key_covers_fill_inputs_and_code(monkeypatch):
+    a, b = _events(), _events(25)
+    key = run_key(_cfg(), a, b)
+    assert run_key(_cfg("renamed", batch={"batch_size": 7}), a, b) == key
+    assert run_key(_cfg(fill={"bps": 3.0}), a, b) != key
+    assert run_key(_cfg(batch={"ts_format": "epoch_ms"}), a, b) != key
+    assert run_key(_cfg(), a, _events(26)) != key
+    assert run_key(_cfg(), to_columns(a), b) not in (key, None)
+    assert run_key(_cfg(), iter([a]), b) is None
+    monkeypatch.setattr(cache_mod, "code_version", lambda: "edited")
+    assert run_key(_cfg(), a, b) != key
+
+
+def test_file_legs_are_digested_by_content(tmp_path):
+    path = tmp_path / "a.jsonl"
+    path.write_text("".join(json.dumps(ev) + "\n" for ev in _events()))
+    jsonl = leg_digest(JsonlStream(str(path), chunk_size=7))
+    assert leg_digest(JsonlStream(str(path), chunk_size=50, columnar=True)) == jsonl
+    write_tick_store(str(tmp_path / "store"), [_events()])
+    store = leg_digest(TickStore(str(tmp_path / "store")))
+    assert store not in (jsonl, None)
+    write_tick_store(str(tmp_path / "store"), [_events(39)])
+    assert leg_digest(TickStore(str(tmp_path / "store"))) != store
+    path.write_text(json.dumps(_events()[0]) + "\n")
+    assert leg_digest(JsonlStream(str(path))) != jsonl
+
+
+def test_uncacheable_legs_run_normally(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    res = run_ab(_cfg(), iter([_events()]), _events(25))
+    assert "cache" not in res and res["A"]["events"] == 40
+
+
+def test_rows_are_replayed_once_per_destination(tmp_path, monkeypatch, written):
+    monkeypatch.chdir(tmp_path)
+    backend = {"backend": "clickhouse"}
+    first = run_ab(_cfg(batch=backend), _events(), _events(25))
+    original = list(written)
+    assert len(original) == first["repo_metrics"]["written_rows"] > 0
+    written.clear()
+    same = run_ab(_cfg(batch=backend), _events(), _events(25))
+    assert same["cache"]["hit"] and written == []
+    # a new run_id is a new destination: the cached rows are written under it
+    renamed = run_ab(_cfg("next", batch=backend), _events(), _events(25))
+    assert renamed["cache"]["hit"] and renamed["repo_metrics"]["written_rows"] == len(original)
+    assert written == [dict(row, run_id="next") for row in original]
+
+
+def test_sharded_miss_records_every_shard(tmp_path, monkeypatch, written):
+    monkeypatch.chdir(tmp_path)
+    sharded = {"mode": "sharded", "shards": 3, "max_workers": 1}
+    first = run_ab(_cfg(execution=sharded), _events(), _events(25))
+    seq = run_ab(_cfg("seq", batch={"backend": "clickhouse"}), _events(), _events(25))
+    assert seq["cache"]["hit"] and strip_timing(seq) == strip_timing(first)
+    assert len(written) == 40 + 25 - seq["repo_metrics"]["dedupe_hits"]
+
+
+def test_lru_eviction(tmp_path):
+    store = RunCache(str(tmp_path), max_bytes=1 << 30)
+    for i, key in enumerate("abc"):
+        with store.staging() as staged:
+            with open(os.path.join(staged, "rows-A.jsonl"), "w") as fh:
+                fh.write("x" * 1000)
+            store.commit(key, staged, {"i": i, "persisted": []})
+        os.utime(tmp_path / key / "result.json", (1000 + i, 1000 + i))
+    assert store.get("a") == {"i": 0, "persisted": []}  # now the most recently used
+    store.max_bytes = 2500
+    store.evict()
+    assert sorted(os.listdir(tmp_path)) == ["a", "c"]
+    # a second publisher of the same key keeps the first entry; dead stagings are dropped
+    with store.staging() as staged:
+        store.commit("a", staged, {"i": 9, "persisted": []})
+    os.mkdir(tmp_path / ".999999999-x")
+    store.evict()
+    assert sorted(os.listdir(tmp_path)) == ["a", "c"] and store.get("a")["i"] == 0
+    (tmp_path / "c" / "result.json").write_text("{torn")
+    assert store.get("c") is None and store.get("missing") is None
+
+
+def test_cli_no_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "cfg.yaml").write_text("run_id: cli\ncache:\n  enabled: true\n")
+    for name in ("a.json", "b.json"):
+        (tmp_path / name).write_text(json.dumps(_events(10)))
+    args = ["run", "--config", "cfg.yaml", "--ab", "a.json", "b.json"]
+    outputs = [CliRunner().invoke(cli, args) for _ in range(2)]
+    assert [json.loads(o.output)["cache"]["hit"] for o in outputs] == [False, True]
+    out = CliRunner().invoke(cli, [*args, "--no-cache"])
+    assert out.exit_code == 0 and "cache" not in json.loads(out.output)
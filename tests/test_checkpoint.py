@@ -0,0 +1,133 @@
+import json
+import os
+
+from backtest import cli
+from click.testing import CliRunner
+from conftest import strip_timing
+import pytest
+
+from hcebt.checkpoint import add_range, covers, skip_events
+from hcebt.config import RunConfig
+from hcebt.events import to_columns
+from hcebt.persistence import Repo
+from hcebt.runner import run_ab
+
+
+def _events(n, offset=0):
+    return [
+        {
+            "id": i,
+            "ts": 1690000000000 + i * 1000,
+            "symbol": ("BTC", "ETH", "SOL")[i % 3],
+            "bid": 99.5,
+            "ask": 100.5,
+            "last": 100.0 + (i % 4) * 0.5,
+            "type": ("market", "limit", "stop", "stop-limit")[i % 4],
+            "side": 1 if i % 2 else -1,
+            "qty": 1.0 + i % 5,
+            "limit": 100.6 - (i % 7) * 0.3,
+            "stop": 100.2,
+            "vol": 30.0,
+        }
+        for i in range(offset, offset + n)
+    ]
+
+
+def _cfg(resume=False, **fill):
+    return RunConfig(
+        run_id="ck",
+        fill={"partial_fills": True, **fill},
+        batch={"backend": "clickhouse", "batch_size": 16, "flush_interval_ms": 5},
+        checkpoint={"every_events": 50, "resume": resume},
+    )
+
+
+@pytest.fixture
+def written(monkeypatch):
+    rows = []
+    monkeypatch.setattr(Repo, "_connect", lambda self: ("fake", None))
+    monkeypatch.setattr(Repo, "_write_rows", lambda self, batch: rows.extend(batch.to_rows()))
+    return rows
+
+
+def _crashing(events, after):
+    for i in range(0, after, 30):
+        yield events[i : min(i + 30, after)]
+    raise ConnectionError("tape server went away")
+
+
+def _key(row):
+    return tuple(row[c] for c in sorted(row))
+
+
+def test_resumed_run_equals_uninterrupted(tmp_path, monkeypatch, written):
+    monkeypatch.chdir(tmp_path)
+    a, b = _events(200), _events(170, offset=60)  # B overlaps A: dedupe drops shared keys
+    full = run_ab(_cfg(), a, b)
+    expected = sorted(map(_key, written))
+    assert not os.path.exists("run_artifacts/ck.ckpt")
+    written.clear()
+
+    with pytest.raises(ConnectionError):
+        run_ab(_cfg(), a, _crashing(b, 130))
+    assert os.path.exists("run_artifacts/ck.ckpt")
+    resumed = run_ab(_cfg(resume=True), a, to_columns(b))
+    assert strip_timing(resumed) == strip_timing(full)
+    assert sorted(map(_key, written)) == expected
+    assert resumed["repo_metrics"]["resume_skipped_batches"] > 0
+    assert not os.path.exists("run_artifacts/ck.ckpt")
+
+
+def test_crash_in_the_first_leg(tmp_path, monkeypatch, written):
+    monkeypatch.chdir(tmp_path)
+    full = run_ab(_cfg(seed=5), _events(200), [])
+    expected = sorted(map(_key, written))
+    written.clear()
+    with pytest.raises(ConnectionError):
+        run_ab(_cfg(seed=5), _crashing(_events(200), 170), [])
+    resumed = run_ab(_cfg(resume=True, seed=5), _events(200), [])
+    assert strip_timing(resumed) == strip_timing(full) and sorted(map(_key, written)) == expected
+
+
+def test_resume_checks(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cfg = RunConfig(run_id="ck", checkpoint={"every_events": 10}, batch={"batch_size": 4})
+    with pytest.raises(ConnectionError):
+        run_ab(cfg, _crashing(_events(40), 30), [])
+    changed = RunConfig(
+        run_id="ck", fill={"bps": 9.0}, batch={"batch_size": 4}, checkpoint={"resume": True}
+    )
+    with pytest.raises(ValueError, match="different fill config"):
+        run_ab(changed, _events(40), [])
+    # nothing to resume from: an ordinary run
+    fresh = RunConfig(run_id="new", checkpoint={"resume": True})
+    assert run_ab(fresh, _events(12), [])["A"]["events"] == 12
+    sharded = RunConfig(run_id="s", execution={"mode": "sharded"}, checkpoint={"every_events": 5})
+    with pytest.raises(ValueError, match="sequential"):
+        run_ab(sharded, _events(12), [])
+    spill = RunConfig(run_id="s", batch={"overflow": "spill"}, checkpoint={"every_events": 5})
+    with pytest.raises(ValueError, match="spill"):
+        run_ab(spill, _events(12), [])
+
+
+def test_ranges_and_skips():
+    ranges = []
+    for start, end in ((10, 20), (30, 40), (20, 30), (50, 60), (5, 5)):
+        add_range(ranges, start, end)
+    assert ranges == [[10, 40], [50, 60]]
+    assert covers(ranges, 12, 40) and not covers(ranges, 35, 55)
+    chunks = [_events(5), to_columns(_events(5, offset=5)), _events(5, offset=10)]
+    rest = list(skip_events(chunks, 7))
+    assert rest[0]["id"].tolist() == [7, 8, 9]
+    assert [ev["id"] for ev in rest[1]] == [10, 11, 12, 13, 14]
+
+
+def test_cli_resume(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "cfg.yaml").write_text("run_id: cli\ncheckpoint:\n  every_events: 4\n")
+    for name in ("a.json", "b.json"):
+        (tmp_path / name).write_text(json.dumps(_events(10)))
+    args = ["run", "--config", "cfg.yaml", "--ab", "a.json", "b.json"]
+    base = json.loads(CliRunner().invoke(cli, args).output)
+    out = CliRunner().invoke(cli, [*args, "--resume"])
+    assert out.exit_code == 0 and strip_timing(json.loads(out.output)) == strip_timing(base)
@@ -0,0 +1,124 @@
+import threading
+
+import numpy as np
+
+from hcebt.dedupe import KeyIndex, column_hash, first_occurrences, key_hashes
+from hcebt.persistence import Repo, RepoConfig, RowBatch
+
+
+class _FakeCHClient:
+    def __init__(self):
+        self.rows = 0
+
+    def insert(self, table, data, column_names=None, column_oriented=False):
+        self.rows += len(data[0])
+
+
+def _batch(ts, symbols, **extra):
+    n = len(ts)
+    return RowBatch.from_columns(
+        {
+            "run_id": ["r"] * n,
+            "ts": ts,
+            "symbol": symbols,
+            "metric": ["m"] * n,
+            "value": [1.0] * n,
+            **extra,
+        }
+    )
+
+
+def test_key_hashes_are_stable_and_column_sensitive():
+    a = key_hashes([["r", "r"], [1, 2], ["X", "X"], ["m", "m"]])
+    b = key_hashes([np.array(["r", "r"]), np.array([1, 2]), ["X", "X"], ["m", "m"]])
+    assert a.dtype == np.uint64 and a.tolist() == b.tolist() and a[0] != a[1]
+    # swapping values between columns changes the key
+    assert key_hashes([["X"], ["r"]])[0] != key_hashes([["r"], ["X"]])[0]
+    mixed = column_hash(np.array([1, "1", 1.5, None], dtype=object))
+    assert len(set(mixed.tolist())) == 4
+    assert column_hash([1.5, 2.5]).tolist() != column_hash([1, 2]).tolist()
+
+
+def test_first_occurrences_keeps_input_order():
+    keys = np.array([5, 3, 5, 7, 3], dtype=np.uint64)
+    assert first_occurrences(keys).tolist() == [True, True, False, True, False]
+
+
+def test_key_index_bounded_fifo_eviction():
+    idx = KeyIndex(max_keys=80)  # tail freezes every 10 keys
+    for start in range(0, 200, 10):
+        idx.add(np.arange(start, start + 10, dtype=np.uint64))
+    assert len(idx) <= 80 and idx.evicted == 200 - len(idx)
+    hits = idx.contains(np.array([0, 150, 199, 500], dtype=np.uint64))
+    assert hits.tolist() == [False, True, True, False]
+
+
+def test_repo_dedupes_across_flushes_with_metrics():
+    repo = Repo(RepoConfig())
+    ch = _FakeCHClient()
+    repo.repo = ("ch", ch)
+    repo._flush(_batch([1, 2, 2], ["X", "X", "X"]))
+    repo._flush(_batch([2, 3], ["X", "X"]))
+    repo._flush([{"run_id": "r", "ts": 3, "symbol": "X", "metric": "m", "value": 2.0}])
+    assert ch.rows == 3
+    assert repo.metrics["dedupe_hits"] == 3 and repo.metrics["dedupe_misses"] == 3
+    assert repo.metrics["written_rows"] == 3
+
+
+def test_failed_write_does_not_mark_keys_seen(monkeypatch):
+    repo = Repo(RepoConfig())
+    monkeypatch.setattr(repo, "_write_with_retries", lambda rows: (False, 5))
+    repo._flush(_batch([1], ["X"]))
+    monkeypatch.undo()
+    ch = _FakeCHClient()
+    repo.repo = ("ch", ch)
+    repo._flush(_batch([1], ["X"]))
+    assert ch.rows == 1
+
+
+def test_key_index_discard():
+    idx = KeyIndex(max_keys=80)
+    for start in range(0, 30, 10):
+        idx.add(np.arange(start, start + 10, dtype=np.uint64))
+    idx.discard(np.array([3, 25, 99], dtype=np.uint64))
+    assert len(idx) == 28
+    assert idx.contains(np.array([3, 4, 25, 26], dtype=np.uint64)).tolist() == [
+        False,
+        True,
+        False,
+        True,
+    ]
+
+
+def test_labels_scope_dedupe():
+    repo = Repo(RepoConfig())
+    ch = _FakeCHClient()
+    repo.repo = ("ch", ch)
+    repo._flush(_batch([1, 2], ["X", "X"], label=["A", "A"]))
+    # leg B shares A's primary keys; a second A batch does not
+    repo._flush(_batch([1, 2], ["X", "X"], label=np.array(["B", "B"])))
+    repo._flush(_batch([1, 2], ["X", "X"], label=np.array(["A", "A"], dtype=object)))
+    assert ch.rows == 4 and repo.metrics["dedupe_hits"] == 2
+
+
+def test_concurrent_flushes_dedupe_against_inflight_write():
+    repo = Repo(RepoConfig())
+    writing, release = threading.Event(), threading.Event()
+
+    class _SlowClient(_FakeCHClient):
+        def insert(self, *args, **kwargs):
+            if not writing.is_set():
+                writing.set()
+                release.wait(5)
+            super().insert(*args, **kwargs)
+
+    ch = _SlowClient()
+    repo.repo = ("ch", ch)
+    first = threading.Thread(target=repo._flush, args=(_batch([1, 2], ["X", "X"]),))
+    first.start()
+    assert writing.wait(5)
+    # the first write is still in flight: its keys are reserved, not written twice
+    repo._flush(_batch([2, 3], ["X", "X"]))
+    release.set()
+    first.join()
+    assert ch.rows == 3 and repo.metrics["dedupe_hits"] == 1
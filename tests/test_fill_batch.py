@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from hcebt.fills import (
+    FILL_STATUSES,
+    ORDER_TYPES,
+    MarketSnapshot,
+    OrderIntent,
+    ShadowFillModel,
+    encode_order_types,
+)
+
+
+def _random_events(n=400, seed=7):
+    rng = np.random.default_rng(seed)
+    mid = 100.0 + rng.normal(0, 1, n).cumsum()
+    half = rng.uniform(0.01, 0.5, n)
+    bid = mid - half
+    ask = mid + half
+    last = mid + rng.normal(0, 0.3, n)
+    side = rng.choice([-1, 1], n)
+    ot = rng.choice(np.array(ORDER_TYPES + ("iceberg",)), n)
+    limit = np.where(rng.random(n) < 0.9, mid + rng.normal(0, 0.5, n), np.nan)
+    stop = np.where(rng.random(n) < 0.9, mid + rng.normal(0, 0.5, n), np.nan)
+    qty = rng.uniform(0.1, 5.0, n)
+    return bid, ask, last, side, ot, qty, limit, stop
+
+
+@pytest.mark.parametrize("mode", ["fixed_ticks", "bps", "pct_spread", "hybrid", "unknown"])
+@pytest.mark.parametrize("bid_ask_aware", [True, False])
+def test_fill_batch_matches_scalar_bit_for_bit(mode, bid_ask_aware):
+    m = ShadowFillModel(
+        slip_mode=mode,
+        ticks=0.25,
+        bps=7.0,
+        pct_spread=30.0,
+        hybrid_weight=0.3,
+        bid_ask_aware=bid_ask_aware,
+    )
+    bid, ask, last, side, ot, qty, limit, stop = _random_events()
+    fb = m.fill_batch(
+        bid=bid,
+        ask=ask,
+        last=last,
+        side=side,
+        order_type=ot,
+        qty=qty,
+        limit_price=limit,
+        stop_price=stop,
+    )
+    assert len(fb) == len(bid)
+    for i in range(len(bid)):
+        snap = MarketSnapshot(
+            ts=i,
+            last=last[i],
+            mark=last[i],
+            bid=bid[i],
+            ask=ask[i],
+            spread=ask[i] - bid[i],
+            volume=1.0,
+        )
+        intent = OrderIntent(
+            side=int(side[i]),
+            order_type=str(ot[i]),
+            qty=float(qty[i]),
+            limit_price=None if np.isnan(limit[i]) else float(limit[i]),
+            stop_price=None if np.isnan(stop[i]) else float(stop[i]),
+        )
+        assert fb.result(i) == m.fill(snap, intent)
+
+
+def test_fill_batch_covers_every_status():
+    bid, ask, last, side, ot, qty, limit, stop = _random_events(n=2000)
+    fb = ShadowFillModel().fill_batch(
+        bid=bid,
+        ask=ask,
+        last=last,
+        side=side,
+        order_type=ot,
+        qty=qty,
+        limit_price=limit,
+        stop_price=stop,
+    )
+    seen = {FILL_STATUSES[c] for c in np.unique(fb.status)}
+    assert seen == {"filled", "resting", "no_fill", "triggered"}
+
+
+def test_encode_order_types_and_none_prices():
+    codes = encode_order_types(["market", "stop-limit", "iceberg"])
+    assert codes.tolist() == [0, 3, -1]
+    assert encode_order_types(np.array([1, 2])).tolist() == [1, 2]
+    fb = ShadowFillModel().fill_batch(
+        bid=[99.0],
+        ask=[101.0],
+        last=[100.0],
+        side=[1],
+        order_type=["limit"],
+        qty=[1.0],
+        limit_price=np.array([None], dtype=object),
+    )
+    assert fb.result(0).status == "no_fill"
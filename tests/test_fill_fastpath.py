@@ -0,0 +1,68 @@
+import dataclasses
+import itertools
+import pickle
+from types import SimpleNamespace
+
+import pytest
+
+from hcebt.fills import FillResult, MarketSnapshot, OrderIntent, ShadowFillModel
+
+
+def _cases():
+    snaps = [
+        MarketSnapshot(ts=1, last=100.1, mark=100.1, bid=100.0, ask=100.2, spread=0.2, volume=5.0),
+        MarketSnapshot(ts=2, last=99.7, mark=99.7, bid=99.65, ask=99.9, spread=None, volume=1.0),
+        MarketSnapshot(ts=3, last=101, mark=101, bid=100, ask=102, spread=2, volume=0),
+    ]
+    intents = [
+        OrderIntent(side=side, order_type=ot, qty=qty, limit_price=lim, stop_price=stop)
+        for side, ot, qty, lim, stop in itertools.product(
+            (1, -1, 0),
+            ("market", "limit", "stop", "stop-limit", "iceberg"),
+            (0.5, 2),
+            (None, 99.8, 100.1, 100.25),
+            (None, 99.8, 100.05),
+        )
+    ]
+    return list(itertools.product(snaps, intents))
+
+
+def _duck(obj):
+    return SimpleNamespace(**{f.name: getattr(obj, f.name) for f in dataclasses.fields(obj)})
+
+
+@pytest.mark.parametrize("mode", ["fixed_ticks", "bps", "pct_spread", "hybrid", "unknown"])
+@pytest.mark.parametrize("aware", [True, False])
+def test_typed_fast_path_matches_adapter(mode, aware):
+    fm = ShadowFillModel(
+        slip_mode=mode, ticks=0.3, bps=7.5, pct_spread=40.0, hybrid_weight=0.3, bid_ask_aware=aware
+    )
+    for snap, intent in _cases():
+        fast = fm.fill(snap, intent)
+        assert fm.fill(_duck(snap), _duck(intent)) == fast
+        as_dict = {k: v for k, v in dataclasses.asdict(snap).items() if v is not None}
+        assert fm.fill(as_dict, _duck(intent)) == fast
+        assert type(fast.filled_qty) is float
+
+
+def test_value_types_are_slotted():
+    snap = MarketSnapshot(ts=1, last=1.0, mark=1.0, bid=1.0, ask=1.0, spread=0.0, volume=0.0)
+    intent = OrderIntent(side=1, order_type="market", qty=1.0)
+    result = FillResult(price=1.0, filled_qty=1.0, slip_cost=0.0, status="filled")
+    for obj in (snap, intent, result):
+        assert not hasattr(obj, "__dict__")
+        with pytest.raises(AttributeError):
+            obj.extra = 1
+        assert pickle.loads(pickle.dumps(obj)) == obj
+
+
+def test_slip_function_is_resolved_once():
+    fm = ShadowFillModel(slip_mode="bps", bps=10.0)
+    assert fm._slip_fn.__name__ == "bps"
+    snap = MarketSnapshot(
+        ts=1, last=100.0, mark=100.0, bid=100.0, ask=100.0, spread=0.0, volume=0.0
+    )
+    res = fm.fill(snap, OrderIntent(side=-1, order_type="market", qty=2.0))
+    assert res == FillResult(
+        price=99.9, filled_qty=2.0, slip_cost=pytest.approx(0.2), status="filled"
+    )
@@ -0,0 +1,106 @@
+import logging
+
+import numpy as np
+import pytest
+
+from hcebt import kernels
+from hcebt.config import FillConfig
+from hcebt.events import fill_inputs
+from hcebt.fills import ShadowFillModel, encode_order_types
+from hcebt.runner import _make_model
+from hcebt.synth import generate
+
+MODES = ["fixed_ticks", "bps", "pct_spread", "hybrid", "unknown"]
+
+
+def _inputs(n=4000, seed=3):
+    cols = fill_inputs(next(generate(n, symbols=8, seed=seed, chunk_size=n)))
+    cols["side"] = cols["side"].copy()
+    cols["side"][::17] = 0  # neither buy nor sell
+    cols["stop_price"] = cols["stop_price"].copy()
+    cols["stop_price"][::3] = cols["last"][::3]  # synthetic stops rest beyond the touch
+    return cols
+
+
+def _model(mode, aware, engine="numpy"):
+    return ShadowFillModel(
+        slip_mode=mode,
+        ticks=0.03,
+        bps=7.5,
+        pct_spread=40.0,
+        hybrid_weight=0.3,
+        bid_ask_aware=aware,
+        engine=engine,
+    )
+
+
+def _reference_args(fm, cols):
+    ref = _model(fm.slip_mode, fm.bid_ask_aware)
+    batch = ref.fill_batch(**cols)
+    return batch, (
+        np.asarray(cols["bid"], dtype=np.float64),
+        np.asarray(cols["ask"], dtype=np.float64),
+        np.asarray(cols["last"], dtype=np.float64),
+        np.asarray(cols["ask"], dtype=np.float64) - np.asarray(cols["bid"], dtype=np.float64),
+        np.asarray(cols["side"]),
+        encode_order_types(cols["order_type"]),
+        np.asarray(cols["qty"], dtype=np.float64),
+        np.asarray(cols["limit_price"], dtype=np.float64),
+        np.asarray(cols["stop_price"], dtype=np.float64),
+    )
+
+
+def _assert_same(out, batch):
+    price, filled, cost, status = out
+    np.testing.assert_array_equal(price, batch.price)
+    np.testing.assert_array_equal(filled, batch.filled_qty)
+    np.testing.assert_array_equal(cost, batch.slip_cost)
+    np.testing.assert_array_equal(status, batch.status)
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("aware", [True, False])
+def test_python_loop_matches_numpy_reference(mode, aware):
+    cols = _inputs(800)
+    fm = _model(mode, aware)
+    batch, args = _reference_args(fm, cols)
+    assert set(np.unique(batch.status)) >= {0, 1, 2, 3}  # filled, resting, no fill, triggered
+    _assert_same(kernels.run_fill_loop(kernels.fill_loop, *args, fm._kernel_params()), batch)
+
+
+@pytest.mark.skipif(not kernels.NUMBA_AVAILABLE, reason="numba is not installed")
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("aware", [True, False])
+def test_compiled_engine_matches_numpy_reference(mode, aware):
+    cols = _inputs()
+    fm = _model(mode, aware, engine="numba")
+    assert fm._kernel is kernels.compiled_fill_loop
+    batch = _model(mode, aware).fill_batch(**cols)
+    out = fm.fill_batch(**cols)
+    _assert_same((out.price, out.filled_qty, out.slip_cost, out.status), batch)
+
+
+def test_numba_engine_falls_back_without_numba(monkeypatch, caplog):
+    monkeypatch.setattr(kernels, "compiled_fill_loop", None)
+    cols = _inputs(500)
+    with caplog.at_level(logging.WARNING):
+        fm = _model("hybrid", True, engine="numba")
+    assert fm._kernel is None
+    assert "numba is not installed" in caplog.text
+    out = fm.fill_batch(**cols)
+    ref = _model("hybrid", True).fill_batch(**cols)
+    _assert_same((out.price, out.filled_qty, out.slip_cost, out.status), ref)
+
+
+def test_engine_is_selected_from_fill_config(monkeypatch):
+    assert _make_model(FillConfig()).engine == "numpy"
+    # any callable with the fill_loop signature is used as the kernel
+    monkeypatch.setattr(kernels, "compiled_fill_loop", kernels.fill_loop)
+    fm = _make_model(FillConfig(slip_mode="pct_spread", engine="numba"))
+    assert fm._kernel is kernels.fill_loop
+    cols = _inputs(300)
+    out = fm.fill_batch(**cols)
+    ref = _make_model(FillConfig(slip_mode="pct_spread")).fill_batch(**cols)
+    _assert_same((out.price, out.filled_qty, out.slip_cost, out.status), ref)
+    with pytest.raises(ValueError):
+        FillConfig(engine="cuda")
@@ -1,3 +1,8 @@
+import math
+import pickle
+
+import numpy as np
+
 from lib.kahan import KahanSum
 
 
@@ -6,3 +11,75 @@ def test_kahan_sum():
     for _ in range(100000):
         ks.add(0.00001)
     assert abs(ks.value() - 1.0) < 1e-6
+
+
+def _values(n=20000, seed=5):
+    rng = np.random.default_rng(seed)
+    # wide dynamic range and heavy cancellation
+    vals = rng.standard_normal(n) * 10.0 ** rng.integers(-20, 20, n)
+    return np.r_[vals, -vals[: n // 2], 1e300, -1e300, 5e-324, 0.1, -0.0]
+
+
+def test_value_is_exact_and_independent_of_chunking():
+    vals = _values()
+    expected = math.fsum(vals)
+    scalar = KahanSum()
+    for x in vals.tolist():
+        scalar.add(x)
+    assert scalar.value() == expected
+    for parts in (1, 3, 7, 1000):
+        ks = KahanSum()
+        ks.add_array(vals[:5])
+        ks.update(np.array_split(vals[5:], parts))
+        assert ks.value() == expected
+    shuffled = np.random.default_rng(1).permutation(vals)
+    assert KahanSum().update([shuffled]).value() == expected
+
+
+def test_merge_combines_partials_without_rounding():
+    vals = _values(5000)
+    shards = [KahanSum() for _ in range(4)]
+    for i, chunk in enumerate(np.array_split(vals, 9)):
+        shards[i % 4].add_array(chunk)
+    shards[2].add(0.25)  # pending scalar adds are folded in by merge
+    total = KahanSum()
+    for ks in pickle.loads(pickle.dumps(shards)):
+        total.merge(ks)
+    assert total.value() == math.fsum([*vals.tolist(), 0.25])
+    restored = KahanSum.from_state(total.state())
+    assert restored.value() == total.value()
+    assert restored.merge(KahanSum.from_state(total.state())).value() == 2 * total.value()
+
+
+def test_streaming_mixes_scalars_and_arrays():
+    ks = KahanSum().update([0.1, [0.2, 0.3], np.full(3, 0.1), np.array([])])
+    assert ks.value() == math.fsum([0.1, 0.2, 0.3, 0.1, 0.1, 0.1])
+    assert KahanSum().value() == 0.0
+
+
+def test_non_finite_values_propagate():
+    ks = KahanSum()
+    ks.add_array([1.0, math.inf])
+    assert ks.value() == math.inf
+    ks.add(-math.inf)
+    assert math.isnan(ks.value())
+    big = KahanSum()
+    big.add_array([1.7e308, 1.7e308])
+    assert big.value() == math.inf
+    big.add(-1.7e308)  # the exact total is finite again
+    assert big.value() == 1.7e308
+    neg = KahanSum().update([[-1.7e308] * 2])
+    assert neg.value() == -math.inf
+
+
+def test_sum_and_compensation_attributes():
+    ks = KahanSum()
+    for x in (1e16, 1.0, 1.0, 1.0):
+        ks.add(x)
+    assert ks.sum == ks.value() == 1e16 + 4.0
+    assert ks.c == 1.0  # the rounded sum overshoots 1e16 + 3 by one
+    ks.add(1.0)
+    assert ks.sum == 1e16 + 4.0 and ks.c == 0.0
+    inf = KahanSum()
+    inf.add(math.inf)
+    assert inf.sum == math.inf and inf.c == 0.0
@@ -0,0 +1,95 @@
+import threading
+import urllib.request
+
+import pytest
+
+from hcebt.config import RunConfig
+from hcebt.metrics import (
+    MetricsRegistry,
+    MetricsServer,
+    merge_summaries,
+    render_prometheus,
+    write_prometheus,
+)
+from hcebt.runner import run_ab
+
+
+def _events(n):
+    return [
+        {"ts": 1_690_000_000_000 + i, "symbol": "BTC", "bid": 99.5, "ask": 100.5, "last": 100.0}
+        for i in range(n)
+    ]
+
+
+def test_registry_is_thread_safe():
+    reg = MetricsRegistry()
+
+    def work():
+        for _ in range(10_000):
+            reg.counter("c_total").inc()
+            reg.histogram("h_seconds").observe(0.003)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    summary = reg.summary()
+    assert summary["counters"]["c_total"] == 40_000
+    assert summary["histograms"]["h_seconds"]["count"] == 40_000
+    with pytest.raises(ValueError, match="is a counter"):
+        reg.gauge("c_total")
+
+
+def test_histogram_quantiles_merge_and_prometheus_text():
+    a, b = MetricsRegistry(), MetricsRegistry()
+    for v in (0.001,) * 90:
+        a.histogram("lat_seconds", "write latency", buckets=(0.001, 0.01, 0.1)).observe(v)
+    for v in (0.05,) * 9 + (5.0,):
+        b.histogram("lat_seconds", buckets=(0.001, 0.01, 0.1)).observe(v)
+    b.gauge("depth").set(3)
+    merged = merge_summaries([a.summary(), b.summary()])
+    h = merged["histograms"]["lat_seconds"]
+    assert h["counts"] == [90, 0, 9, 1] and h["count"] == 100
+    assert h["p50"] < h["p90"] == pytest.approx(0.001) and h["p99"] == pytest.approx(0.1)
+    text = render_prometheus(merged)
+    assert "# HELP lat_seconds write latency\n# TYPE lat_seconds histogram" in text
+    assert 'lat_seconds_bucket{le="0.1"} 99\nlat_seconds_bucket{le="+Inf"} 100' in text
+    assert "# TYPE depth gauge\ndepth 3\n" in text
+    with pytest.raises(ValueError, match="different buckets"):
+        c = MetricsRegistry()
+        c.histogram("lat_seconds", buckets=(1.0,)).observe(1)
+        merge_summaries([a.summary(), c.summary()])
+
+
+def test_metrics_server_and_file_export(tmp_path):
+    reg = MetricsRegistry()
+    reg.counter("rows_total").inc(7)
+    server = MetricsServer(reg.to_prometheus).start()
+    try:
+        body = urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics").read().decode()
+    finally:
+        server.stop()
+    assert "rows_total 7" in body
+    path = tmp_path / "out" / "m.prom"
+    write_prometheus(str(path), reg.summary())
+    assert path.read_text() == body
+
+
+def test_run_ab_returns_and_writes_metrics_summary(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    cfg = RunConfig(
+        run_id="m",
+        batch={"batch_size": 4},
+        metrics={"path": "run_artifacts/m.prom", "port": 0},
+    )
+    res = run_ab(cfg, _events(10), _events(6))
+    m = res["metrics"]
+    assert m["counters"]["hcebt_repo_rows_submitted_total"] == 16
+    assert m["counters"]["hcebt_repo_submitted_batches_total"] == 5
+    assert m["histograms"]["hcebt_repo_queue_wait_seconds"]["count"] == 5
+    assert m["histograms"]["hcebt_repo_write_seconds"]["count"] >= 1
+    assert m["gauges"]["hcebt_repo_buffered_rows"] == 0
+    assert m["counters"]["hcebt_repo_bytes_written_total"] > 0
+    text = (tmp_path / "run_artifacts" / "m.prom").read_text()
+    assert "hcebt_repo_rows_written_total 16" in text  # A and B are deduped per label
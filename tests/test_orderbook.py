@@ -0,0 +1,208 @@
+import random
+
+import pytest
+
+from hcebt.fills import FillResult, MarketSnapshot, OrderIntent, ShadowFillModel
+from hcebt.orderbook import OrderBook
+
+
+def _snap(bid, ask, last=None):
+    last = (bid + ask) / 2 if last is None else last
+    return MarketSnapshot(ts=0, last=last, mark=last, bid=bid, ask=ask, spread=ask - bid, volume=1)
+
+
+def _limit(side, price, qty=1.0, tif="GTC"):
+    return OrderIntent(side=side, order_type="limit", qty=qty, limit_price=price, tif=tif)
+
+
+def _stop(side, stop, limit=None, tif="GTC"):
+    ot = "stop" if limit is None else "stop-limit"
+    return OrderIntent(
+        side=side, order_type=ot, qty=2.0, limit_price=limit, stop_price=stop, tif=tif
+    )
+
+
+class _CountingModel(ShadowFillModel):
+    calls = 0
+
+    def fill(self, snap, intent):
+        self.calls += 1
+        return super().fill(snap, intent)
+
+
+def test_resting_limits_fill_in_price_time_priority():
+    fm = ShadowFillModel(slip_mode="fixed_ticks", ticks=0.0)
+    book = OrderBook(fm)
+    snap = _snap(100.0, 100.2)
+    ids = [book.submit(_limit(1, p), snap) for p in (99.5, 99.9, 99.7, 99.9)]
+    assert all(res.status == "resting" for _, res in ids)
+    assert len(book) == 4
+    assert book.on_snapshot(_snap(99.6, 99.8)) == [
+        (ids[1][0], FillResult(99.8, 1.0, 0.0, "filled")),
+        (ids[3][0], FillResult(99.8, 1.0, 0.0, "filled")),
+    ]
+    assert book.cancel(ids[2][0]) and not book.cancel(ids[2][0])
+    assert book.on_snapshot(_snap(99.0, 99.4)) == [
+        (ids[0][0], FillResult(99.4, 1.0, 0.0, "filled"))
+    ]
+    assert len(book) == 0
+
+
+def test_stops_trigger_from_the_sorted_lists():
+    fm = ShadowFillModel(slip_mode="fixed_ticks", ticks=0.0)
+    book = OrderBook(fm)
+    snap = _snap(100.0, 100.2, 100.1)
+    buy_far, _ = book.submit(_stop(1, 101.0), snap)
+    buy_near, res = book.submit(_stop(1, 100.5), snap)
+    sell, _ = book.submit(_stop(-1, 99.0, limit=98.0), snap)
+    assert res.status == "no_fill" and len(book) == 3
+    fills = book.on_snapshot(_snap(101.0, 101.2, 101.1))
+    assert [(i, r.status) for i, r in fills] == [(buy_near, "triggered"), (buy_far, "triggered")]
+    # the stop-limit triggers, its limit does not cross and it rests as a limit
+    fills = book.on_snapshot(_snap(97.6, 97.9, 98.9))
+    assert fills == [(sell, FillResult(0.0, 0.0, 0.0, "resting"))]
+    assert book.get(sell).order_type == "limit" and book.get(sell).stop_price is None
+    assert book.on_snapshot(_snap(98.0, 98.1, 98.0)) == [
+        (sell, FillResult(98.0, 2.0, 0.0, "filled"))
+    ]
+
+
+def test_stops_at_one_trigger_price_fire_in_arrival_order():
+    fm = ShadowFillModel(slip_mode="fixed_ticks", ticks=0.0)
+    book = OrderBook(fm)
+    snap = _snap(100.0, 100.2, 100.1)
+    near = [book.submit(_stop(1, 100.5, limit=100.0), snap)[0] for _ in range(3)]
+    far = [book.submit(_stop(1, 100.8, limit=100.0), snap)[0] for _ in range(2)]
+    # all five trigger and rest: nearest trigger price first, then arrival
+    fills = book.on_snapshot(_snap(101.0, 101.2, 101.1))
+    assert [i for i, _ in fills] == near + far
+    # as resting limits at one price they keep that order
+    fills = book.on_snapshot(_snap(99.8, 100.0, 99.9))
+    assert [i for i, _ in fills] == near + far
+
+
+def test_cancel_heavy_flow_keeps_the_book_compact():
+    book = OrderBook(ShadowFillModel())
+    snap = _snap(100.0, 100.2)
+    keep = book.submit(_limit(1, 99.0), snap)[0]
+    oid = stop = None
+    for i in range(5000):
+        # cancel/replace: one resting limit and one stop working at a time
+        if oid is not None:
+            assert book.cancel(oid) and book.cancel(stop)
+        oid = book.submit(_limit(1, 99.5 - (i % 7) * 0.01), snap)[0]
+        stop = book.submit(_stop(-1, 99.0 - (i % 5) * 0.01), snap)[0]
+        entries = len(book._bids) + len(book._asks) + len(book._buy_stops)
+        assert entries + len(book._sell_stops) <= 2 * len(book) + 64 + 1
+    assert len(book) == 3 and keep in book
+    fills = book.on_snapshot(_snap(98.8, 98.9, 98.95))
+    assert sorted(i for i, _ in fills) == sorted([keep, oid, stop])
+    assert book._dead == 0
+
+
+def test_time_in_force():
+    fm = ShadowFillModel(slip_mode="fixed_ticks", ticks=0.0)
+    book = OrderBook(fm)
+    snap = _snap(100.0, 100.2)
+    _, res = book.submit(_limit(1, 99.0, tif="IOC"), snap)
+    assert res.status == "resting" and len(book) == 0  # cancelled, not working
+    _, res = book.submit(_limit(1, 100.2, tif="fok"), snap)
+    assert res.status == "filled"
+    _, res = book.submit(_stop(-1, 99.0, tif="IOC"), snap)
+    assert res.status == "no_fill" and len(book) == 0
+    with pytest.raises(ValueError, match="time in force"):
+        book.submit(_limit(1, 99.0, tif="DAY"), snap)
+    with pytest.raises(ValueError, match="side"):
+        book.submit(_limit(0, 99.0), snap)
+    with pytest.raises(ValueError, match="NaN"):
+        book.submit(_limit(1, float("nan")), snap)
+
+
+def test_fok_rejects_partial_and_gtc_rests_remainder():
+    class HalfFill(ShadowFillModel):
+        def fill(self, snap, intent):
+            res = super().fill(snap, intent)
+            if res.status == "filled" and intent.order_type == "limit":
+                return FillResult(res.price, intent.qty / 2, res.slip_cost / 2, "partial")
+            return res
+
+    book = OrderBook(HalfFill(slip_mode="fixed_ticks", ticks=0.0))
+    snap = _snap(100.0, 100.2)
+    _, res = book.submit(_limit(1, 100.5, qty=4.0, tif="FOK"), snap)
+    assert res.status == "no_fill" and len(book) == 0
+    oid, res = book.submit(_limit(1, 100.5, qty=4.0), snap)
+    assert res.filled_qty == 2.0 and book.get(oid).qty == 2.0
+    # a partially filled remainder executes at most once per snapshot
+    assert [r.filled_qty for _, r in book.on_snapshot(snap)] == [1.0]
+    assert book.get(oid).qty == 1.0
+
+
+def test_snapshot_touches_only_crossed_or_triggered_orders():
+    fm = _CountingModel(slip_mode="bps")
+    book = OrderBook(fm)
+    snap = _snap(100.0, 100.2)
+    for i in range(500):
+        book.submit(_limit(1, 99.0 - i * 0.01), snap)
+        book.submit(_limit(-1, 101.0 + i * 0.01), snap)
+        book.submit(_stop(1, 102.0 + i * 0.01), snap)
+        book.submit(_stop(-1, 98.0 - i * 0.01, limit=97.0), snap)
+    fm.calls = 0
+    assert book.on_snapshot(_snap(99.9, 100.1)) == []
+    assert fm.calls == 0
+    fills = book.on_snapshot(_snap(98.9, 98.96, 98.95))  # crosses the 5 best bids
+    assert len(fills) == 5 and fm.calls == 5
+    assert book.on_snapshot(_snap(float("nan"), float("nan"), float("nan"))) == []
+
+
+def _reference(fm, orders, snaps):
+    """Scan every working order on every snapshot."""
+    working = {}
+    out = []
+    for oid, intent in orders:
+        working[oid] = intent
+    for snap in snaps:
+        fired = []
+        for oid, intent in list(working.items()):
+            if intent.order_type in ("stop", "stop-limit"):
+                last = snap.last
+                if (intent.side > 0 and last >= intent.stop_price) or (
+                    intent.side < 0 and last <= intent.stop_price
+                ):
+                    fired.append((oid, fm.fill(snap, intent)))
+            elif fm.fill(snap, intent).status == "filled":
+                fired.append((oid, fm.fill(snap, intent)))
+        for oid, res in fired:
+            intent = working.pop(oid)
+            if res.status == "resting":
+                working[oid] = OrderIntent(intent.side, "limit", intent.qty, intent.limit_price)
+        out.append(sorted(fired))
+    return out, sorted(working)
+
+
+def test_matches_a_linear_scan():
+    rnd = random.Random(4)
+    fm = ShadowFillModel(slip_mode="hybrid")
+    book = OrderBook(fm)
+    snap = _snap(100.0, 100.1)
+    orders = []
+    for _ in range(300):
+        side = rnd.choice((1, -1))
+        price = round(100.05 - side * rnd.uniform(0.1, 3.0), 2)
+        stop = round(100.05 + side * rnd.uniform(0.1, 3.0), 2)
+        kind = rnd.choice(("limit", "stop", "stop-limit"))
+        intent = {
+            "limit": _limit(side, price),
+            "stop": _stop(side, stop),
+            "stop-limit": _stop(side, stop, limit=round(stop + side * rnd.uniform(-0.5, 0.5), 2)),
+        }[kind]
+        oid, res = book.submit(intent, snap)
+        assert res.filled_qty == 0
+        orders.append((oid, intent))
+    snaps = []
+    mid = 100.05
+    for _ in range(60):
+        mid = round(mid + rnd.uniform(-0.6, 0.6), 2)
+        snaps.append(_snap(round(mid - 0.05, 2), round(mid + 0.05, 2), mid))
+    expected, remaining = _reference(fm, orders, snaps)
+    assert [sorted(book.on_snapshot(s)) for s in snaps] == expected
+    assert sorted(book._orders) == remaining
@@ -0,0 +1,174 @@
+import json
+
+from conftest import strip_timing
+import numpy as np
+import pytest
+
+from hcebt import kernels
+from hcebt.config import RunConfig
+from hcebt.events import fill_inputs, to_columns
+from hcebt.fills import (
+    FILL_STATUSES,
+    OT_LIMIT,
+    OT_STOP_LIMIT,
+    ST_FILLED,
+    ST_PARTIAL,
+    ST_RESTING,
+    FillBatch,
+    OrderIntent,
+    ShadowFillModel,
+    encode_order_types,
+)
+from hcebt.runner import run_ab
+from hcebt.synth import generate
+from hcebt.tickstore import TickStore, convert_events
+
+
+def _inputs(n=20000, seed=11):
+    return fill_inputs(next(generate(n, symbols=12, seed=seed, chunk_size=n)))
+
+
+def _rows(n=300):
+    rows = []
+    for i in range(n):
+        side = 1 if i % 2 else -1
+        rows.append(
+            {
+                "id": i,
+                "ts": 1690000000000 + i * 1000,
+                "symbol": ("BTC", "ETH", "SOL")[i % 3],
+                "bid": 99.5,
+                "ask": 100.5,
+                "last": 100.0,
+                "vol": 20.0 + i % 50,
+                "type": ("market", "limit", "stop-limit")[i % 3],
+                "side": side,
+                "qty": 1.0 + i % 5,
+                "limit": 100.0 + side * (i % 7) * 0.25,
+                "stop": 99.0 if side > 0 else 101.0,
+                "queue_pos": (i % 10) / 10,
+            }
+        )
+    return rows
+
+
+def test_batch_probability_matches_scalar():
+    cols = _inputs(500)
+    fm = ShadowFillModel()
+    side = cols["side"]
+    touch = np.where(side > 0, cols["ask"], cols["bid"])
+    probs = fm._prob_limit_fill_batch(
+        touch, cols["spread"], side, cols["limit_price"], cols["volume"], cols["queue_pos"]
+    )
+    for i in np.flatnonzero(~np.isnan(cols["limit_price"]))[:200].tolist():
+        snap = {"bid": cols["bid"][i], "ask": cols["ask"][i], "volume": cols["volume"][i]}
+        snap["spread"] = cols["spread"][i]
+        intent = OrderIntent(
+            side=int(side[i]),
+            order_type="limit",
+            qty=1.0,
+            limit_price=float(cols["limit_price"][i]),
+            queue_pos=float(cols["queue_pos"][i]),
+        )
+        assert probs[i] == pytest.approx(fm._prob_limit_fill(snap, intent), rel=1e-12)
+
+
+def test_partial_mode_only_changes_limit_like_orders():
+    cols = _inputs()
+    det = ShadowFillModel(slip_mode="hybrid").fill_batch(**cols)
+    part = ShadowFillModel(slip_mode="hybrid", partial_fills=True).fill_batch(**cols)
+    ot = encode_order_types(cols["order_type"])
+    cand = ((ot == OT_LIMIT) | (ot == OT_STOP_LIMIT)) & (det.status <= ST_RESTING)
+    for field in ("price", "filled_qty", "slip_cost", "status"):
+        np.testing.assert_array_equal(getattr(part, field)[~cand], getattr(det, field)[~cand])
+    st = part.status[cand]
+    assert {ST_FILLED, ST_PARTIAL, ST_RESTING} <= set(st.tolist())
+    qty, filled = cols["qty"][cand], part.filled_qty[cand]
+    assert (filled[st == ST_FILLED] == qty[st == ST_FILLED]).all()
+    frac = filled[st == ST_PARTIAL] / qty[st == ST_PARTIAL]
+    assert ((frac > 0) & (frac < 1)).all()
+    assert (filled[st == ST_RESTING] == 0).all() and (part.price[cand][st == ST_RESTING] == 0).all()
+    # passive fills of resting orders happen at the limit price with no slip cost
+    passive = (det.status[cand] == ST_RESTING) & (filled > 0)
+    assert passive.any()
+    np.testing.assert_array_equal(part.price[cand][passive], cols["limit_price"][cand][passive])
+    assert (part.slip_cost[cand][passive] == 0).all()
+
+
+def test_partial_fills_do_not_depend_on_batching_or_order():
+    cols = _inputs(6000)
+    fm = ShadowFillModel(partial_fills=True, seed=3)
+    whole = fm.fill_batch(**cols)
+    perm = np.random.default_rng(2).permutation(6000)
+    shuffled = fm.fill_batch(**{k: v[perm] for k, v in cols.items()})
+    np.testing.assert_array_equal(shuffled.filled_qty, whole.filled_qty[perm])
+    np.testing.assert_array_equal(shuffled.status, whole.status[perm])
+    parts = [
+        fm.fill_batch(**{k: v[i : i + 777] for k, v in cols.items()}) for i in range(0, 6000, 777)
+    ]
+    np.testing.assert_array_equal(np.concatenate([p.price for p in parts]), whole.price)
+    other = ShadowFillModel(partial_fills=True, seed=4).fill_batch(**cols)
+    assert not np.array_equal(other.filled_qty, whole.filled_qty)
+
+
+def test_partial_mode_skips_unknown_order_types():
+    # code -1 (unknown type) is odd like the limit codes but never a candidate
+    n = 4
+    fb = FillBatch(
+        price=np.full(n, 100.0),
+        filled_qty=np.ones(n),
+        slip_cost=np.zeros(n),
+        status=np.full(n, ST_FILLED, dtype=np.int8),
+    )
+    ot = np.array([-1, OT_LIMIT, -1, OT_STOP_LIMIT], dtype=np.int8)
+    ones = np.ones(n)
+    inputs = (ones * 99.5, ones * 100.5, ones, ones, ot, ones, ones * 101.0, ones, ones)
+    keys = (np.arange(n), np.full(n, 1690000000000), np.array(["BTC"] * n))
+    out = ShadowFillModel(partial_fills=True, seed=1)._partial_batch(fb, inputs, keys)
+    assert out.filled_qty[[0, 2]].tolist() == [1.0, 1.0]
+    assert out.status[[0, 2]].tolist() == [ST_FILLED, ST_FILLED]
+    assert out.filled_qty[[1, 3]].tolist() != [1.0, 1.0]
+
+
+def test_partial_mode_needs_event_keys():
+    cols = _inputs(10)
+    del cols["event_id"]
+    with pytest.raises(ValueError, match="event_id"):
+        ShadowFillModel(partial_fills=True).fill_batch(**cols)
+
+
+def test_partial_mode_on_top_of_the_kernel(monkeypatch):
+    monkeypatch.setattr(kernels, "compiled_fill_loop", kernels.fill_loop)
+    cols = _inputs(400)
+    jit = ShadowFillModel(engine="numba", partial_fills=True).fill_batch(**cols)
+    ref = ShadowFillModel(partial_fills=True).fill_batch(**cols)
+    np.testing.assert_array_equal(jit.filled_qty, ref.filled_qty)
+    np.testing.assert_array_equal(jit.status, ref.status)
+
+
+def test_run_ab_reports_real_partials_across_execution_modes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fill = {"partial_fills": True, "slip_mode": "bps"}
+    seq = run_ab(RunConfig(run_id="p", fill=fill, batch={"batch_size": 64}), _rows(), _rows(120))
+    assert 0 < seq["A"]["partial_fill_ratio"] < 1
+    # row and columnar legs give the same fills
+    cols = run_ab(RunConfig(run_id="p", fill=fill), to_columns(_rows()), to_columns(_rows(120)))
+    assert strip_timing(cols) == strip_timing(seq)
+    sharded = RunConfig(
+        run_id="p", fill=fill, execution={"mode": "sharded", "shards": 3, "max_workers": 1}
+    )
+    assert strip_timing(run_ab(sharded, _rows(), _rows(120))) == strip_timing(seq)
+    det = run_ab(RunConfig(run_id="d", fill={"slip_mode": "bps"}), _rows(), _rows(120))
+    assert det["A"]["partial_fill_ratio"] == 0.0
+    assert FILL_STATUSES[ST_PARTIAL] == "partial"
+
+
+def test_partial_fills_agree_across_leg_sources(tmp_path, monkeypatch):
+    # a tick store keeps ts as float64, JSON rows as ints: the draws must not care
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.json").write_text(json.dumps(_rows()))
+    convert_events("a.json", "ticks", chunk_size=64)
+    cfg = RunConfig(run_id="p", fill={"partial_fills": True, "slip_mode": "bps"})
+    rows = strip_timing(run_ab(cfg, _rows(), []))
+    assert strip_timing(run_ab(cfg, to_columns(_rows()), [])) == rows
+    assert strip_timing(run_ab(cfg, TickStore("ticks", chunk_size=70), [])) == rows
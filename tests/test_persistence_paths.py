@@ -77,3 +77,34 @@ def test_stop_performs_final_flush():
     finally:
         repo.stop()  # should trigger final flush of remaining buffer
     assert calls["n"] >= 1
+
+
+def test_writer_pool_flushes_everything_on_stop():
+    from hcebt import persistence as P
+
+    class SlowClient:
+        def __init__(self):
+            self.rows = 0
+
+        def insert(self, table, data, column_names=None, column_oriented=False):
+            time.sleep(0.01)
+            self.rows += len(data[0])
+
+    repo = P.Repo(cfg=P.RepoConfig(batch_size=10, flush_interval_ms=50, writers=3))
+    clients = [SlowClient() for _ in repo._writers]
+    for w, client in zip(repo._writers, clients, strict=True):
+        w.repo = ("ch", client)
+    # queued before start and stopped right away: stop() must drain the queue
+    for i in range(50):
+        repo.submit(
+            P.RowBatch.from_columns(
+                {"run_id": ["r"] * 4, "ts": [i] * 4, "symbol": list("ABCD"), "metric": ["m"] * 4}
+            )
+        )
+    repo.start()
+    repo.stop()
+    assert sum(c.rows for c in clients) == 200
+    assert repo.metrics["written_rows"] == 200
+    flushes = [repo.metrics[f"writer{i}_flushes"] for i in range(3)]
+    # each flush takes three 4-row batches (>= batch_size 10)
+    assert sum(flushes) >= 17 and all(repo.metrics[f"writer{i}_latency_ms"] >= 0 for i in range(3))
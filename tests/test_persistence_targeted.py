@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from hcebt.persistence import Repo, RepoConfig
+import pytest
+
+from hcebt.persistence import Repo, RepoConfig, RowBatch
 
 
 class _FakeCursor:
@@ -34,8 +36,8 @@ class _FakeCHClient:
     def __init__(self):
         self.calls = []
 
-    def insert(self, table, data, column_names=None):
-        self.calls.append((table, data, list(column_names or [])))
+    def insert(self, table, data, column_names=None, column_oriented=False):
+        self.calls.append((table, data, list(column_names or []), column_oriented))
 
 
 def _rows_with_dupes():
@@ -74,8 +76,10 @@ def test_flush_clickhouse_inserts_with_sorted_columns():
     repo._flush(_rows_with_dupes())
 
     assert len(ch.calls) == 1
-    table, data, cols = ch.calls[0]
-    assert isinstance(data, list) and len(data) == 1  # deduped to one row
+    table, data, cols, column_oriented = ch.calls[0]
+    # one list per column, deduped to one row
+    assert column_oriented and len(data) == len(cols)
+    assert all(len(values) == 1 for values in data)
     assert cols == sorted(cols) and set(cols) >= {"run_id", "ts", "symbol", "metric", "value"}
 
 
@@ -102,3 +106,120 @@ def test_repo_config_queue_max_batches_backcompat():
     cfg = RepoConfig(queue_max=10, queue_max_batches=5)
     assert cfg.queue_max == 5
     assert cfg.queue_max_batches_prop == 5
+
+
+def test_flush_timescale_epoch_ms_converts_in_sql():
+    repo = Repo(RepoConfig(ts_format="epoch_ms"))
+    ts = _FakeTSConn()
+    repo.repo = ("ts", ts)
+
+    repo._flush([{"run_id": "r1", "ts": 1_600_000_000_000, "symbol": "BTC", "metric": "m"}])
+
+    sql, args = ts.cur.executed[0]
+    assert "VALUES (%s,%s,%s,to_timestamp(%s / 1000.0))" in sql  # metric,run_id,symbol,ts
+    assert args[-1] == 1_600_000_000_000
+
+
+def test_row_batch_submit_validates_once_and_writers_read_columns():
+    repo = Repo(RepoConfig())
+    with pytest.raises(ValueError, match="Missing key metric"):
+        repo.submit(RowBatch.from_columns({"run_id": ["r"], "ts": [1], "symbol": ["X"]}))
+    with pytest.raises(ValueError, match="has 1 values"):
+        repo.submit(RowBatch({"run_id": ["r"], "ts": [1], "symbol": ["X"], "metric": ["m"]}, 2))
+
+    batch = RowBatch.from_rows(_rows_with_dupes() + [{**_rows_with_dupes()[0], "ts": 2}])
+    repo = Repo(RepoConfig(dedupe_max_keys=0))  # same batch to both writers
+    ch, ts = _FakeCHClient(), _FakeTSConn()
+    for backend in (("ch", ch), ("ts", ts)):
+        repo.repo = backend
+        repo._flush(batch)
+    assert ch.calls[0][1][ch.calls[0][2].index("value")] == [42, 42]
+    assert ts.cur.executed[0][1] == ["m", "r1", "BTC", 1, 42, "m", "r1", "BTC", 2, 42]
+
+
+def test_row_batch_concat_slice_and_rows_round_trip():
+    a = RowBatch.from_rows([{"run_id": "r", "ts": 1, "symbol": "X", "metric": "m"}])
+    b = RowBatch.from_columns({"run_id": ["r", "r"], "ts": [2, 3], "symbol": ["X", "Y"]})
+    both = RowBatch.concat([a, RowBatch({}, 0), b])
+    assert len(both) == 3 and both.column("metric") == ["m", None, None]
+    assert both.slice(1, 10).to_rows() == [
+        {"metric": None, "run_id": "r", "symbol": "X", "ts": 2},
+        {"metric": None, "run_id": "r", "symbol": "Y", "ts": 3},
+    ]
+
+
+class _FakeCopy:
+    def __init__(self, sql):
+        self.sql, self.types, self.rows = sql, None, []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set_types(self, types):
+        self.types = types
+
+    def write_row(self, row):
+        self.rows.append(row)
+
+
+class _FakeCopyCursor(_FakeCursor):
+    def __init__(self):
+        super().__init__()
+        self.copies = []
+
+    def execute(self, sql, args=()):
+        super().execute(sql, args)
+
+    def fetchall(self):
+        return [
+            ("run_id", "text"),
+            ("ts", "timestamp with time zone"),
+            ("symbol", "text"),
+            ("metric", "text"),
+            ("value", "double precision"),
+            ("label", "text"),
+        ]
+
+    def copy(self, sql):
+        self.copies.append(_FakeCopy(sql))
+        return self.copies[-1]
+
+
+class _FakeCopyConn(_FakeTSConn):
+    def __init__(self):
+        super().__init__()
+        self.cur = _FakeCopyCursor()
+        self.transactions = 0
+
+    def transaction(self):
+        self.transactions += 1
+        return self.cur
+
+
+def test_flush_timescale_copy_stages_then_upserts():
+    repo = Repo(RepoConfig(timescale_write="copy", ts_format="epoch_ms"))
+    conn = _FakeCopyConn()
+    repo.repo = ("ts", conn)
+
+    repo._flush(_rows_with_dupes())
+    repo._flush([{**_rows_with_dupes()[0], "ts": 2}])
+
+    assert conn.transactions == 2
+    sqls = [sql for sql, _ in conn.cur.executed]
+    assert sum("pg_attribute" in sql for sql in sqls) == 1  # table types looked up once
+    assert "hcebt_stage_0 (metric text,run_id text,symbol text,ts bigint,value double" in sqls[1]
+    copy = conn.cur.copies[0]
+    assert copy.sql.endswith("FROM STDIN (FORMAT BINARY)")
+    assert copy.types == ["text", "text", "text", "bigint", "double precision"]
+    assert copy.rows == [("m", "r1", "BTC", 1, 42)]
+    upsert = sqls[2]
+    assert (
+        "SELECT metric,run_id,symbol,to_timestamp(ts / 1000.0),value FROM hcebt_stage_0" in upsert
+    )
+    assert upsert.endswith(
+        "ON CONFLICT (run_id,ts,symbol,metric) DO UPDATE SET value=EXCLUDED.value"
+    )
+    assert repo.metrics["written_rows"] == 2 and repo.metrics["write_rows_per_sec"] > 0
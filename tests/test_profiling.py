@@ -0,0 +1,120 @@
+import json
+import pstats
+
+from backtest import cli
+from click.testing import CliRunner
+from conftest import strip_timing
+
+from hcebt.config import RunConfig
+from hcebt.events import to_columns
+from hcebt.profiling import STAGES, StageProfiler, collapsed_stacks, cprofile_run, merge_profiles
+from hcebt.runner import run_ab
+
+
+def _events(n=25):
+    return [
+        {
+            "id": i,
+            "ts": 1690000000000 + i * 1000,
+            "symbol": ("BTC", "ETH", "SOL")[i % 3],
+            "bid": 99.5,
+            "ask": 100.5,
+            "last": 100.0 + (i % 4) * 0.5,
+            "type": ("market", "limit", "stop", "stop-limit")[i % 4],
+            "side": 1 if i % 3 else -1,
+            "qty": 1.0 + i,
+            "limit": 100.6,
+            "stop": 100.2,
+        }
+        for i in range(n)
+    ]
+
+
+def test_stage_profiler_counts_and_merge():
+    prof = StageProfiler()
+    prof.start()
+    prof.lap("fill", 10)
+    prof.lap("snapshot", 10)
+    prof.lap("fill", 5)
+    prof.lap("custom")
+    summary = prof.summary()
+    assert list(summary) == ["snapshot", "fill", "custom"]
+    assert summary["fill"]["calls"] == 2 and summary["fill"]["events"] == 15
+    assert abs(sum(v["share"] for v in summary.values()) - 1.0) < 1e-9
+    merged = merge_profiles([summary, summary])
+    assert merged["fill"]["calls"] == 4 and merged["snapshot"]["events"] == 20
+    assert merge_profiles([]) == {}
+
+
+def test_profiled_run_reports_stages_without_changing_results(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    base = RunConfig(run_id="prof", batch={"batch_size": 10})
+    plain = run_ab(base, _events(), to_columns(_events()))
+    cfg = RunConfig(**{**base.model_dump(), "profile": {"enabled": True}})
+    res = run_ab(cfg, _events(), to_columns(_events()))
+    assert "profile" not in plain["A"]
+    assert strip_timing(res, "profile") == strip_timing(plain, "profile")
+    for leg in "AB":
+        prof = res[leg]["profile"]
+        assert list(prof) == list(STAGES)
+        assert prof["fill"]["events"] == 25
+        assert prof["submit"]["calls"] == 4  # 3 batches of 10 events + the final flush
+    assert res["A"]["profile"]["fill"]["calls"] == 3
+    assert res["B"]["profile"]["snapshot"]["calls"] == 1  # one column conversion per chunk
+
+
+def test_sharded_profiles_are_merged(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cfg = RunConfig(
+        run_id="shards",
+        execution={"mode": "sharded", "shards": 3, "max_workers": 1},
+        profile={"enabled": True},
+    )
+    res = run_ab(cfg, _events(), _events(12))
+    assert res["A"]["profile"]["fill"]["events"] == 25
+    assert res["B"]["profile"]["fill"]["events"] == 12
+
+
+def test_cprofile_artifacts(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cfg = RunConfig(run_id="cp", profile={"enabled": True, "cprofile": True})
+    res = run_ab(cfg, _events(), _events())
+    paths = res["profile_artifacts"]
+    assert paths == ["run_artifacts/cp_profile.pstats", "run_artifacts/cp_profile.collapsed"]
+    assert pstats.Stats(paths[0]).total_calls > 0
+    lines = (tmp_path / paths[1]).read_text().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("fills.py" in line and "fill" in line for line in lines)
+
+
+def test_collapsed_stacks_follow_callers(tmp_path):
+    def leaf():
+        return sum(range(20000))
+
+    def outer():
+        total = 0
+        for _ in range(5):
+            total += leaf()
+        return total
+
+    with cprofile_run(str(tmp_path / "p")) as paths:
+        outer()
+    stats = pstats.Stats(paths[0])
+    stacks = dict(line.rsplit(" ", 1) for line in collapsed_stacks(stats))
+    frames = [k.split(";") for k in stacks]
+    assert any(f[-2].endswith(":outer") and f[-1].endswith(":leaf") for f in frames if len(f) > 1)
+    assert any(
+        f[-1] == "<built-in method builtins.sum>" and f[-2].endswith(":leaf") for f in frames
+    )
+
+
+def test_cli_profile_flag(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "cfg.yaml").write_text("run_id: cli\n")
+    legs = []
+    for name in ("a.json", "b.json"):
+        (tmp_path / name).write_text(json.dumps(_events(5)))
+        legs.append(name)
+    out = CliRunner().invoke(cli, ["run", "--config", "cfg.yaml", "--ab", *legs, "--profile"])
+    assert out.exit_code == 0, out.output
+    assert '"profile"' in out.output
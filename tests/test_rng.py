@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from hcebt.fills import ShadowFillModel
+from hcebt.rng import EventRNG, event_keys, philox4x32
+from hcebt.sharding import shard_of
+
+
+@pytest.mark.parametrize(
+    "ctr, key, expected",
+    [
+        ([0, 0, 0, 0], [0, 0], [0x6627E8D5, 0xE169C58D, 0xBC57AC4C, 0x9B00DBD8]),
+        ([0xFFFFFFFF] * 4, [0xFFFFFFFF] * 2, [0x408F276D, 0x41C83B0E, 0xA20BC7C6, 0x6D5451FD]),
+        (
+            [0x243F6A88, 0x85A308D3, 0x13198A2E, 0x03707344],
+            [0xA4093822, 0x299F31D0],
+            [0xD16CFE09, 0x94FDCCEB, 0x5001E420, 0x24126EA1],
+        ),
+    ],
+)
+def test_philox_known_answers(ctr, key, expected):
+    """Random123 kat_vectors for philox4x32_10."""
+    assert philox4x32(np.array([ctr], dtype=np.uint32), key)[0].tolist() == expected
+
+
+def test_philox_blocks_match_rowwise():
+    ctr = np.random.default_rng(0).integers(0, 2**32, (40000, 4), dtype=np.uint32)
+    whole = philox4x32(ctr, (7, 9))
+    assert all((philox4x32(ctr[i : i + 1], (7, 9)) == whole[i]).all() for i in (0, 16384, 39999))
+
+
+def _events(n=5000):
+    ids = np.arange(n)
+    ts = 1_690_000_000_000 + ids * 3
+    symbols = np.array([f"S{i % 13}" for i in range(n)])
+    return ids, ts, symbols
+
+
+def test_draws_do_not_depend_on_order_batching_or_sharding():
+    ids, ts, symbols = _events()
+    rng = EventRNG(42)
+    whole = rng.uniform(ids, ts, symbols)
+    assert ((whole >= 0) & (whole < 1)).all() and abs(whole.mean() - 0.5) < 0.02
+    perm = np.random.default_rng(1).permutation(len(ids))
+    np.testing.assert_array_equal(rng.uniform(ids[perm], ts[perm], symbols[perm]), whole[perm])
+    batched = np.concatenate(
+        [
+            rng.uniform(ids[i : i + 97], ts[i : i + 97], symbols[i : i + 97])
+            for i in range(0, 5000, 97)
+        ]
+    )
+    np.testing.assert_array_equal(batched, whole)
+    for shard in range(3):
+        mask = np.array([shard_of(s, 3) == shard for s in symbols.tolist()])
+        part = EventRNG(42).uniform(ids[mask], ts[mask], symbols[mask])
+        np.testing.assert_array_equal(part, whole[mask])
+    # scalars (one-event batches, as the row path would draw) agree too
+    assert EventRNG(42).uniform([ids[7]], [ts[7]], [symbols[7]])[0] == whole[7]
+
+
+def test_streams_seeds_and_event_fields_change_the_draws():
+    ids, ts, symbols = _events(200)
+    keys = event_keys(ids, ts, symbols)
+    rng = EventRNG(42)
+    base = rng.uniform_keys(keys)
+    assert not np.array_equal(base, rng.uniform_keys(keys, stream=1))
+    assert not np.array_equal(base, EventRNG(43).uniform_keys(keys))
+    assert not np.array_equal(base, EventRNG(42 + (1 << 32)).uniform_keys(keys))
+    assert not np.array_equal(base, rng.uniform(ids, ts + 1, symbols))
+    assert not np.array_equal(base, rng.uniform(ids, ts, np.char.add(symbols, "x")))
+    many = rng.uniform_keys(keys, draws=3)
+    assert many.shape == (200, 3)
+    np.testing.assert_array_equal(many[:, 0], base)
+    assert len(np.unique(many)) == many.size
+    assert rng.uniform_keys(np.empty(0, dtype=np.uint64)).shape == (0,)
+
+
+def test_model_carries_a_keyed_rng():
+    fm = ShadowFillModel(seed=5)
+    assert isinstance(fm.event_rng, EventRNG) and fm.event_rng.seed == 5
+
+
+def test_keys_do_not_depend_on_column_dtypes():
+    ids, ts, symbols = _events(50)
+    keys = event_keys(ids, ts, symbols)
+    # as a tick store (float ts), JSON rows (object columns) or bytes would hold them
+    np.testing.assert_array_equal(event_keys(ids, ts.astype(float), symbols), keys)
+    np.testing.assert_array_equal(
+        event_keys(ids.astype(object), ts.astype(object), symbols.astype(object)), keys
+    )
+    np.testing.assert_array_equal(event_keys(ids, ts, symbols.astype("S")), keys)
+    assert not np.array_equal(event_keys(ids, ts + 0.5, symbols), keys)
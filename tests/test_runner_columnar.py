@@ -0,0 +1,103 @@
+from conftest import strip_timing
+
+from hcebt.config import RunConfig
+from hcebt.events import sort_columns, to_columns
+from hcebt.persistence import Repo
+from hcebt.runner import run_ab
+
+
+def _events():
+    return [
+        {
+            "id": 3,
+            "ts": 1690000002000,
+            "symbol": "ETH",
+            "bid": 99.0,
+            "ask": 101.0,
+            "last": 100.0,
+            "type": "stop",
+            "side": -1,
+            "qty": 2.0,
+            "stop": 100.5,
+        },
+        {
+            "id": 1,
+            "ts": 1690000000000,
+            "symbol": "BTC",
+            "bid": 99.5,
+            "ask": 100.5,
+            "last": 100.0,
+            "vol": 1200,
+            "type": "market",
+            "side": 1,
+            "qty": 0.1,
+        },
+        {
+            "id": 2,
+            "ts": 1690000001000,
+            "symbol": "BTC",
+            "bid": 99.5,
+            "ask": 100.5,
+            "last": 100.2,
+            "type": "limit",
+            "side": -1,
+            "qty": 0.2,
+            "limit": 99.4,
+            "queue_pos": 0.3,
+        },
+        {
+            "id": 4,
+            "ts": 1690000001000,
+            "symbol": "ADA",
+            "bid": 0.5,
+            "ask": 0.51,
+            "last": 0.505,
+            "type": "limit",
+            "side": 1,
+            "qty": 10.0,
+            "limit": 0.4,
+        },
+        {
+            "id": 5,
+            "ts": 1690000003000,
+            "symbol": "ETH",
+            "bid": 99.0,
+            "ask": 101.0,
+            "last": 100.0,
+            "type": "stop-limit",
+            "side": 1,
+            "qty": 1.0,
+            "stop": 99.0,
+            "limit": 102.0,
+        },
+    ]
+
+
+def test_columnar_legs_match_row_legs(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    for mode in ("fixed_ticks", "bps", "pct_spread", "hybrid"):
+        cfg = RunConfig(run_id="col", fill={"slip_mode": mode}, batch={"batch_size": 2})
+        rows_res = run_ab(cfg, _events(), _events()[:3])
+        col_res = run_ab(cfg, to_columns(_events()), to_columns(_events()[:3]))
+        assert strip_timing(col_res) == strip_timing(rows_res)
+        assert col_res["repo_metrics"]["submitted_batches"] == 5
+
+
+def test_sort_columns_matches_row_sort_key():
+    cols = sort_columns(to_columns(_events()))
+    assert cols["id"].tolist() == [1, 4, 2, 3, 5]
+
+
+def test_row_and_columnar_legs_submit_same_timestamps(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    submitted = []
+    monkeypatch.setattr(Repo, "submit", lambda self, rows: submitted.append(rows))
+    for ts_format, first in (("iso", "2023-07-22T04:26:40+00:00"), ("epoch_ms", 1690000000000)):
+        cfg = RunConfig(run_id="ts", batch={"batch_size": 2, "ts_format": ts_format})
+        submitted.clear()
+        run_ab(cfg, _events(), [])
+        row_ts = [ts for batch in submitted for ts in batch.column("ts")]
+        submitted.clear()
+        run_ab(cfg, to_columns(_events()), [])
+        assert [ts for batch in submitted for ts in batch.column("ts")] == row_ts
+        assert row_ts[0] == first
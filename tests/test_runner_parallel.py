@@ -0,0 +1,84 @@
+import json
+
+from conftest import strip_timing
+
+from hcebt.config import RunConfig
+from hcebt.events import to_columns
+from hcebt.persistence import Repo
+from hcebt.runner import _leg_worker, _merge_repo_metrics, run_ab
+from hcebt.streaming import JsonlStream
+from hcebt.tickstore import TickStore, convert_events
+
+
+def _events(n=30):
+    return [
+        {
+            "id": i,
+            "ts": 1690000000000 + (n - i) * 1000,
+            "symbol": "BTC" if i % 2 else "ETH",
+            "bid": 99.5,
+            "ask": 100.5,
+            "last": 100.0 + (i % 4) * 0.5,
+            "type": ("market", "limit", "stop", "stop-limit")[i % 4],
+            "side": 1 if i % 3 else -1,
+            "qty": 0.5 + i,
+            "limit": 100.6,
+            "stop": 100.2,
+        }
+        for i in range(n)
+    ]
+
+
+def test_process_legs_match_sequential(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    seq_cfg = RunConfig(run_id="seq", fill={"slip_mode": "hybrid"}, batch={"batch_size": 7})
+    par_cfg = RunConfig(**{**seq_cfg.model_dump(), "execution": {"mode": "process"}})
+    seq = run_ab(seq_cfg, _events(), _events(20))
+    par = run_ab(par_cfg, _events(), to_columns(_events(20)))
+    assert set(par) == set(seq)
+    assert strip_timing(par) == strip_timing(seq)
+    assert par["repo_metrics"]["submitted_batches"] == seq["repo_metrics"]["submitted_batches"]
+
+
+def test_identical_legs_persist_both_labels_in_every_mode(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rows = []
+    monkeypatch.setattr(Repo, "_connect", lambda self: ("fake", None))
+    monkeypatch.setattr(Repo, "_write_rows", lambda self, batch: rows.extend(batch.to_rows()))
+    seq_cfg = RunConfig(run_id="same", batch={"batch_size": 7})
+    par_cfg = RunConfig(**{**seq_cfg.model_dump(), "execution": {"mode": "process"}})
+    seq = run_ab(seq_cfg, _events(), _events())["repo_metrics"]
+    par = run_ab(par_cfg, _events(), _events())["repo_metrics"]
+    assert {r["label"] for r in rows} == {"A", "B"}
+    assert sum(r["label"] == "A" for r in rows) == sum(r["label"] == "B" for r in rows)
+    assert seq["dedupe_hits"] == par["dedupe_hits"] == 0
+    assert seq["written_rows"] == par["written_rows"] == len(rows)
+
+
+def test_process_legs_accept_file_backed_streams(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    evs = sorted(_events(), key=lambda e: e["ts"])
+    (tmp_path / "a.jsonl").write_text("\n".join(json.dumps(e) for e in evs))
+    convert_events(str(tmp_path / "a.jsonl"), str(tmp_path / "store"))
+    cfg = RunConfig(run_id="files", execution={"mode": "process", "max_workers": 1})
+    res = run_ab(
+        cfg,
+        JsonlStream(str(tmp_path / "a.jsonl"), chunk_size=4),
+        TickStore(str(tmp_path / "store")),
+    )
+    assert res["A"]["events"] == res["B"]["events"] == 30
+    assert strip_timing(res)["A"] == strip_timing(res)["B"]
+
+
+def test_leg_worker_and_metric_merge(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    res, report = _leg_worker(RunConfig(run_id="w"), "A", _events(5))
+    assert res["events"] == 5 and report["repo_metrics"]["submitted_batches"] == 1
+    assert report["metrics"]["counters"]["hcebt_repo_rows_written_total"] == 5
+    merged = _merge_repo_metrics(
+        [
+            {"submitted_batches": 2, "write_latency_ms": 3.0},
+            {"submitted_batches": 1, "write_latency_ms": 1.5},
+        ]
+    )
+    assert merged == {"submitted_batches": 3, "write_latency_ms": 3.0}
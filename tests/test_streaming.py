@@ -0,0 +1,83 @@
+import json
+from pathlib import Path
+
+from conftest import strip_timing
+import pytest
+
+from hcebt.config import RunConfig
+from hcebt.events import to_columns
+from hcebt.runner import run_ab
+from hcebt.streaming import UnsortedStreamError, check_sorted, is_stream_path, iter_jsonl_chunks
+
+
+def _events(n=25):
+    return [
+        {
+            "id": i,
+            "ts": 1690000000000 + (i // 2) * 1000,
+            "symbol": "BTC" if i % 2 else "ADA",
+            "bid": 99.5 + i * 0.01,
+            "ask": 100.5 + i * 0.01,
+            "last": 100.0 + i * 0.01,
+            "type": ("market", "limit", "stop")[i % 3],
+            "side": 1 if i % 4 < 2 else -1,
+            "qty": 1.0 + i,
+            "limit": 100.4,
+            "stop": 100.1,
+        }
+        for i in range(n)
+    ]
+
+
+def _write_jsonl(path: Path, events):
+    path.write_text("\n".join(json.dumps(ev) for ev in events) + "\n\n")
+    return str(path)
+
+
+def test_iter_jsonl_chunks_respects_chunk_size(tmp_path):
+    path = _write_jsonl(tmp_path / "a.jsonl", _events())
+    sizes = [len(c) for c in iter_jsonl_chunks(path, chunk_size=10)]
+    assert sizes == [10, 10, 5]
+    cols = next(iter_jsonl_chunks(path, chunk_size=10, columnar=True))
+    assert len(cols["ts"]) == 10
+    assert is_stream_path(path) and not is_stream_path("a.json")
+
+
+def test_iter_jsonl_chunks_reports_bad_line(tmp_path):
+    bad = tmp_path / "bad.ndjson"
+    bad.write_text('{"ts": 1}\n{not json\n')
+    with pytest.raises(ValueError, match=":2:"):
+        list(iter_jsonl_chunks(str(bad)))
+
+
+def test_streamed_legs_match_in_memory_legs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = _write_jsonl(tmp_path / "a.jsonl", _events())
+    cfg = RunConfig(run_id="stream", batch={"batch_size": 4})
+    base = run_ab(cfg, _events(), _events())
+    res = run_ab(
+        cfg,
+        iter_jsonl_chunks(path, chunk_size=7),
+        iter_jsonl_chunks(path, chunk_size=6, columnar=True),
+    )
+    assert strip_timing(res) == strip_timing(base)
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_check_sorted_rejects_inversions(columnar):
+    evs = _events(10)
+    wrap = to_columns if columnar else list
+    # inversion inside a chunk (the 7th event sorts before the 6th)
+    with pytest.raises(UnsortedStreamError, match="event 6"):
+        list(check_sorted([wrap(evs[:5] + [evs[6], evs[5]])]))
+    # inversion across a chunk boundary
+    with pytest.raises(UnsortedStreamError, match="event 5"):
+        list(check_sorted([wrap(evs[:5]), wrap(evs[3:])]))
+    assert len(list(check_sorted([wrap(evs[:5]), wrap([]), wrap(evs[5:])]))) == 3
+
+
+def test_run_ab_fails_clearly_on_unsorted_stream(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    evs = _events(6)
+    with pytest.raises(UnsortedStreamError, match="leg B"):
+        run_ab(RunConfig(run_id="unsorted"), iter([evs]), iter([evs[3:], evs[:3]]))
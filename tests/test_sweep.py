@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+from hcebt.config import FillConfig, RunConfig
+from hcebt.persistence import PK_COLUMNS, Repo
+from hcebt.runner import run_ab
+from hcebt.sweep import expand_grid, load_sorted_columns, sweep
+
+
+def _events(n=24):
+    return [
+        {
+            "id": i,
+            "ts": 1690000000000 + (n - i) * 500,
+            "symbol": ("BTC", "ETH", "SOL")[i % 3],
+            "bid": 99.5,
+            "ask": 100.5 + (i % 2) * 0.5,
+            "last": 100.0 + (i % 4) * 0.4,
+            "type": ("market", "limit", "stop", "stop-limit")[i % 4],
+            "side": 1 if i % 3 else -1,
+            "qty": 1.0 + i,
+            "limit": 100.8,
+            "stop": 100.3,
+        }
+        for i in range(n)
+    ]
+
+
+GRID = {"slip_mode": ["bps", "hybrid"], "bps": [1.0, 4.0], "hybrid_weight": [0.25]}
+
+
+def test_expand_grid_ids_and_validation():
+    variants = expand_grid(FillConfig(), GRID)
+    assert [v for v, _ in variants] == [
+        "slip_mode=bps,bps=1.0,hybrid_weight=0.25",
+        "slip_mode=bps,bps=4.0,hybrid_weight=0.25",
+        "slip_mode=hybrid,bps=1.0,hybrid_weight=0.25",
+        "slip_mode=hybrid,bps=4.0,hybrid_weight=0.25",
+    ]
+    assert expand_grid(FillConfig(), {})[0][0] == "base"
+    with pytest.raises(ValueError, match="nope"):
+        expand_grid(FillConfig(), {"nope": [1]})
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_sweep_matches_individual_runs(tmp_path, monkeypatch, workers):
+    monkeypatch.chdir(tmp_path)
+    cfg = RunConfig(run_id="sw", batch={"batch_size": 5})
+    res = sweep(cfg, _events(), GRID, workers=workers)
+    table = res["table"]
+    assert len(table) == 4
+    for row, (_, fill) in zip(table, expand_grid(cfg.fill, GRID), strict=True):
+        single = run_ab(RunConfig(run_id="one", fill=fill.model_dump()), _events(), [])["A"]
+        assert row["fill_rate"] == single["fill_rate"]
+        assert row["slip_cost"] == single["slip_cost"]
+        assert row["events_per_sec"] > 0
+    assert res["repo_metrics"]["submitted_batches"] == 4 * 5
+    saved = json.loads((tmp_path / "run_artifacts" / "sw_sweep.json").read_text())
+    assert saved["table"] == table
+
+
+def test_load_sorted_columns_accepts_streams():
+    evs = sorted(_events(), key=lambda e: e["ts"])
+    cols = load_sorted_columns(iter([evs[:10], evs[10:]]))
+    assert cols["id"].tolist() == [e["id"] for e in evs]
+    assert load_sorted_columns(_events())["id"].tolist() == cols["id"].tolist()
+
+
+def test_variants_persist_under_their_own_run_ids(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rows = []
+    monkeypatch.setattr(Repo, "_write_rows", lambda self, batch: rows.extend(batch.to_rows()))
+    cfg = RunConfig(run_id="sw", batch={"batch_size": 5})
+    table = sweep(cfg, _events(), GRID, workers=1)["table"]
+    assert [row["run_id"] for row in table] == [f"sw-{row['variant']}" for row in table]
+    assert {r["run_id"] for r in rows} == {row["run_id"] for row in table}
+    assert all(r["label"] == r["run_id"][3:] for r in rows)
+    # no two variants share a primary key in the backend
+    assert len({tuple(r[c] for c in PK_COLUMNS) for r in rows}) == len(rows) == 4 * 24
+    saved = json.loads((tmp_path / "run_artifacts" / "sw_sweep.json").read_text())
+    assert [row["run_id"] for row in saved["table"]] == [row["run_id"] for row in table]
+
+
+def test_partial_fill_sweep_does_not_depend_on_workers(tmp_path, monkeypatch):
+    # workers=1 fills from the loaded columns, pool workers from the mapped tick store
+    monkeypatch.chdir(tmp_path)
+    cfg = RunConfig(run_id="pf", fill={"partial_fills": True})
+    grid = {"bps": [1.0, 4.0]}
+    tables = [
+        [{k: v for k, v in row.items() if k != "events_per_sec"} for row in res["table"]]
+        for res in (sweep(cfg, _events(60), grid, workers=w) for w in (1, 2))
+    ]
+    assert tables[0] == tables[1]
@@ -0,0 +1,117 @@
+import json
+
+from backtest import cli
+from click.testing import CliRunner
+import numpy as np
+import pytest
+
+from hcebt.events import concat_columns
+from hcebt.streaming import JsonlStream
+from hcebt.synth import generate, parse_mix, render_lines, write_events
+
+
+def _all(n, **kw):
+    return concat_columns(list(generate(n, **kw)))
+
+
+def test_generate_is_seeded_and_chunked():
+    a = list(generate(2_500, symbols=7, seed=3, chunk_size=1_000))
+    b = list(generate(2_500, symbols=7, seed=3, chunk_size=1_000))
+    assert [len(c["ts"]) for c in a] == [1_000, 1_000, 500]
+    for x, y in zip(a, b, strict=True):
+        for k in x:
+            np.testing.assert_array_equal(x[k], y[k])
+    other = next(generate(1_000, symbols=7, seed=4, chunk_size=1_000))
+    assert not np.array_equal(other["last"], a[0]["last"])
+
+
+def test_generated_events_are_consistent():
+    cols = _all(50_000, symbols=12, seed=1, chunk_size=8_192)
+    assert (np.diff(cols["ts"]) > 0).all()
+    np.testing.assert_array_equal(cols["id"], np.arange(50_000))
+    assert len(set(cols["symbol"].tolist())) == 12
+    spread = np.round((cols["ask"] - cols["bid"]) / 0.01, 6)
+    assert (spread >= 1).all() and (spread == np.rint(spread)).all()
+    assert ((cols["last"] == cols["bid"]) | (cols["last"] == cols["ask"])).all()
+    assert (cols["vol"] > 0).all() and (cols["qty"] >= 0.001).all()
+    has_limit = np.isin(cols["type"], ("limit", "stop-limit"))
+    has_stop = np.isin(cols["type"], ("stop", "stop-limit"))
+    assert (np.isnan(cols["limit"]) == ~has_limit).all()
+    assert (np.isnan(cols["stop"]) == ~has_stop).all()
+    # stops trigger beyond the touch on the order's side
+    buy = has_stop & (cols["side"] > 0)
+    assert (cols["stop"][buy] > cols["ask"][buy]).all()
+    shares = {t: np.mean(cols["type"] == t) for t in ("market", "limit", "stop", "stop-limit")}
+    assert shares == pytest.approx(
+        {"market": 0.4, "limit": 0.3, "stop": 0.15, "stop-limit": 0.15}, abs=0.01
+    )
+
+
+def test_prices_continue_across_chunks():
+    cols = _all(20_000, symbols=1, seed=2, chunk_size=1_000)
+    mid = (cols["bid"] + cols["ask"]) / 2
+    assert np.abs(np.diff(np.log(mid))).max() < 0.01
+
+
+def test_parse_mix():
+    assert parse_mix("market=3, limit=1") == {
+        "market": 0.75,
+        "limit": 0.25,
+        "stop": 0.0,
+        "stop-limit": 0.0,
+    }
+    cols = _all(2_000, mix=parse_mix("stop=1"))
+    assert set(cols["type"].tolist()) == {"stop"}
+    for bad in ("market", "iceberg=1", "market=0", "market=-1,limit=2"):
+        with pytest.raises(ValueError):
+            parse_mix(bad)
+
+
+def test_render_lines_round_trips_through_json():
+    chunk = next(generate(3_000, symbols=5, seed=9))
+    chunk["limit"][:3] = [-1.5, 0.0, 123456.789]
+    chunk["side"] = chunk["side"].astype(np.int64)
+    lines = render_lines(chunk).decode().splitlines()
+    assert len(lines) == 3_000
+    for i, line in enumerate(lines):
+        ev = json.loads(line)
+        for k, v in ev.items():
+            expected = chunk[k][i].item()
+            if isinstance(expected, float) and np.isnan(expected):
+                assert v is None
+            else:
+                assert v == expected, (i, k)
+    with pytest.raises(ValueError, match="ASCII"):
+        render_lines({**chunk, "symbol": np.array(['a"b'] * 3_000)})
+
+
+def test_write_events_json_and_jsonl(tmp_path):
+    n = write_events(str(tmp_path / "e.json"), generate(1_500, chunk_size=400), jsonl=False)
+    events = json.loads((tmp_path / "e.json").read_text())
+    assert n == len(events) == 1_500
+    write_events(str(tmp_path / "e.jsonl"), generate(1_500, chunk_size=400), jsonl=True)
+    chunks = list(JsonlStream(str(tmp_path / "e.jsonl"), chunk_size=1_000))
+    assert [len(c) for c in chunks] == [1_000, 500]
+    assert chunks[0][0] == events[0]
+    assert write_events(str(tmp_path / "empty.json"), generate(0), jsonl=False) == 0
+    assert json.loads((tmp_path / "empty.json").read_text()) == []
+
+
+def test_cli_gen_output_runs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    runner = CliRunner()
+    out = runner.invoke(
+        cli, ["gen", "a.jsonl", "--events", "2000", "--symbols", "4", "--seed", "5"]
+    )
+    assert out.exit_code == 0, out.output
+    assert json.loads(out.output)["events"] == 2_000
+    runner.invoke(cli, ["gen", "b.json", "--events", "2000", "--symbols", "4", "--seed", "5"])
+    assert [json.loads(x) for x in (tmp_path / "a.jsonl").read_text().splitlines()] == json.loads(
+        (tmp_path / "b.json").read_text()
+    )
+    (tmp_path / "cfg.yaml").write_text("run_id: gen\n")
+    res = runner.invoke(cli, ["run", "--config", "cfg.yaml", "--ab", "a.jsonl", "b.json"])
+    assert res.exit_code == 0, res.output
+    assert '"events": 2000' in res.output
+    bad = runner.invoke(cli, ["gen", "c.json", "--mix", "market=x"])
+    assert bad.exit_code == 2
@@ -0,0 +1,117 @@
+import json
+
+from conftest import strip_timing
+import numpy as np
+import pytest
+
+from hcebt.config import RunConfig
+from hcebt.runner import run_ab
+from hcebt.streaming import UnsortedStreamError
+from hcebt.tickstore import TickStore, TickStoreWriter, convert_events, is_tick_store
+
+
+def _events(n=40):
+    syms = ("ADA", "BTC", "ETH")
+    return [
+        {
+            "id": i,
+            "ts": 1690000000000 + (i // 3) * 1000,
+            "symbol": syms[i % 3],
+            "bid": 99.5 + i * 0.01,
+            "ask": 100.5 + i * 0.01,
+            "last": 100.0 + (i % 5) * 0.3,
+            "vol": 10.0 + i,
+            "type": ("market", "limit", "stop", "stop-limit", "iceberg")[i % 5],
+            "side": 1 if i % 4 < 2 else -1,
+            "qty": 1.0 + i,
+            **({"limit": 100.4} if i % 7 else {}),
+            "stop": 100.1,
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def store(tmp_path):
+    src = tmp_path / "events.json"
+    evs = _events()
+    src.write_text(json.dumps(evs[::-1]))  # converter sorts JSON arrays
+    rows = convert_events(str(src), str(tmp_path / "ticks"), chunk_size=16, block_rows=8)
+    assert rows == len(evs)
+    return TickStore(str(tmp_path / "ticks"), chunk_size=11)
+
+
+def test_store_roundtrip_is_memory_mapped(store):
+    assert is_tick_store(store.path) and len(store) == 40
+    cols = store.columns()
+    assert isinstance(cols["bid"], np.memmap)
+    assert cols["id"].tolist() == list(range(40))
+    assert cols["symbol"][:3].tolist() == ["ADA", "BTC", "ETH"]
+    assert np.isnan(cols["limit"][0]) and cols["limit"][1] == 100.4
+    assert cols["type"][:5].tolist() == [0, 1, 2, 3, -1]
+
+
+def test_time_range_and_symbol_slices(store):
+    ts0 = 1690000000000
+    cols = store.columns(start_ts=ts0 + 2000, end_ts=ts0 + 5000)
+    assert cols["id"].tolist() == list(range(6, 15))
+    eth = store.columns(symbol="ETH")
+    assert eth["id"].tolist() == list(range(2, 40, 3))
+    eth_range = store.columns(start_ts=ts0 + 3000, end_ts=ts0 + 6500, symbol="ETH")
+    assert eth_range["id"].tolist() == [11, 14, 17, 20]
+    assert len(store.columns(symbol="DOGE")["ts"]) == 0
+    chunks = list(store.iter_chunks(chunk_size=3, symbol="ADA", start_ts=ts0 + 9000))
+    assert [c["id"].tolist() for c in chunks] == [[27, 30, 33], [36, 39]]
+
+
+def test_run_ab_reads_store_directly(store, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cfg = RunConfig(run_id="ticks", batch={"batch_size": 8})
+    base = run_ab(cfg, _events(), _events())
+    res = run_ab(cfg, store, store.iter_chunks(chunk_size=5))
+    assert strip_timing(res) == strip_timing(base)
+
+
+def test_jsonl_conversion_streams_and_iso_ts(tmp_path):
+    evs = [
+        {"ts": f"2024-01-01T00:00:0{i}Z", "symbol": "X", "bid": 1.0, "ask": 2.0, "last": 1.5}
+        for i in range(5)
+    ]
+    src = tmp_path / "e.jsonl"
+    src.write_text("\n".join(json.dumps(e) for e in evs))
+    convert_events(str(src), str(tmp_path / "iso"), chunk_size=2)
+    cols = TickStore(str(tmp_path / "iso")).columns()
+    assert cols["ts"].tolist() == [1704067200.0 + i for i in range(5)]
+    assert cols["side"].tolist() == [1] * 5 and cols["qty"].tolist() == [1.0] * 5
+
+
+def test_writer_rejects_unsorted_chunks(tmp_path):
+    evs = _events(6)
+    with pytest.raises(UnsortedStreamError, match="event 3"):
+        with TickStoreWriter(str(tmp_path / "bad")) as w:
+            w.append(evs[3:])
+            w.append(evs[:3])
+    assert sorted(p.name for p in tmp_path.iterdir()) == []
+    empty = tmp_path / "empty"
+    with TickStoreWriter(str(empty)) as w:
+        w.append([])
+    assert len(TickStore(str(empty)).columns()["ts"]) == 0
+
+
+def test_failed_conversion_leaves_no_store(tmp_path):
+    evs = _events(12)
+    bad = tmp_path / "bad.jsonl"
+    bad.write_text("".join(json.dumps(ev) + "\n" for ev in evs[6:] + evs[:6]))
+    dst = tmp_path / "ticks"
+    with pytest.raises(UnsortedStreamError):
+        convert_events(str(bad), str(dst), chunk_size=4)
+    assert not is_tick_store(str(dst)) and not dst.exists()
+    # a failed rewrite keeps the previous store; a successful one replaces it
+    good = tmp_path / "good.jsonl"
+    good.write_text("".join(json.dumps(ev) + "\n" for ev in evs))
+    assert convert_events(str(good), str(dst), chunk_size=4) == 12
+    with pytest.raises(UnsortedStreamError):
+        convert_events(str(bad), str(dst), chunk_size=4)
+    assert len(TickStore(str(dst))) == 12
+    assert convert_events(str(good), str(dst), chunk_size=5) == 12
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["bad.jsonl", "good.jsonl", "ticks"]
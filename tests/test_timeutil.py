@@ -1,8 +1,9 @@
 from datetime import UTC, datetime
 
+import numpy as np
 import pytest
 
-from lib.timeutil import to_utc_iso
+from lib.timeutil import to_epoch_ms_array, to_epoch_us_array, to_utc_iso, to_utc_iso_array
 
 
 def test_to_utc_iso_from_seconds_int():
@@ -41,3 +42,53 @@ def test_to_utc_iso_invalid_string_raises_value_error():
 def test_to_utc_iso_unsupported_type_raises_type_error():
     with pytest.raises(TypeError):
         to_utc_iso([1, 2, 3])
+
+
+def test_to_utc_iso_array_matches_scalar():
+    rng = np.random.default_rng(7)
+    values = np.concatenate(
+        [
+            rng.integers(1_500_000_000_000, 1_800_000_000_000, 500),  # ms
+            rng.integers(1_500_000_000, 1_800_000_000, 500),  # s
+        ]
+    )
+    floats = rng.uniform(1.5e9, 1.8e9, 500)
+    for arr in (values, floats, np.array([1_600_000_000.5, 1_600_000_000.0000005])):
+        assert to_utc_iso_array(arr) == [to_utc_iso(v) for v in arr.tolist()]
+
+
+def test_to_utc_iso_array_strings_and_mixed_input():
+    got = to_utc_iso_array(["2020-09-13T12:26:40Z", 1_600_000_000, "2020-09-13T12:26:40Z"])
+    assert got == ["2020-09-13T12:26:40+00:00"] * 3
+
+
+def test_array_conversions_keep_strictness():
+    with pytest.raises(ValueError):
+        to_utc_iso_array(["2020-09-13T12:26:40Z", "not-a-valid-timestamp"])
+    with pytest.raises(ValueError):
+        to_epoch_us_array(np.array([1.0, np.nan]))
+    with pytest.raises(TypeError):
+        to_epoch_us_array([1_600_000_000, [1, 2, 3]])
+    with pytest.raises(TypeError):
+        to_utc_iso_array([[1, 2], [3, 4]])
+
+
+def test_to_epoch_ms_array_applies_ms_heuristic():
+    got = to_epoch_ms_array([1_600_000_000, 1_600_000_000_123, "2020-09-13T12:26:40.5Z"])
+    assert got.dtype == np.int64
+    assert got.tolist() == [1_600_000_000_000, 1_600_000_000_123, 1_600_000_000_500]
+
+
+@pytest.mark.parametrize("ts", [10**17, 300_000_000_000_000, 2**62, 2**63 + 5, -(10**13)])
+def test_array_conversions_range_check_ints_like_scalar(ts):
+    with pytest.raises(ValueError, match="out of range"):
+        to_utc_iso(ts)
+    with pytest.raises(ValueError, match="out of range"):
+        to_epoch_ms_array([1_600_000_000, ts])
+    with pytest.raises(ValueError, match="out of range"):
+        to_utc_iso_array([ts])
+    # the last representable second, in epoch s and ms, still converts
+    assert to_utc_iso_array([253402300799, 253402300799000]) == [
+        to_utc_iso(253402300799),
+        to_utc_iso(253402300799000),
+    ]